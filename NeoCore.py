@@ -10,7 +10,7 @@ from datetime import datetime, date, timedelta
 from functools import lru_cache
 
 # --- Módulos Internos ---
-from modules.logger import app_logger
+from modules.logger import app_logger, SocketLogHandler
 from modules.speaker import Speaker
 from modules.calendar_manager import CalendarManager
 from modules.alarms import AlarmManager
@@ -32,6 +32,8 @@ from modules.wifi_manager import WifiManager
 # from modules.vision import VisionManager # Lazy load to prevent CV2 segfaults
 from modules.file_manager import FileManager
 from modules.bus_client import BusClient
+from modules.metrics_store import MetricsStore
+from modules.event_queue import PolicyQueue, classify_event, event_priority, EVENT_CLASSES
 from modules.cast_manager import CastManager
 from modules.utils import load_json_data
 from modules.mqtt_manager import MQTTManager
@@ -47,6 +49,10 @@ from modules.plugin_loader import PluginLoader
 from modules.decision_router import DecisionRouter
 from modules.onnx_runner import SpecificModelRunner # New ONNX Runtime Runner
 from modules.text_normalizer import TextNormalizer # Text Normalization Module
+from modules.sentence_segmenter import SentenceSegmenter # Incremental streaming segmentation
+from modules.speech_template import SpeechTemplate # Template-segment TTS cache
+from modules import tracing # Per-utterance trace spans
+from modules.deadline import LatencyBudget, MISSED # Per-stage deadlines
 
 
 # --- Módulos Opcionales ---
@@ -67,13 +73,14 @@ except ImportError:
 
 try:
     import modules.web_admin as web_admin_module
-    from modules.web_admin import run_server, update_face, set_audio_status
+    from modules.web_admin import run_server, update_face, schedule_face_reset, set_audio_status
     WEB_ADMIN_DISPONIBLE = True
 except ImportError as e:
     app_logger.error(f"No se pudo importar Web Admin: {e}")
     WEB_ADMIN_DISPONIBLE = False
     web_admin_module = None
     update_face = None
+    schedule_face_reset = None
 
 try:
     from modules.network import NetworkManager
@@ -95,20 +102,6 @@ try:
 except ImportError:
     vlc = None
 
-class SocketLogHandler(logging.Handler):
-    """Handler to stream logs to web client via SocketIO."""
-    def __init__(self, socketio):
-        super().__init__()
-        self.socketio = socketio
-        self.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
-
-    def emit(self, record):
-        try:
-            msg = self.format(record)
-            self.socketio.emit('log_message', {'msg': msg}, namespace='/')
-        except Exception:
-            self.handleError(record)
-
 app_logger.info("El registro de logs ha sido iniciado (desde NeoCore).")
 
 class NeoCore:
@@ -135,7 +128,9 @@ class NeoCore:
         self.config_manager = ConfigManager()
         self.config = self.config_manager.get_all()
 
-        self.event_queue = queue.Queue()
+        # Cola acotada: telemetría descarta la más antigua, estados se fusionan, voz/alertas nunca se pierden.
+        # Carriles de prioridad: alertas > voz > estados > telemetría ('priority' del evento manda si viene).
+        self.event_queue = PolicyQueue('neocore.events', classify_event, EVENT_CLASSES, priority_of=event_priority)
         # --- Fix for Distrobox/Jack Segfaults ---
         jack_no_start = self.config.get('audio', {}).get('jack_no_start_server', '1')
         os.environ["JACK_NO_START_SERVER"] = str(jack_no_start)
@@ -146,7 +141,7 @@ class NeoCore:
             self.app_logger.info("[OK] Audio Output (Speaker) initialized successfully.")
         except Exception as e:
             self.app_logger.error(f"[ERROR] Failed to initialize Speaker: {e}. Using Mock.")
-            self.speaker = type('MockSpeaker', (object,), {'speak': lambda self, t: self.app_logger.info(f"[MOCK SPEAK]: {t}"), 'play_random_filler': lambda self: None, 'is_busy': False})()
+            self.speaker = type('MockSpeaker', (object,), {'speak': lambda self, t, priority=None, trace_id=None: self.app_logger.info(f"[MOCK SPEAK]: {t}"), 'play_random_filler': lambda self: None, 'mark_response_start': lambda self: None, 'is_busy': False})()
             self.audio_output_enabled = False
         
         # --- Alias para compatibilidad con Skills ---
@@ -155,6 +150,8 @@ class NeoCore:
         # --- AI & Core Managers ---
         model_path = self.config.get('ai_model_path')
         self.ai_engine = AIEngine(model_path=model_path) 
+        if self.config.get('ai_warmup', True):
+            self.ai_engine.warm_up() # La carga perezosa superaría el plazo de la etapa 'chat'
         self.intent_manager = IntentManager(self.config_manager)
         self.decision_router = DecisionRouter(self.config_manager)
         self.onnx_runner = SpecificModelRunner() # Initialize specialized runner
@@ -169,6 +166,7 @@ class NeoCore:
                 update_face
             )
             self.audio_input_enabled = True
+            self.voice_manager.on_barge_in = self._on_barge_in
             self.app_logger.info("[OK] Audio Input (VoiceManager) initialized successfully.")
         except Exception as e:
             self.app_logger.error(f"[ERROR] Failed to initialize VoiceManager: {e}. Using Mock.")
@@ -193,8 +191,14 @@ class NeoCore:
                 for h in self.app_logger.handlers[:]:
                     if isinstance(h, SocketLogHandler):
                         self.app_logger.removeHandler(h)
+                        h.close()
                 
-                socket_handler = SocketLogHandler(self.web_server.socketio)
+                log_config = self.config_manager.get('logging', {})
+                socket_handler = SocketLogHandler(
+                    self.web_server.socketio,
+                    interval=log_config.get('stream_interval', 0.25),
+                    max_lines_per_second=log_config.get('stream_max_lines_per_second', 50)
+                )
                 self.app_logger.addHandler(socket_handler)
                 self.app_logger.info("[OK] Log Streaming to WebClient enabled.")
             except Exception as e:
@@ -205,6 +209,7 @@ class NeoCore:
         self.chat_manager = ChatManager(self.ai_engine)
         self.mango_manager = MangoManager() # Initialize MANGO T5
         self.health_manager = HealthManager(self.config_manager)
+        self.metrics_store = MetricsStore.instance() # Historial de métricas (host y agentes)
         
         # Start RAG Ingestion in background
         self._rag_thread = threading.Thread(target=self.chat_manager.knowledge_base.ingest_docs, daemon=True, name="RAG_Ingest")
@@ -225,6 +230,9 @@ class NeoCore:
                  self.web_server.sys_admin = self.sysadmin_manager
              if self.wifi_manager:
                  self.web_server.wifi_manager = self.wifi_manager
+             self.web_server.response_cache = self.chat_manager.response_cache
+             self.web_server.speaker = self.speaker
+             self.web_server.voice_manager = self.voice_manager
         
         # Vision (Optional & Disabled by default to prevent Segfaults)
         if self.config.get('vision_enabled', False):
@@ -259,7 +267,15 @@ class NeoCore:
              # Fallback: intentar cargar la base de datos manualmente o mock
              self.db = None
              self.app_logger.warning("No se ha podido vincular self.db (Brain DB Manager). FilesSkill podría fallar.")
-        
+
+        # --- TTS Warm-up: pre-renderizar las respuestas más frecuentes en reposo ---
+        if self.db and hasattr(self.speaker, 'schedule_warmup'):
+            try:
+                limit = int(self.config.get('tts', {}).get('warmup_phrases', 30))
+                self.speaker.schedule_warmup(self.db.get_frequent_responses(limit))
+            except Exception as e:
+                self.app_logger.warning(f"No se pudo programar el warm-up TTS: {e}")
+
         # --- Chat Manager (Personality & History) ---
         self.chat_manager.brain = self.brain # Inject Brain for RAG
         
@@ -302,6 +318,10 @@ class NeoCore:
              app_logger.info("Optional Skill 'VoiceAuth' not found.")
         
         self.vlc_instance, self.player = self.setup_vlc()
+        self._radio_volume = None
+        # Radio Ducking: bajar VLC mientras suena TTS/filler por la salida persistente
+        if self.player and getattr(self.speaker, 'output', None):
+            self.speaker.output.add_activity_listener(self._duck_radio)
         
         # --- Content Loading (Resources) ---
         self.load_resources()
@@ -330,6 +350,8 @@ class NeoCore:
         self.last_spoken_text = "" 
         self.last_intent_name = None
         self.active_listening_end_time = 0 
+        self._barge_in_at = 0 # Último barge-in (corta respuestas en streaming en curso)
+        self._command_seq = 0 # Se incrementa con cada comando (descarta respuestas tardías ya superadas)
         self.dynamic_actions = {} # Registry for plugin actions 
 
         # --- Thread Handles ---
@@ -387,17 +409,18 @@ class NeoCore:
         # 1. SALUDOS
         if re.search(r'^(hola|buenas|hey|hi|qué pasa|que pasa|buenos días|buenas tardes|buenas noches)', text):
             responses = [
-                f"Hola {nickname}, ¿en qué puedo ayudarte?",
-                f"Buenas, {nickname}.",
-                f"Aquí estoy, {nickname}.",
-                f"Hola {nickname}, sistemas listos."
+                "Hola {nickname}, ¿en qué puedo ayudarte?",
+                "Buenas, {nickname}.",
+                "Aquí estoy, {nickname}.",
+                "Hola {nickname}, sistemas listos."
             ]
-            return random.choice(responses)
+            return SpeechTemplate.render(random.choice(responses), nickname=nickname)
             
         # 2. ESTADO DEL SISTEMA (Smart Check)
         if re.search(r'(cómo|como|qué|que) (estás|estas|tal|te sientes|vamos)|reporte de estado|status', text):
             # Obtener métricas reales si es posible
-            status_msg = f"Todo operativo, {nickname}."
+            # Plantilla: el Speaker cachea las partes fijas y solo sintetiza los valores
+            status_msg = SpeechTemplate.render("Todo operativo, {nickname}.", nickname=nickname)
             
             if self.sysadmin_manager:
                 try:
@@ -406,12 +429,20 @@ class NeoCore:
                     temp = self.sysadmin_manager.get_cpu_temp()
                     
                     details = []
-                    if cpu: details.append(f"CPU al {cpu}%")
-                    if ram: details.append(f"RAM al {ram}%")
-                    if temp and "N/A" not in str(temp): details.append(f"Temperatura {temp}")
+                    slots = {'nickname': nickname}
+                    if cpu:
+                        details.append("CPU al {cpu}")
+                        slots['cpu'] = f"{cpu}%"
+                    if ram:
+                        details.append("RAM al {ram}")
+                        slots['ram'] = f"{ram}%"
+                    if temp and "N/A" not in str(temp):
+                        details.append("Temperatura {temp}")
+                        slots['temp'] = temp
                     
                     if details:
-                        status_msg = f"Sistemas operativos, {nickname}. " + ", ".join(details) + "."
+                        template = "Sistemas operativos, {nickname}. " + ", ".join(details) + "."
+                        status_msg = SpeechTemplate.render(template, **slots)
                 except Exception as e:
                     self.app_logger.error(f"Error getting stats for greeting: {e}")
             
@@ -420,21 +451,21 @@ class NeoCore:
         # 3. DESPEDIDAS
         if re.search(r'^(adiós|chao|hasta luego|bai|nos vemos|apágate|descansa)', text):
             responses = [
-                f"Hasta luego, {nickname}.",
-                f"Nos vemos, {nickname}.",
-                f"Quedo a la espera, {nickname}.",
+                "Hasta luego, {nickname}.",
+                "Nos vemos, {nickname}.",
+                "Quedo a la espera, {nickname}.",
                 "Cerrando canales de comunicación."
             ]
-            return random.choice(responses)
+            return SpeechTemplate.render(random.choice(responses), nickname=nickname)
 
         # 4. AGRADECIMIENTOS
         if re.search(r'(gracias|muchas gracias)', text):
              responses = [
-                 f"De nada, {nickname}.",
+                 "De nada, {nickname}.",
                  "Para eso estoy.",
                  "Un placer."
              ]
-             return random.choice(responses)
+             return SpeechTemplate.render(random.choice(responses), nickname=nickname)
             
         return None
 
@@ -463,24 +494,22 @@ class NeoCore:
     def on_vision_event(self, event_type, data):
         """Callback for vision events."""
         if event_type == "known_face":
-            self.speak(f"Hola, {data}. Me alegra verte.")
+            self.speak(SpeechTemplate.render("Hola, {name}. Me alegra verte.", name=data))
         elif event_type == "unknown_face":
             self.speak("Detecto una presencia desconocida. ¿Quién eres?")
 
-    def speak(self, text):
-        """Pone un mensaje en la cola de eventos para que el Speaker lo diga."""
-        # --- VISUAL FEEDBACK: AI RESPONSE ---
-        if self.web_server:
-            try:
-                self.web_server.socketio.emit('ai:response', {'text': text}, namespace='/')
-                if update_face: update_face('speaking')
-            except: pass
-            
-        self.event_queue.put({'type': 'speak', 'text': text})
-        
-        # Reset face lazily (approx duration)
-        if self.web_server and update_face:
-             threading.Timer(len(text)/12, lambda: update_face('idle')).start()
+    def speak(self, text, priority=None):
+        """
+        Pone un mensaje en la cola de eventos para que el Speaker lo diga ('critical' interrumpe).
+        El feedback visual (ai:response, cara 'speaking') lo emite process_event_queue al atenderlo.
+        """
+        event = {'type': 'speak', 'text': text}
+        if priority:
+            event['priority'] = priority
+        trace_id = tracing.current_trace_id()
+        if trace_id:
+            event['trace_id'] = trace_id # El Speaker continúa la traza de la frase
+        self.event_queue.put(event)
 
     def log_to_inbox(self, command_text):
         """Log unrecognized command to inbox for future aliasing."""
@@ -556,6 +585,18 @@ class NeoCore:
             return instance, instance.media_player_new()
         return None, None
 
+    def _duck_radio(self, active):
+        """Atenúa la radio (VLC) mientras el asistente habla y la restaura al terminar."""
+        try:
+            if active and self.player.is_playing():
+                self._radio_volume = self.player.audio_get_volume()
+                self.player.audio_set_volume(int(self._radio_volume * 0.3))
+            elif not active and self._radio_volume is not None:
+                self.player.audio_set_volume(self._radio_volume)
+                self._radio_volume = None
+        except Exception as e:
+            app_logger.debug(f"Radio ducking failed: {e}")
+
     def on_closing(self):
         """Limpieza al cerrar."""
         app_logger.info("Cerrando Neo Core...")
@@ -579,6 +620,11 @@ class NeoCore:
 
     def on_voice_command(self, command, wake_word, audio_buffer=None):
         """Callback cuando VoiceManager detecta voz."""
+        if tracing.current_trace_id() is None:
+            # Comandos sin traza de captura (inyectados por el bus/CLI): la traza empieza aquí
+            with tracing.trace('comando', text=command):
+                return self.on_voice_command(command, wake_word, audio_buffer)
+
         app_logger.info(f" VOICE RECEIVED: '{command}' (WW: {wake_word})")
         command_lower = command.lower()
         
@@ -614,7 +660,8 @@ class NeoCore:
              # Extend active listening window (5 seconds for follow-up commands)
              self.active_listening_end_time = time.time() + 5
              
-             self.handle_command(command_clean, audio_buffer)
+             with tracing.span('handle_command', text=command_clean):
+                 self.handle_command(command_clean, audio_buffer)
              
              self.voice_manager.set_processing(False)
         else:
@@ -746,12 +793,20 @@ class NeoCore:
         return False
 
     def handle_command(self, command_text, audio_buffer=None):
-        """Procesa el comando de texto."""
+        """
+        Procesa el comando de texto.
+        Las etapas lentas (router, modelo especializado, validación, LLM) corren con el plazo
+        de un LatencyBudget: si se pasan, se responde con un fallback en vez de bloquear.
+        """
+        budget = LatencyBudget.from_config(self.config_manager.get('latency_budget'))
+        self._command_seq += 1
+        seq = self._command_seq
         try:
                 # --- VOICE AUTH CHECK ---
                 current_user = "unknown"
                 if self.voice_auth_skill and self.voice_auth_skill.enabled and audio_buffer is not None:
-                     current_user, confidence = self.voice_auth_skill.identify_speaker(audio_buffer)
+                     with tracing.span('voice_auth'):
+                         current_user, confidence = self.voice_auth_skill.identify_speaker(audio_buffer)
                      app_logger.info(f" Speaker identified as: {current_user} (Conf: {confidence:.2f})")
                 
                 # Diálogos activos
@@ -814,27 +869,7 @@ class NeoCore:
                     if hasattr(result, '__iter__') and not isinstance(result, (str, bytes, dict)):
                         # Streaming response
                         try:
-                             buffer = ""
-                             for chunk in result:
-                                 if chunk:
-                                     buffer += chunk
-                                     # Heuristic: speak on sentence boundaries
-                                     if any(punct in buffer for punct in ['.', '!', '?', '\n']):
-                                          import re
-                                          # Split keeping delimiters
-                                          parts = re.split(r'([.!?\n])', buffer)
-                                          
-                                          if len(parts) > 1:
-                                              while len(parts) >= 2:
-                                                  sentence = parts.pop(0) + parts.pop(0)
-                                                  sentence = sentence.strip()
-                                                  if sentence:
-                                                      self.speak(sentence)
-                                                      
-                                              buffer = "".join(parts)
-                             # Speak remaining
-                             if buffer.strip():
-                                 self.speak(buffer)
+                             self._speak_stream(result)
                         except Exception as e:
                               app_logger.error(f"Error streaming action result: {e}")
                               self.speak("He hecho lo que pediste, pero me he liado al contártelo.")
@@ -869,7 +904,8 @@ class NeoCore:
                     return
                 
                 # Also check intent manager for saludo/despedida to catch variations
-                best_intent = self.intent_manager.find_best_intent(command_text)
+                with tracing.span('intent'):
+                    best_intent = self.intent_manager.find_best_intent(command_text)
                 if best_intent and best_intent.get('name') in ['saludo', 'despedida', 'agradecimiento']:
                     # High or medium confidence greeting/farewell from intent manager
                     confidence = float(best_intent.get('confidence', 0))
@@ -882,7 +918,7 @@ class NeoCore:
                             # Generic fallback
                             if best_intent['name'] == 'saludo':
                                 nickname = self.config_manager.get('user_nickname', 'Usuario')
-                                self.speak(f"Hola {nickname}, ¿en qué puedo ayudarte?")
+                                self.speak(SpeechTemplate.render("Hola {nickname}, ¿en qué puedo ayudarte?", nickname=nickname))
                             elif best_intent['name'] == 'despedida':
                                 self.speak("Hasta luego.")
                             else:
@@ -891,10 +927,15 @@ class NeoCore:
 
                 # --- 1. NEW ROUTER ARCHITECTURE ---
                 # "Capa de Normalización"
-                command_text = self.text_normalizer.normalize(command_text)
+                with tracing.span('normalize'):
+                    command_text = self.text_normalizer.normalize(command_text)
 
                 # "Capa de Clasificación (Router)"
-                router_label, router_score = self.decision_router.predict(command_text)
+                # Sin respuesta a tiempo: sin etiqueta (el matcher de intents, más barato, lo intenta)
+                with tracing.span('router') as span_attrs:
+                    router_label, router_score = budget.run('router', lambda: self.decision_router.predict(command_text),
+                                                            fallback=lambda: (None, 0.0))
+                    span_attrs.update(label=router_label, score=router_score)
                 
                 app_logger.info(f" ROUTER Decision: label='{router_label}', score={router_score:.3f}")
                 
@@ -931,7 +972,22 @@ class NeoCore:
                             return
 
                         # Fallback to chat/general queries
-                        final_response = self.chat_manager.get_response(command_text)
+                        if getattr(self.chat_manager.ai_engine, 'is_loading', False):
+                            # Modelo aún cargando: ningún plazo de etapa lo cubre, se espera sin fallback
+                            self.speak("Un momento, estoy terminando de cargar el modelo.")
+                            with tracing.span('chat', loading=True):
+                                final_response = self.chat_manager.get_response(command_text)
+                            self.speak(final_response)
+                            return
+                        if getattr(self.chat_manager.ai_engine, 'is_busy', False):
+                            # Una respuesta anterior que agotó su plazo sigue generando: no se encola otra
+                            self.speak("Todavía estoy pensando la respuesta anterior, dame un momento.")
+                            return
+                        # Si el LLM se pasa de plazo: muletilla ahora y la respuesta cuando llegue
+                        with tracing.span('chat'):
+                            final_response = budget.run('chat', lambda: self.chat_manager.get_response(command_text),
+                                                        fallback=lambda: "Dame un momento, lo estoy pensando.",
+                                                        on_late=self._late_reply(seq, time.time()))
                         self.speak(final_response)
                         return
                     else:
@@ -952,7 +1008,8 @@ class NeoCore:
                                 return
                             
                             # Intentar match con SecureIntentMatcher
-                            match_result = self.secure_intent_matcher.match_intent(command_text)
+                            with tracing.span('secure_match'):
+                                match_result = self.secure_intent_matcher.match_intent(command_text)
                             
                             if match_result:
                                 cmd, context, category, is_python = match_result
@@ -997,7 +1054,8 @@ class NeoCore:
                                         return
                                     else:
                                         # Ejecutar directo
-                                        success, output = self.sysadmin_manager.run_command(cmd)
+                                        with tracing.span('execute', cmd=cmd):
+                                            success, output = self.sysadmin_manager.run_command(cmd)
                                         
                                         if success:
                                             # Filtrar output largo
@@ -1043,7 +1101,13 @@ class NeoCore:
                         final_prompt = f"Contexto: {fs_context} | Instrucción: {command_text}"
                         self.app_logger.info(f"ONNX Prompt: {final_prompt}")
 
-                        generated_command = self.onnx_runner.generate_command(final_prompt, router_label)
+                        with tracing.span('specialist_model', label=router_label):
+                            generated_command = budget.run('specialist_model',
+                                                           lambda: self.onnx_runner.generate_command(final_prompt, router_label))
+                        if generated_command is MISSED:
+                            # El comando tardío se descarta: no se ejecuta nada sin que el usuario lo espere
+                            self.speak("El modelo especializado está tardando demasiado. Inténtalo de nuevo en un momento.")
+                            return
                         self.app_logger.info(f" ONNX Generated Command: {generated_command}")
                         
                         if not generated_command:
@@ -1072,12 +1136,16 @@ class NeoCore:
                     
                     # 2. Validate & Execute via SysAdminManager
                     if self.sysadmin_manager:
-                        is_valid, val_msg = self.sysadmin_manager.validate_command_flags(generated_command)
+                        with tracing.span('validate'):
+                            is_valid, val_msg = budget.run('validate',
+                                                           lambda: self.sysadmin_manager.validate_command_flags(generated_command),
+                                                           fallback=lambda: (False, "no he podido validarlo a tiempo"))
                         if not is_valid:
                              self.speak(f"Comando inválido: {val_msg}")
                              return
                         
-                        success, output = self.sysadmin_manager.run_command(generated_command)
+                        with tracing.span('execute', cmd=generated_command):
+                            success, output = self.sysadmin_manager.run_command(generated_command)
                         
                         # "Capa de Finalizacion"
                         if success:
@@ -1240,20 +1308,7 @@ class NeoCore:
             # Si es medio, dejar que Gemma resuma
             try:
                 stream = self.chat_manager.get_response_stream(command_text, system_context=result_text)
-                buffer = ""
-                for chunk in stream:
-                    buffer += chunk
-                    import re
-                    parts = re.split(r'([.!?\n])', buffer)
-                    if len(parts) > 1:
-                        while len(parts) >= 2:
-                            sentence = parts.pop(0) + parts.pop(0)
-                            sentence = sentence.strip()
-                            if sentence:
-                                self.speak(sentence)
-                        buffer = "".join(parts)
-                if buffer.strip():
-                    self.speak(buffer)
+                self._speak_stream(stream)
             except Exception as e:
                 app_logger.error(f"Error streaming action result: {e}")
                 self.speak("He ejecutado el comando.")
@@ -1262,53 +1317,66 @@ class NeoCore:
         """Usa Gemma para responder en Streaming."""
         try:
             stream = self.chat_manager.get_response_stream(command_text)
-            
-            buffer = ""
             self.consecutive_failures = 0
-            
-            for chunk in stream:
-                buffer += chunk
-                
-                # Check for sentence delimiters
-                # Simple heuristic: split by punctuation
-                import re
-                # Split keeping delimiters
-                parts = re.split(r'([.!?\n])', buffer)
-                
-                if len(parts) > 1:
-                    # We have at least one complete sentence
-                    # parts = ['Sentence 1', '.', 'Sentence 2', '?', 'Partial']
-                    
-                    # Process pairs (text + delimiter)
-                    while len(parts) >= 2:
-                        sentence = parts.pop(0) + parts.pop(0)
-                        sentence = sentence.strip()
-                        if sentence:
-                            app_logger.info(f"Stream Sentence: {sentence}")
-                            self.speak(sentence)
-                    
-                    # Remaining part is the new buffer
-                    buffer = "".join(parts)
-            
-            # Speak remaining buffer
-            if buffer.strip():
-                app_logger.info(f"Stream Final: {buffer}")
-                self.speak(buffer)
+            self._speak_stream(stream, log_sentences=True)
                 
         except Exception as e:
             app_logger.error(f"Error en Streaming: {e}")
             self.speak("Lo siento, me he liado.")
 
+    def _speak_stream(self, stream, log_sentences=False):
+        """
+        Habla una respuesta en streaming frase a frase (segmentación incremental).
+        Cada frase se encola en cuanto se completa, de modo que el Speaker sintetiza
+        la siguiente mientras suena la anterior.
+        """
+        self.speaker.mark_response_start() # Time-to-first-audio
+        started = time.time()
+        segmenter = SentenceSegmenter()
+        with tracing.span('stream'):
+            try:
+                for chunk in stream:
+                    if self._barge_in_at > started:
+                        # El usuario ha interrumpido: dejamos de generar y de encolar frases
+                        app_logger.info("Respuesta en streaming interrumpida por barge-in.")
+                        return
+                    for sentence in segmenter.feed(chunk):
+                        if log_sentences: app_logger.info(f"Stream Sentence: {sentence}")
+                        self.speak(sentence)
+            finally:
+                # Cerrar siempre (barge-in o error): el stream retiene el LLM hasta cerrarse
+                if hasattr(stream, 'close'): stream.close()
+
+            remaining = segmenter.flush()
+            if remaining:
+                if log_sentences: app_logger.info(f"Stream Final: {remaining}")
+                self.speak(remaining)
+
+    def _late_reply(self, seq, started):
+        """on_late del chat: la respuesta tardía solo se dice si no hubo barge-in ni un comando posterior."""
+        def deliver(response):
+            if self._barge_in_at > started or self._command_seq != seq:
+                app_logger.info("Respuesta tardía del LLM descartada (barge-in o comando nuevo).")
+                return
+            self.speak(response)
+        return deliver
+
+    def _on_barge_in(self):
+        """El usuario ha empezado a hablar durante la locución (el Speaker ya se ha cortado)."""
+        self._barge_in_at = time.time()
+        # Ventana de escucha activa: la frase que interrumpe no necesita wake word
+        self.active_listening_end_time = time.time() + 8
+
     def process_event_queue(self):
-        """Procesa eventos de la cola (principalmente hablar)."""
+        """Procesa eventos de la cola por carriles de prioridad (alertas y voz antes que telemetría)."""
         while True:
             try:
-                action = self.event_queue.get()
+                action, priority = self.event_queue.get_with_priority()
                 action_type = action.get('type')
 
                 if action_type == 'speak':
                     text_to_speak = action.get('text')
-                    app_logger.info(f"Procesando evento SPEAK: {text_to_speak}")
+                    app_logger.info(f"Procesando evento SPEAK ({priority}): {text_to_speak}")
                     self.is_processing_command = True
                     
                     # Emit AI Response to UI
@@ -1319,8 +1387,13 @@ class NeoCore:
                              app_logger.warning(f"Error emitting ai:response: {e}")
 
                     if update_face: update_face('speaking')
+                    # La cara vuelve a 'listening' con el evento speaker_status 'idle'.
+                    # Solo sin Speaker real (Mock, sin eventos) se estima la duración.
+                    if schedule_face_reset and not self.audio_output_enabled:
+                        schedule_face_reset('idle', len(text_to_speak or '') / 12)
                     self.last_spoken_text = text_to_speak
-                    self.speaker.speak(text_to_speak)
+                    self.speaker.speak(text_to_speak, priority=action.get('priority', 'normal'),
+                                       trace_id=action.get('trace_id'))
                 elif action_type == 'speaker_status':
                     if action['status'] == 'idle':
                         self.is_processing_command = False
@@ -1333,13 +1406,16 @@ class NeoCore:
                     # Alerta crítica de un agente
                     agent = action.get('agent')
                     msg = action.get('msg')
-                    self.speak(f"Alerta de {agent}: {msg}")
+                    self.speak(f"Alerta de {agent}: {msg}", priority='critical')
                     if update_face: update_face('alert', {'msg': msg})
 
                 elif action_type == 'mqtt_telemetry':
                     # Datos de telemetría -> Actualizar UI (Pop-up)
                     agent = action.get('agent')
                     data = action.get('data')
+                    # Historial: los campos numéricos de la telemetría van al almacén de series
+                    if isinstance(data, dict):
+                        self.metrics_store.record_many(data, prefix=f"agent.{agent}.")
                     # Solo mostramos pop-up si es un mensaje de "estado" o cada X tiempo
                     # Para cumplir el requisito de "aviso pop up deslizante avisando de la conexion",
                     # podemos asumir que si recibimos telemetría, está conectado.
@@ -1411,7 +1487,8 @@ class NeoCore:
             events_today = self.calendar_manager.get_events_for_day(date.today().year, date.today().month, date.today().day)
             for event in events_today:
                 if event['date'] == today_str:
-                    msg = f"Te recuerdo que hoy a las {event['time']} tienes una cita: {event['description']}"
+                    msg = SpeechTemplate.render("Te recuerdo que hoy a las {time} tienes una cita: {description}",
+                                                time=event['time'], description=event['description'])
                     self.event_queue.put({'type': 'speak', 'text': msg})
 
     def execute_action(self, name, cmd, params, resp, intent_name=None):
@@ -1524,7 +1601,8 @@ class NeoCore:
     def execute_command(self, command_text):
         """Intenta ejecutar un comando usando los diferentes gestores (Intent, Keyword, etc)."""
         # 1. Intent Manager (NLP)
-        intent = self.intent_manager.find_best_intent(command_text)
+        with tracing.span('intent'):
+            intent = self.intent_manager.find_best_intent(command_text)
         if intent and intent.get('score', 0) > 70:
              app_logger.info(f"Intent detectado: {intent.get('name', 'Unknown')} ({intent.get('confidence', 'N/A')})")
              # Aquí iría la lógica de ejecución de intents, por ahora devolvemos respuesta simple o delegamos
@@ -1534,7 +1612,9 @@ class NeoCore:
              pass # TODO: Implementar ejecución completa de intents si es necesario
 
         # 2. Keyword Router (Comandos directos)
-        router_response = self.keyword_router.process(command_text)
+        with tracing.span('action') as span_attrs:
+            router_response = self.keyword_router.process(command_text)
+            span_attrs['matched'] = bool(router_response)
         if router_response:
              app_logger.info(f"Keyword Router ejecutó: {command_text}")
              if isinstance(router_response, str):
@@ -1,6 +1,9 @@
 import logging
 import os
+import time
+import threading
 from modules.logger import app_logger
+from modules.metrics_registry import LLM_TTFT, LLM_TOKENS, LLM_TOKENS_PER_SECOND, LLM_ERRORS
 
 try:
     from llama_cpp import Llama
@@ -9,8 +12,11 @@ except ImportError:
     LLAMA_AVAILABLE = False
     app_logger.warning("llama-cpp-python no está instalado. AIEngine no funcionará.")
 
+# Respuesta cuando otra generación retiene el modelo más de `busy_timeout` (no se cachea ni se guarda)
+BUSY_RESPONSE = "Estoy terminando otra respuesta, pregúntamelo en un momento."
+
 class AIEngine:
-    def __init__(self, model_path=None):
+    def __init__(self, model_path=None, busy_timeout=10.0):
         # Default paths
         self.default_path = "models/gemma-2-2b-it-Q4_K_M.gguf"
         
@@ -29,21 +35,52 @@ class AIEngine:
 
         self.llm = None
         self.is_ready = False
+        self.last_failed = False # True si la última generación terminó en error
+        # llama-cpp no es thread-safe: una carga o generación a la vez (una etapa que agotó
+        # su plazo sigue generando en segundo plano). Nadie espera más de `busy_timeout`.
+        # Lock (no RLock): el stream lo libera al cerrarse, quizá desde otro hilo.
+        self._lock = threading.Lock()
+        self._busy = False
+        self._loading = False
+        self.busy_timeout = busy_timeout
         
         # NOTE: Model is NOT loaded here. It will be loaded on first use.
 
     def _ensure_model_loaded(self):
-        """Carga el modelo si aún no está en memoria."""
+        """Carga el modelo si aún no está en memoria (llamar con el lock)."""
         if not self.llm and LLAMA_AVAILABLE:
             app_logger.info("[WARN] Disparando carga perezosa (Lazy Load) del modelo AI...")
             self.load_model()
 
+    def warm_up(self):
+        """Carga el modelo en segundo plano al arrancar: la primera pregunta no paga la carga."""
+        threading.Thread(target=self._warm_up, daemon=True, name="LLM_Warmup").start()
+
+    def _warm_up(self):
+        with self._lock:
+            self._ensure_model_loaded()
+
+    @property
+    def is_busy(self):
+        """Hay una generación en curso."""
+        return self._busy
+
+    @property
+    def is_loading(self):
+        """El modelo GGUF se está cargando (tarda más que cualquier plazo de etapa)."""
+        return self._loading
+
+    def _acquire(self):
+        # Durante la carga se espera a que termine; si no, como mucho busy_timeout
+        return self._lock.acquire(timeout=-1 if self._loading else self.busy_timeout)
+
     def load_model(self):
         """Carga el modelo GGUF."""
         if not os.path.exists(self.model_path):
             app_logger.error(f"Modelo no encontrado en {self.model_path}.")
             return
 
+        self._loading = True
         try:
             app_logger.info(f"Cargando modelo GGUF desde {self.model_path}...")
             
@@ -70,14 +107,29 @@ class AIEngine:
         except Exception as e:
             app_logger.error(f"Error cargando modelo: {e}")
             self.is_ready = False
+        finally:
+            self._loading = False
 
     def generate_response(self, prompt, max_tokens=150):
         """Genera una respuesta usando el modelo (Raw Completion)."""
+        if not self._acquire():
+            app_logger.warning("AIEngine ocupado: generación rechazada.")
+            return BUSY_RESPONSE
+        self._busy = True
+        try:
+            return self._generate_response(prompt, max_tokens)
+        finally:
+            self._busy = False
+            self._lock.release()
+
+    def _generate_response(self, prompt, max_tokens):
         self._ensure_model_loaded()
         
         if not self.is_ready:
             return "Lo siento, mi cerebro de IA no está disponible en este momento."
 
+        self.last_failed = False
+        start = time.perf_counter()
         try:
             # Usamos raw completion
             output = self.llm(
@@ -91,19 +143,44 @@ class AIEngine:
             )
             
             response = output['choices'][0]['text'].strip()
+            # Sin streaming el primer token llega con la respuesta completa
+            elapsed = time.perf_counter() - start
+            LLM_TTFT.observe(elapsed, mode='complete')
+            tokens = output.get('usage', {}).get('completion_tokens', 0)
+            if tokens:
+                LLM_TOKENS.inc(tokens, mode='complete')
+                LLM_TOKENS_PER_SECOND.observe(tokens / max(elapsed, 1e-6), mode='complete')
             return response
         except Exception as e:
             app_logger.error(f"Error generando respuesta: {e}")
+            LLM_ERRORS.inc(mode='complete')
+            self.last_failed = True
             return "Tuve un error al pensar la respuesta."
 
     def generate_response_stream(self, prompt, max_tokens=150):
-        """Genera una respuesta en streaming (yields chunks)."""
+        """Genera una respuesta en streaming (yields chunks). Retiene el modelo hasta agotar o cerrar el stream."""
+        if not self._acquire():
+            app_logger.warning("AIEngine ocupado: stream rechazado.")
+            yield BUSY_RESPONSE
+            return
+        self._busy = True
+        try:
+            yield from self._generate_response_stream(prompt, max_tokens)
+        finally:
+            self._busy = False
+            self._lock.release()
+
+    def _generate_response_stream(self, prompt, max_tokens):
         self._ensure_model_loaded()
 
         if not self.is_ready:
             yield "Lo siento, mi cerebro de IA no está disponible."
             return
 
+        self.last_failed = False
+        start = time.perf_counter()
+        first_token_at = None
+        tokens = 0
         try:
             stream = self.llm(
                 prompt,
@@ -118,10 +195,20 @@ class AIEngine:
             
             for output in stream:
                 chunk = output['choices'][0]['text']
+                tokens += 1 # llama.cpp emite un chunk por token
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                    LLM_TTFT.observe(first_token_at - start, mode='stream')
                 yield chunk
 
+            LLM_TOKENS.inc(tokens, mode='stream')
+            if tokens > 1:
+                LLM_TOKENS_PER_SECOND.observe((tokens - 1) / max(time.perf_counter() - first_token_at, 1e-6),
+                                              mode='stream')
         except Exception as e:
             app_logger.error(f"Error generando stream: {e}")
+            LLM_ERRORS.inc(mode='stream')
+            self.last_failed = True
             yield " Error."
 
 # Alias for backward compatibility if needed, but we will update imports
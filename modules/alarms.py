@@ -3,6 +3,7 @@ import json
 import os
 import logging
 from modules.config_manager import ConfigManager
+from modules.speech_template import SpeechTemplate
 
 class AlarmManager:
     """Gestiona las alarmas."""
@@ -79,7 +80,8 @@ class AlarmManager:
         for alarm in self.alarms:
             if today_weekday in alarm['days_of_week'] and alarm['time'] == current_time_str:
                 if alarm.get('last_triggered_date') != current_date_str:
-                    actions.append({'type': 'speak', 'text': f"Son las {alarm['time']}, recordatorio de alarma: {alarm['label']}"})
+                    actions.append({'type': 'speak', 'text': SpeechTemplate.render(
+                        "Son las {time}, recordatorio de alarma: {label}", time=alarm['time'], label=alarm['label'])})
                     alarm['last_triggered_date'] = current_date_str
                     self._save_alarms() # Guardar para no repetir hoy
         return actions
\ No newline at end of file
@@ -0,0 +1,307 @@
+import threading
+import time
+import wave
+import logging
+from collections import deque
+
+import numpy as np
+
+from modules.utils import no_alsa_error
+
+try:
+    import pyaudio
+    PYAUDIO_AVAILABLE = True
+except ImportError:
+    pyaudio = None
+    PYAUDIO_AVAILABLE = False
+
+logger = logging.getLogger("AudioOutput")
+
+class PlaybackHandle:
+    """
+    Un sonido en reproducción dentro de un canal del mezclador.
+    Se puede alimentar en streaming (write) y cerrar cuando no hay más datos.
+    """
+    def __init__(self, output, rate):
+        self._output = output
+        self.rate = rate
+        self.buffers = deque() # np.float32 ya remuestreado a la frecuencia del mezclador
+        self.offset = 0 # Posición de lectura dentro de buffers[0]
+        self.closed = False
+        self.done = threading.Event()
+        self.requested_at = time.time()
+        self.started_at = None
+
+    def write(self, pcm):
+        """Añade PCM 16-bit mono (bytes o np.int16)."""
+        self._output._feed(self, pcm)
+
+    def close(self):
+        """No habrá más datos; el sonido termina cuando se vacíe el buffer."""
+        self._output._close(self)
+
+    def wait(self, timeout=None):
+        return self.done.wait(timeout)
+
+class AudioOutput:
+    """
+    Salida de audio persistente (un único stream PyAudio abierto durante toda la vida
+    del Speaker) con un mezclador sencillo por canales:
+    - 'tts'    : frases sintetizadas (secuenciales).
+    - 'filler' : muletillas de relleno ("mmm", "a ver...").
+    Evita lanzar un proceso aplay y reabrir el dispositivo ALSA en cada locución.
+    Cuando un canal con ducking está activo se avisa a los listeners (p.ej. bajar la radio VLC).
+    """
+    DUCKING_CHANNELS = ('tts', 'filler')
+
+    def __init__(self, rate=22050, device_index=None, frames_per_buffer=512, idle_timeout=2.0):
+        if not PYAUDIO_AVAILABLE:
+            raise RuntimeError("PyAudio no está instalado.")
+
+        self.rate = rate
+        self.device_index = device_index
+        self.frames_per_buffer = frames_per_buffer
+        self.idle_timeout = idle_timeout
+
+        self.channels = {} # name -> deque[PlaybackHandle]
+        self.gains = {'tts': 1.0, 'filler': 0.8}
+        self._cond = threading.Condition()
+        self._activity_listeners = []
+        self._active = False
+        self._stream_active = False
+        self._last_audio = 0
+
+        # Estadísticas: latencia desde play() hasta que el primer frame llega al dispositivo
+        self.start_latencies = deque(maxlen=200) # (canal, segundos)
+        # Nivel RMS (escala int16) de los últimos frames enviados al dispositivo (eco esperado en el micro)
+        self._levels = deque(maxlen=8)
+
+        with no_alsa_error():
+            self._pa = pyaudio.PyAudio()
+            self.stream = self._pa.open(format=pyaudio.paInt16, channels=1, rate=self.rate, output=True,
+                                        frames_per_buffer=self.frames_per_buffer,
+                                        output_device_index=self.device_index,
+                                        start=False)
+
+        self.running = True
+        self.thread = threading.Thread(target=self._mix_loop, daemon=True, name="Audio_Mixer")
+        self.thread.start()
+        logger.info(f"AudioOutput persistente abierto ({self.rate} Hz, {self.frames_per_buffer} frames).")
+
+    # --- API pública ---
+
+    def open_stream(self, channel, rate):
+        """Crea un sonido en streaming en el canal indicado (se encola tras los que ya suenen)."""
+        handle = PlaybackHandle(self, rate)
+        with self._cond:
+            self.channels.setdefault(channel, deque()).append(handle)
+            self._cond.notify()
+        return handle
+
+    def play(self, pcm, rate, channel='tts'):
+        """Reproduce un buffer PCM completo. Retorna el PlaybackHandle (usar .wait())."""
+        handle = self.open_stream(channel, rate)
+        handle.write(pcm)
+        handle.close()
+        return handle
+
+    def play_file(self, path, channel='tts'):
+        """Reproduce un WAV (16-bit mono) sin lanzar procesos externos."""
+        pcm, rate = read_wav(path)
+        return self.play(pcm, rate, channel)
+
+    def stop(self, channel=None):
+        """Corta en seco un canal (o todos). Solo vacía buffers: no cierra el dispositivo."""
+        with self._cond:
+            names = [channel] if channel else list(self.channels.keys())
+            for name in names:
+                for handle in self.channels.get(name, ()):
+                    handle.buffers.clear()
+                    handle.closed = True
+                    handle.done.set()
+                self.channels[name] = deque()
+            self._cond.notify()
+        self._update_activity()
+
+    def is_active(self, channel=None):
+        with self._cond:
+            if channel:
+                return bool(self.channels.get(channel))
+            return any(self.channels.values())
+
+    def set_gain(self, channel, gain):
+        """Ajusta el volumen de un canal en caliente (p.ej. atenuar el TTS al detectar voz)."""
+        with self._cond:
+            self.gains[channel] = gain
+
+    def get_output_level(self):
+        """Nivel RMS reciente de la salida (máximo de los últimos frames, cubre el retardo del eco)."""
+        with self._cond:
+            return max(self._levels) if self._levels and self._stream_active else 0.0
+
+    def add_activity_listener(self, callback):
+        """callback(active: bool) cuando empieza/termina audio en un canal con ducking."""
+        self._activity_listeners.append(callback)
+
+    def get_stats(self, channel=None):
+        values = [lat for name, lat in self.start_latencies if channel in (None, name)]
+        if not values:
+            return {'count': 0, 'avg_start_ms': None, 'max_start_ms': None}
+        return {
+            'count': len(values),
+            'avg_start_ms': round(sum(values) / len(values) * 1000, 2),
+            'max_start_ms': round(max(values) * 1000, 2)
+        }
+
+    def close(self):
+        self.running = False
+        with self._cond:
+            self._cond.notify()
+        self.thread.join(timeout=2)
+        try:
+            self.stream.close()
+            self._pa.terminate()
+        except Exception:
+            pass
+
+    # --- Internos ---
+
+    def _feed(self, handle, pcm):
+        if isinstance(pcm, (bytes, bytearray)):
+            samples = np.frombuffer(pcm, dtype=np.int16)
+        else:
+            samples = np.asarray(pcm, dtype=np.int16)
+        if not len(samples):
+            return
+        data = samples.astype(np.float32) / 32768.0
+        if handle.rate != self.rate:
+            data = resample(data, handle.rate, self.rate)
+        with self._cond:
+            if handle.closed:
+                return
+            handle.buffers.append(data)
+            self._cond.notify()
+
+    def _close(self, handle):
+        with self._cond:
+            handle.closed = True
+            self._cond.notify()
+
+    def _has_audio(self):
+        return any(self.channels.values())
+
+    def _mix_frame(self):
+        """Mezcla frames_per_buffer muestras de todos los canales (llamar con el lock)."""
+        n = self.frames_per_buffer
+        mix = np.zeros(n, dtype=np.float32)
+        now = time.time()
+
+        for name, handles in self.channels.items():
+            gain = self.gains.get(name, 1.0)
+            filled = 0
+            while handles and filled < n:
+                handle = handles[0]
+                if not handle.buffers:
+                    if handle.closed:
+                        handle.done.set()
+                        handles.popleft()
+                        continue
+                    break # Underrun: la síntesis aún no ha llegado, silencio en este canal
+
+                if handle.started_at is None:
+                    handle.started_at = now
+                    self.start_latencies.append((name, now - handle.requested_at))
+
+                buf = handle.buffers[0]
+                take = min(n - filled, len(buf) - handle.offset)
+                mix[filled:filled + take] += buf[handle.offset:handle.offset + take] * gain
+                filled += take
+                handle.offset += take
+                if handle.offset >= len(buf):
+                    handle.buffers.popleft()
+                    handle.offset = 0
+
+        np.clip(mix, -1.0, 1.0, out=mix)
+        self._levels.append(float(np.sqrt(np.mean(mix * mix))) * 32767)
+        return (mix * 32767).astype(np.int16)
+
+    def _update_activity(self):
+        with self._cond:
+            active = any(self.channels.get(c) for c in self.DUCKING_CHANNELS)
+            changed = active != self._active
+            self._active = active
+        if changed:
+            for callback in self._activity_listeners:
+                try:
+                    callback(active)
+                except Exception as e:
+                    logger.error(f"Error en listener de actividad de audio: {e}")
+
+    def _mix_loop(self):
+        while self.running:
+            with self._cond:
+                while self.running and not self._has_audio():
+                    self._levels.clear()
+                    # Idle: paramos el stream (sin cerrarlo) para no consumir CPU
+                    if self._stream_active and time.time() - self._last_audio > self.idle_timeout:
+                        self.stream.stop_stream()
+                        self._stream_active = False
+                    self._cond.wait(timeout=self.idle_timeout)
+                if not self.running:
+                    break
+                if not self._stream_active:
+                    self.stream.start_stream()
+                    self._stream_active = True
+                frame = self._mix_frame()
+                self._last_audio = time.time()
+
+            self._update_activity()
+            try:
+                self.stream.write(frame.tobytes(), exception_on_underflow=False)
+            except Exception as e:
+                logger.error(f"Error escribiendo en el dispositivo de audio: {e}")
+                time.sleep(0.05)
+
+def resample(data, src_rate, dst_rate):
+    """Remuestreo lineal (suficiente para voz y muletillas)."""
+    if src_rate == dst_rate or not len(data):
+        return data
+    n_out = int(round(len(data) * dst_rate / src_rate))
+    x_old = np.linspace(0.0, 1.0, num=len(data), endpoint=False)
+    x_new = np.linspace(0.0, 1.0, num=n_out, endpoint=False)
+    return np.interp(x_new, x_old, data).astype(np.float32)
+
+def read_wav(path):
+    """Lee un WAV PCM 16-bit y devuelve (np.int16 mono, sample_rate)."""
+    with wave.open(path, 'rb') as wf:
+        rate = wf.getframerate()
+        channels = wf.getnchannels()
+        width = wf.getsampwidth()
+        frames = wf.readframes(wf.getnframes())
+    if width != 2:
+        raise ValueError(f"WAV no soportado ({width * 8} bits): {path}")
+    samples = np.frombuffer(frames, dtype=np.int16)
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1).astype(np.int16)
+    return samples, rate
+
+def crossfade_concat(segments, rate, fade_ms=12):
+    """
+    Concatena segmentos PCM np.int16 con fundidos cortos en cada unión
+    (evita los clics al pegar audio sintetizado por separado).
+    """
+    segments = [s for s in segments if len(s)]
+    if not segments:
+        return np.zeros(0, dtype=np.int16)
+    fade = int(rate * fade_ms / 1000)
+    out = segments[0].astype(np.float32)
+    for seg in segments[1:]:
+        seg = seg.astype(np.float32)
+        n = min(fade, len(out), len(seg))
+        if n:
+            ramp = np.linspace(0.0, 1.0, num=n, endpoint=False, dtype=np.float32)
+            overlap = out[-n:] * (1.0 - ramp) + seg[:n] * ramp
+            out = np.concatenate([out[:-n], overlap, seg[n:]])
+        else:
+            out = np.concatenate([out, seg])
+    return np.clip(out, -32768, 32767).astype(np.int16)
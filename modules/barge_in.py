@@ -0,0 +1,142 @@
+import time
+import logging
+from collections import deque
+
+import numpy as np
+
+logger = logging.getLogger("BargeIn")
+
+class BargeInDetector:
+    """
+    Detección de "barge-in": el usuario empieza a hablar mientras suena el TTS.
+    - VAD por energía (RMS) sobre el micro, con umbral que sigue al nivel de la propia
+      salida (eco estimado = ratio micro/salida aprendido mientras nadie habla).
+    - Al primer frame sospechoso se atenúa el canal TTS: si era eco, la energía cae;
+      si es voz, se mantiene y tras `onset_ms` se corta la locución y se vacía la cola.
+    - Mide el tiempo desde el inicio de la voz hasta el silencio del Speaker.
+    """
+
+    def __init__(self, speaker, rate=16000, min_rms=900, echo_margin=2.5, onset_ms=150,
+                 duck_gain=0.3, preroll_ms=1000, on_barge_in=None):
+        self.speaker = speaker
+        self.rate = rate
+        self.min_rms = min_rms
+        self.echo_margin = echo_margin
+        self.onset_ms = onset_ms
+        self.duck_gain = duck_gain
+        self.on_barge_in = on_barge_in
+
+        self.echo_ratio = 0.5 # micro_rms / salida_rms (se adapta)
+        self._onset = None # Instante del primer frame por encima del umbral
+        self._ducked = False
+        self._preroll = deque()
+        self._preroll_bytes = 0
+        self._preroll_max = int(rate * preroll_ms / 1000) * 2
+
+        self.detections = 0
+        self.false_onsets = 0
+        self.onset_to_silence = deque(maxlen=100)
+
+    @classmethod
+    def from_config(cls, speaker, config, on_barge_in=None):
+        """Crea el detector a partir de la sección 'barge_in' de la configuración."""
+        return cls(
+            speaker,
+            min_rms=float(config.get('min_rms', 900)),
+            echo_margin=float(config.get('echo_margin', 2.5)),
+            onset_ms=int(config.get('onset_ms', 150)),
+            duck_gain=float(config.get('duck_gain', 0.3)),
+            on_barge_in=on_barge_in
+        )
+
+    @property
+    def output(self):
+        return getattr(self.speaker, 'output', None)
+
+    def process(self, data):
+        """
+        Analiza un bloque PCM 16-bit mono del micro capturado durante la locución.
+        Retorna True si se ha detectado (y ejecutado) un barge-in.
+        """
+        now = time.time()
+        self._keep_preroll(data)
+        samples = np.frombuffer(data, dtype=np.int16).astype(np.float32)
+        if not len(samples):
+            return False
+        mic_rms = float(np.sqrt(np.mean(samples * samples)))
+
+        out_level = self.output.get_output_level() if self.output else None
+        if out_level is None:
+            threshold = self.min_rms * self.echo_margin # Sin nivel de salida: umbral fijo conservador
+        else:
+            # El nivel ya incluye la atenuación: si estamos atenuados el eco esperado baja
+            threshold = max(self.min_rms, self.echo_margin * self.echo_ratio * out_level)
+
+        if mic_rms < threshold:
+            if self._onset is not None:
+                # Era eco o un ruido breve: se restaura el volumen
+                self.false_onsets += 1
+                self._reset_onset()
+            elif out_level:
+                # Nadie habla: aprendemos cuánto de la salida vuelve por el micro
+                self.echo_ratio = 0.95 * self.echo_ratio + 0.05 * min(mic_rms / out_level, 2.0)
+            return False
+
+        if self._onset is None:
+            self._onset = now - len(samples) / self.rate
+            if self.output:
+                self.output.set_gain('tts', self.duck_gain)
+                self._ducked = True
+            return False
+
+        if (now - self._onset) * 1000 < self.onset_ms:
+            return False
+
+        self._trigger()
+        return True
+
+    def take_preroll(self):
+        """Audio del micro reciente (incluye el inicio de la frase del usuario) para el reconocedor."""
+        data = b"".join(self._preroll)
+        self._preroll.clear()
+        self._preroll_bytes = 0
+        return data
+
+    def reset(self):
+        self._reset_onset()
+
+    def get_stats(self):
+        values = list(self.onset_to_silence)
+        return {
+            'detections': self.detections,
+            'false_onsets': self.false_onsets,
+            'echo_ratio': round(self.echo_ratio, 3),
+            'onset_to_silence_avg': round(sum(values) / len(values), 3) if values else None,
+            'onset_to_silence_last': round(values[-1], 3) if values else None
+        }
+
+    def _trigger(self):
+        onset = self._onset
+        self.speaker.stop()
+        self._reset_onset()
+        silence = time.time() - onset
+        self.onset_to_silence.append(silence)
+        self.detections += 1
+        logger.info(f"Barge-in: locución interrumpida {silence * 1000:.0f} ms tras el inicio de la voz.")
+        if self.on_barge_in:
+            try:
+                self.on_barge_in()
+            except Exception as e:
+                logger.error(f"Error en callback de barge-in: {e}")
+
+    def _reset_onset(self):
+        self._onset = None
+        if self._ducked and self.output:
+            self.output.set_gain('tts', 1.0)
+        self._ducked = False
+
+    def _keep_preroll(self, data):
+        self._preroll.append(data)
+        self._preroll_bytes += len(data)
+        while self._preroll_bytes > self._preroll_max and len(self._preroll) > 1:
+            self._preroll_bytes -= len(self._preroll.popleft())
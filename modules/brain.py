@@ -2,6 +2,7 @@ import logging
 import json
 from collections import deque
 from modules.database import DatabaseManager
+from modules.ai_engine import BUSY_RESPONSE
 try:
     from rapidfuzz import fuzz
 except ImportError:
@@ -173,6 +174,9 @@ class Brain:
 
         try:
             summary = self.ai_engine.generate_response(prompt)
+            if summary == BUSY_RESPONSE:
+                logger.info("AI Engine ocupado: la consolidación se reintentará más tarde.")
+                return False
             if summary:
                 self.db.add_daily_summary(yesterday, summary)
                 logger.info(f"Memory consolidated for {yesterday}.")
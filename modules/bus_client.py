@@ -4,24 +4,54 @@ import json
 import threading
 import time
 
+from modules.local_bus import LocalBus, local_dispatch_loop
+from modules.event_queue import PolicyQueue, classify_bus_message, BUS_CLASSES
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    msgpack = None
+    MSGPACK_AVAILABLE = False
+
 logger = logging.getLogger("BusClient")
 
+DEFAULT_TRANSPORTS = ['websocket'] # Solo websocket (sin handshake por polling); polling = fallback
+
 class BusClient:
-    def __init__(self, host='localhost', port=5000, name="UnknownClient"):
+    def __init__(self, host='localhost', port=5000, name="UnknownClient", transports=None, codec='auto', local='auto'):
         self.sio = socketio.Client()
         self.host = host
         self.port = port
         self.name = name
         self.handlers = {} # Map event_type -> [callbacks]
+        self.subscriptions = [] # Topics extra (comodines) además de los que tienen handler
         self.connected = False
 
+        # Transporte: websocket primero, long-polling solo como fallback
+        self.transports = transports or list(DEFAULT_TRANSPORTS)
+        self.transport = None # Transporte efectivamente conectado
+        # Codec: 'auto' ofrece msgpack si está instalado; el servidor decide por conexión
+        self.codec_preference = codec
+        self.codec = 'json'
+        # Transporte en memoria si el servidor del bus corre en este mismo proceso
+        self.local = local
+        self._local_inbox = None
+        self._closed = threading.Event()
+
         self._setup_events()
 
     def _setup_events(self):
         @self.sio.event
         def connect():
             self.connected = True
-            logger.info(f"[{self.name}] Connected to Message Bus")
+            self.codec = 'json' # Hasta que el servidor confirme otro codec
+            self.transport = self.sio.transport()
+            logger.info(f"[{self.name}] Connected to Message Bus ({self.transport})")
+            # El servidor solo nos reenvía los topics declarados (handlers + suscripciones)
+            self.sio.emit('bus:hello', {'name': self.name, 'codecs': self._offered_codecs(),
+                                        'topics': self._topics()},
+                          callback=self._on_hello_ack)
             self.emit(f"{self.name}.connected", {})
 
         @self.sio.event
@@ -34,24 +64,76 @@ class BusClient:
             """
             Handle incoming messages from the bus.
             """
-            msg_type = data.get('type')
-            msg_data = data.get('data', {})
-            
-            # logger.debug(f"[{self.name}] Received: {msg_type}")
-            
-            if msg_type in self.handlers:
-                for callback in self.handlers[msg_type]:
-                    try:
-                        callback(data)
-                    except Exception as e:
-                        logger.error(f"Error in callback for {msg_type}: {e}")
+            self._dispatch(data)
+
+        @self.sio.event
+        def message_bin(data):
+            """Mensaje del bus en msgpack (conexiones que lo han negociado)."""
+            try:
+                self._dispatch(msgpack.unpackb(data, raw=False))
+            except Exception as e:
+                logger.error(f"[{self.name}] Invalid binary message: {e}")
+
+    def _topics(self):
+        return list(self.handlers.keys()) + [t for t in self.subscriptions if t not in self.handlers]
+
+    def _offered_codecs(self):
+        if self.codec_preference in ('auto', 'msgpack') and MSGPACK_AVAILABLE:
+            return ['msgpack', 'json']
+        return ['json']
+
+    def _on_hello_ack(self, response=None):
+        codec = (response or {}).get('codec', 'json')
+        self.codec = codec if codec in self._offered_codecs() else 'json'
+        logger.info(f"[{self.name}] Bus codec: {self.codec}")
+
+    def _dispatch(self, data):
+        if not isinstance(data, dict):
+            return
+        msg_type = data.get('type')
+
+        # logger.debug(f"[{self.name}] Received: {msg_type}")
+
+        if msg_type in self.handlers:
+            for callback in self.handlers[msg_type]:
+                try:
+                    callback(data)
+                except Exception as e:
+                    logger.error(f"Error in callback for {msg_type}: {e}")
 
     def on(self, event_type, callback):
         """Register a callback for a specific event type."""
         if event_type not in self.handlers:
             self.handlers[event_type] = []
+            if self.connected:
+                self._send_subscription('bus:subscribe', [event_type])
         self.handlers[event_type].append(callback)
 
+    def subscribe(self, *topics):
+        """
+        Recibir también estos topics (admite comodines: 'mic:*', '*').
+        Útil para monitores o clientes que enrutan por su cuenta con sio.on('message').
+        """
+        new = [t for t in topics if t not in self.subscriptions]
+        self.subscriptions.extend(new)
+        if new and self.connected:
+            self._send_subscription('bus:subscribe', new)
+
+    def unsubscribe(self, *topics):
+        self.subscriptions = [t for t in self.subscriptions if t not in topics]
+        for topic in topics:
+            self.handlers.pop(topic, None)
+        if self.connected:
+            self._send_subscription('bus:unsubscribe', list(topics))
+
+    def _send_subscription(self, event, topics):
+        if self.transport == 'local':
+            return # LocalBus consulta las suscripciones en vivo
+        try:
+            self.sio.emit(event, {'topics': topics})
+        except Exception as e:
+            logger.error(f"[{self.name}] Failed to update subscriptions: {e}")
+
     def emit(self, event_type, data=None):
         """Send a message to the bus."""
         if data is None:
@@ -63,9 +145,14 @@ class BusClient:
             "context": {"source": self.name}
         }
         
-        if self.connected:
+        if self.connected and self.transport == 'local':
+            LocalBus.instance().publish(payload, self, self.port)
+        elif self.connected:
             try:
-                self.sio.emit('message', payload)
+                if self.codec == 'msgpack':
+                    self.sio.emit('message_bin', msgpack.packb(payload, use_bin_type=True))
+                else:
+                    self.sio.emit('message', payload)
             except Exception as e:
                 logger.error(f"Failed to emit {event_type}: {e}")
         else:
@@ -74,19 +161,32 @@ class BusClient:
     def run_forever(self):
         """Connect and keep running (blocking)."""
         self.connect()
-        self.sio.wait()
+        if self.transport == 'local':
+            self._closed.wait()
+        else:
+            self.sio.wait()
 
     def connect(self):
         """Connect to the bus with retry logic."""
+        if self.local is not False and LocalBus.instance().serves(self.host, self.port):
+            self._connect_local()
+            return
+
         url = f"http://{self.host}:{self.port}"
-        print(f"DEBUG: BusClient connecting to {url}")
+        logger.debug(f"[{self.name}] BusClient connecting to {url} ({self.transports})")
         
         while not self.connected:
             try:
-                # Force polling because server is running in threading mode (no websockets)
-                self.sio.connect(url, transports=['polling'], wait_timeout=5)
+                # El servidor corre con eventlet: websocket disponible. Si falla (proxy, servidor
+                # en modo threading...) se reintenta con long-polling.
+                try:
+                    self.sio.connect(url, transports=self.transports, wait_timeout=5)
+                except socketio.exceptions.ConnectionError:
+                    if self.transports == ['polling']:
+                        raise
+                    logger.debug(f"[{self.name}] Websocket no disponible, usando polling.")
+                    self.sio.connect(url, transports=['polling'], wait_timeout=5)
                 # If we get here, connection successful (event handler sets self.connected)
-                # self.connected = True # Let the event handler do this
                 break 
             except Exception as e:
                 if self.host != 'localhost': # Only log errors for remote connections to avoid local spam during startup
@@ -96,7 +196,26 @@ class BusClient:
                     logger.debug(f"Connection failed ({url}): {e}. Retrying in 5s...")
                 time.sleep(5)
 
+    def _connect_local(self):
+        """Servidor del bus en este proceso: entrega en memoria con el mismo API on/emit."""
+        self.transport = 'local'
+        self.codec = 'local'
+        self._local_inbox = PolicyQueue(f"bus.local.{self.name}", classify_bus_message, BUS_CLASSES)
+        self._closed.clear()
+        self.connected = True
+        LocalBus.instance().join(self)
+        threading.Thread(target=local_dispatch_loop, args=(self,), daemon=True,
+                         name=f"Bus_{self.name}").start()
+        logger.info(f"[{self.name}] Connected to Message Bus (in-process)")
+        self.emit(f"{self.name}.connected", {})
+
     def close(self):
+        if self.transport == 'local':
+            LocalBus.instance().leave(self)
+            self.connected = False
+            self._local_inbox.put(None)
+            self._closed.set()
+            return
         self.sio.disconnect()
 
 if __name__ == "__main__":
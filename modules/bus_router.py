@@ -0,0 +1,192 @@
+import logging
+import threading
+
+from flask import request
+
+from modules.local_bus import topic_matches
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    msgpack = None
+    MSGPACK_AVAILABLE = False
+
+logger = logging.getLogger("BusRouter")
+
+# Eventos Socket.IO del bus
+EVENT_JSON = 'message'       # Payload dict (JSON), lo entienden navegadores y clientes antiguos
+EVENT_BINARY = 'message_bin' # Payload msgpack (bytes), negociado por conexión
+EVENT_HELLO = 'bus:hello'    # Negociación: el cliente ofrece codecs, el servidor elige
+EVENT_SUBSCRIBE = 'bus:subscribe'
+EVENT_UNSUBSCRIBE = 'bus:unsubscribe'
+
+def pack(payload):
+    return msgpack.packb(payload, use_bin_type=True)
+
+def unpack(data):
+    return msgpack.unpackb(data, raw=False)
+
+class BusRouter:
+    """
+    Enrutado del bus de mensajes en el servidor Socket.IO (compartido por MessageBus y web_admin).
+    - Cada conexión negocia su codec ('json' por defecto, 'msgpack' si ambos lo soportan).
+    - Cada conexión declara los topics que le interesan (bus:hello / bus:subscribe / bus:unsubscribe);
+      solo se le reenvían esos. Los clientes que no declaran nada reciben `default_topics`.
+    - El payload se serializa una sola vez por codec y se reparte a los suscritos.
+    - Contadores por topic (recibidos / entregados).
+    - Si hay un LocalBus adjunto (clientes en el mismo proceso), también se les entrega en memoria.
+    """
+
+    def __init__(self, socketio, include_self=False, default_topics=None):
+        self.socketio = socketio
+        self.include_self = include_self
+        self.default_topics = list(default_topics or ['*'])
+        self.clients = {} # sid -> {'name': str, 'codec': 'json'|'msgpack', 'topics': [patterns]}
+        self.topic_stats = {} # topic -> {'received': n, 'delivered': n}
+        self._route_cache = {} # topic -> [(sid, codec)] (se invalida al cambiar suscripciones)
+        self._lock = threading.Lock()
+        self.local_bus = None # Lo asigna LocalBus.attach_server()
+        self._disconnect_listeners = [] # callback(sid): Socket.IO admite un solo handler 'disconnect'
+
+    def add_disconnect_listener(self, callback):
+        """Otros módulos que necesitan la desconexión (p.ej. seguimiento de logs) se enganchan aquí."""
+        self._disconnect_listeners.append(callback)
+
+    def register(self):
+        """Instala los handlers Socket.IO del bus."""
+        self.socketio.on_event('connect', self.handle_connect)
+        self.socketio.on_event('disconnect', self.handle_disconnect)
+        self.socketio.on_event(EVENT_HELLO, self.handle_hello)
+        self.socketio.on_event(EVENT_SUBSCRIBE, self.handle_subscribe)
+        self.socketio.on_event(EVENT_UNSUBSCRIBE, self.handle_unsubscribe)
+        self.socketio.on_event(EVENT_JSON, self.handle_message)
+        self.socketio.on_event(EVENT_BINARY, self.handle_binary)
+        return self
+
+    # --- Handlers ---
+
+    def handle_connect(self, auth=None):
+        with self._lock:
+            self.clients[request.sid] = {'name': None, 'codec': 'json', 'topics': list(self.default_topics)}
+            self._route_cache.clear()
+
+    def handle_disconnect(self, *args):
+        sid = request.sid
+        with self._lock:
+            self.clients.pop(sid, None)
+            self._route_cache.clear()
+        for callback in self._disconnect_listeners:
+            try:
+                callback(sid)
+            except Exception as e:
+                logger.error(f"Error en listener de desconexión: {e}")
+
+    def handle_hello(self, data):
+        """
+        Un BusClient se presenta: {'name': ..., 'codecs': ['msgpack', 'json'], 'topics': [...]}.
+        Retorna el codec elegido (ack).
+        """
+        data = data or {}
+        offered = data.get('codecs', ['json'])
+        codec = 'msgpack' if ('msgpack' in offered and MSGPACK_AVAILABLE) else 'json'
+        topics = data.get('topics')
+        with self._lock:
+            self.clients[request.sid] = {
+                'name': data.get('name'),
+                'codec': codec,
+                'topics': list(topics) if topics is not None else list(self.default_topics)
+            }
+            self._route_cache.clear()
+        logger.info(f"Bus client '{data.get('name')}' conectado (codec: {codec}, topics: {topics}).")
+        return {'codec': codec}
+
+    def handle_subscribe(self, data):
+        """{'topics': [...]} añade suscripciones; con 'replace': True sustituye las actuales."""
+        data = data or {}
+        topics = [t for t in data.get('topics', []) if isinstance(t, str)]
+        with self._lock:
+            client = self.clients.get(request.sid)
+            if client is None:
+                return
+            if data.get('replace'):
+                client['topics'] = topics
+            else:
+                client['topics'] = [t for t in client['topics'] if t not in topics] + topics
+            self._route_cache.clear()
+            return {'topics': client['topics']}
+
+    def handle_unsubscribe(self, data):
+        data = data or {}
+        topics = set(data.get('topics', []))
+        with self._lock:
+            client = self.clients.get(request.sid)
+            if client is None:
+                return
+            client['topics'] = [t for t in client['topics'] if t not in topics]
+            self._route_cache.clear()
+            return {'topics': client['topics']}
+
+    def handle_message(self, data):
+        """
+        Mensaje JSON. Estructura esperada:
+        {
+            "type": "event.name",
+            "data": { ... }
+        }
+        """
+        if isinstance(data, dict):
+            self.route(data, sender=request.sid)
+
+    def handle_binary(self, data):
+        try:
+            payload = unpack(data)
+        except Exception as e:
+            logger.warning(f"Mensaje binario inválido descartado: {e}")
+            return
+        self.route(payload, sender=request.sid)
+
+    # --- Reparto ---
+
+    def route(self, payload, sender=None, local=True):
+        """
+        Reparte un mensaje a los clientes suscritos a su topic, cada uno en su codec.
+        local=False cuando el mensaje viene del LocalBus (los clientes locales ya lo tienen).
+        """
+        topic = str(payload.get('type', 'unknown'))
+        with self._lock:
+            subscribers = self._route_cache.get(topic)
+            if subscribers is None:
+                subscribers = [(sid, info['codec']) for sid, info in self.clients.items()
+                               if topic_matches(topic, info['topics'])]
+                self._route_cache[topic] = subscribers
+            targets = [t for t in subscribers if self.include_self or t[0] != sender]
+
+            stats = self.topic_stats.get(topic)
+            if stats is None:
+                stats = self.topic_stats[topic] = {'received': 0, 'delivered': 0}
+            stats['received'] += 1
+            stats['delivered'] += len(targets)
+
+        encoded = {}
+        for sid, codec in targets:
+            if codec == 'msgpack':
+                if 'msgpack' not in encoded:
+                    encoded['msgpack'] = pack(payload)
+                self.socketio.emit(EVENT_BINARY, encoded['msgpack'], to=sid)
+            else:
+                self.socketio.emit(EVENT_JSON, payload, to=sid)
+
+        if local and self.local_bus:
+            delivered = self.local_bus.deliver(payload)
+            with self._lock:
+                stats['delivered'] += delivered
+
+    def get_stats(self):
+        """Clientes con sus suscripciones y contadores por topic."""
+        with self._lock:
+            return {
+                'clients': [{'name': info['name'] or sid, 'codec': info['codec'], 'topics': list(info['topics'])}
+                            for sid, info in self.clients.items()],
+                'topics': {topic: dict(stats) for topic, stats in self.topic_stats.items()}
+            }
@@ -1,7 +1,11 @@
 import logging
+import time
 from modules.logger import app_logger
 from modules.knowledge_base import KnowledgeBase
 from modules.sentiment import SentimentManager
+from modules.config_manager import ConfigManager
+from modules.response_cache import ResponseCache
+from modules.ai_engine import BUSY_RESPONSE
 
 class ChatManager:
     def __init__(self, ai_engine):
@@ -10,6 +14,13 @@ class ChatManager:
         self.brain = None # Injected later
         self.knowledge_base = KnowledgeBase() # Initialize RAG
         self.sentiment_manager = SentimentManager()
+
+        # Semantic Response Cache (preguntas repetidas -> sin generar)
+        cache_config = ConfigManager().get('ai_cache', {})
+        if cache_config.get('enabled', True):
+            self.response_cache = ResponseCache.from_config(self.knowledge_base, cache_config)
+        else:
+            self.response_cache = None
         
         # System Prompt Base
         self.base_system_prompt = (
@@ -25,30 +36,89 @@ class ChatManager:
 
     def get_response(self, user_input, system_context=None):
         """Genera una respuesta completa (bloqueante)."""
-        prompt = self._build_prompt(user_input, system_context)
-        return self.ai_engine.generate_response(prompt)
+        cacheable = self._is_cacheable(user_input, system_context)
+        embedding, cached = self._cache_lookup(user_input) if cacheable else (None, None)
+        if cached is not None:
+            return cached
+
+        prompt = self._build_prompt(user_input, system_context, query_embedding=embedding)
+        start = time.time()
+        response = self.ai_engine.generate_response(prompt)
+        if cacheable:
+            self._cache_store(user_input, response, time.time() - start, embedding)
+        return response
 
     def get_response_stream(self, user_input, system_context=None):
         """Genera una respuesta en streaming."""
-        prompt = self._build_prompt(user_input, system_context)
-        return self.ai_engine.generate_response_stream(prompt)
+        cacheable = self._is_cacheable(user_input, system_context)
+        embedding, cached = self._cache_lookup(user_input) if cacheable else (None, None)
+        if cached is not None:
+            return iter([cached])
+
+        prompt = self._build_prompt(user_input, system_context, query_embedding=embedding)
+        stream = self.ai_engine.generate_response_stream(prompt)
+        if not cacheable:
+            return stream
+        return self._caching_stream(user_input, stream, embedding)
+
+    # --- Semantic Response Cache ---
+
+    def _is_cacheable(self, user_input, system_context):
+        # Solo preguntas "puras": la clave de la caché es el texto del usuario, así que no vale si el
+        # prompt depende de algo más (salida de comandos, historial de la conversación o tono detectado).
+        if self.response_cache is None or system_context or self.context_history:
+            return False
+        return not self._sentiment_modifier(user_input)
 
-    def _build_prompt(self, user_input, system_context=None):
+    def _cache_lookup(self, user_input):
+        """Retorna (embedding, respuesta_cacheada). El embedding se reutiliza para el RAG."""
+        try:
+            embedding = self.response_cache.embed(user_input)
+            return embedding, self.response_cache.lookup(user_input, embedding)
+        except Exception as e:
+            app_logger.error(f"Error consultando caché de respuestas: {e}")
+            return None, None
+
+    def _cache_store(self, user_input, response, gen_time, embedding):
+        # No cachear respuestas de error (modelo no cargado, excepción...)
+        if not self.ai_engine.is_ready or self.ai_engine.last_failed or response == BUSY_RESPONSE:
+            return
+        try:
+            self.response_cache.store(user_input, response, gen_time, embedding)
+        except Exception as e:
+            app_logger.error(f"Error guardando en caché de respuestas: {e}")
+
+    def _caching_stream(self, user_input, stream, embedding):
+        """Reenvía el stream y, si termina bien, guarda la respuesta completa."""
+        start = time.time()
+        chunks = []
+        try:
+            for chunk in stream:
+                chunks.append(chunk)
+                yield chunk
+        finally:
+            stream.close() # Si se abandona el wrapper, el stream interno libera el modelo ya
+        self._cache_store(user_input, "".join(chunks).strip(), time.time() - start, embedding)
+
+    def _sentiment_modifier(self, user_input):
+        """Instrucción extra del system prompt según el tono del usuario ('' si es neutro)."""
+        sentiment, _ = self.sentiment_manager.analyze(user_input)
+        if sentiment == 'angry':
+            return " EL USUARIO ESTÁ ENFADADO. No te disculpes. Ponte chulo."
+        if sentiment == 'positive':
+            return " EL USUARIO ESTÁ CONTENTO. Sé entusiasta."
+        return ""
+
+    def _build_prompt(self, user_input, system_context=None, query_embedding=None):
         """Construye el prompt con historial, contexto RAG y personalidad para Gemma 2."""
         
         # 0. Sentiment Analysis
-        sentiment, _ = self.sentiment_manager.analyze(user_input)
-        current_system_prompt = self.base_system_prompt
-        
-        if sentiment == 'angry':
-            current_system_prompt += " EL USUARIO ESTÁ ENFADADO. No te disculpes. Ponte chulo."
-        elif sentiment == 'positive':
-            current_system_prompt += " EL USUARIO ESTÁ CONTENTO. Sé entusiasta."
+        current_system_prompt = self.base_system_prompt + self._sentiment_modifier(user_input)
         
         # 1. Retrieve RAG Context
         rag_context = ""
         try:
-            docs = self.knowledge_base.query(user_input)
+            docs = self.knowledge_base.query(user_input, query_embedding=query_embedding)
             if docs:
                 rag_context = "\nCONTEXTO TÉCNICO (Documentación):\n" + "\n---\n".join(docs) + "\n"
         except Exception as e:
@@ -213,6 +213,18 @@ class DatabaseManager:
         )
         return cursor.fetchall()
 
+    def get_frequent_responses(self, limit=30):
+        """Respuestas más repetidas del historial (candidatas a pre-renderizar en la caché TTS)."""
+        conn = self.get_connection()
+        cursor = conn.execute(
+            """SELECT neo_response, COUNT(*) AS uses FROM interactions
+               WHERE neo_response IS NOT NULL AND neo_response != ''
+               GROUP BY neo_response HAVING uses > 1
+               ORDER BY uses DESC LIMIT ?""",
+            (limit,)
+        )
+        return [row[0] for row in cursor.fetchall()]
+
     def add_fact(self, key, value):
         conn = self.get_connection()
         try:
@@ -0,0 +1,100 @@
+import time
+import logging
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from modules.metrics_registry import DEADLINE_MISSES
+from modules import tracing
+
+logger = logging.getLogger("Deadline")
+
+# Plazos por defecto (segundos) de cada etapa de handle_command; `total` es el presupuesto de la frase
+DEFAULT_BUDGET = {
+    'total': 8.0,
+    'router': 1.0,
+    'specialist_model': 4.0,
+    'validate': 1.0,
+    'chat': 5.0,
+}
+
+MISSED = object() # Resultado de run() sin fallback cuando la etapa agota su plazo
+
+# Pocos hilos: una etapa atascada ocupa el suyo hasta terminar; si se agotan, las siguientes
+# esperan en la cola del pool y consumen su plazo (acaban en fallback, no bloquean la frase)
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="Stage")
+_miss_lock = threading.Lock()
+_misses = {} # etapa -> número de plazos incumplidos
+
+def get_deadline_misses():
+    with _miss_lock:
+        return dict(_misses)
+
+def _count_miss(stage, started, timeout):
+    with _miss_lock:
+        _misses[stage] = _misses.get(stage, 0) + 1
+    DEADLINE_MISSES.inc(stage=stage)
+    tracing.record_span(f"deadline:{stage}", started, time.time(), timeout=round(timeout, 3))
+
+class LatencyBudget:
+    """
+    Presupuesto de latencia de una frase, repartido en plazos por etapa.
+    El plazo efectivo de una etapa es el menor entre el suyo y lo que queda del total,
+    así que una etapa lenta recorta a las siguientes en vez de sumarse.
+    """
+
+    def __init__(self, total=DEFAULT_BUDGET['total'], stages=None):
+        self.total = total
+        self.stages = dict(stages or {})
+        self.started = time.monotonic()
+
+    @classmethod
+    def from_config(cls, config):
+        """Desde la sección `latency_budget` (claves ausentes toman DEFAULT_BUDGET)."""
+        values = dict(DEFAULT_BUDGET, **(config or {}))
+        total = values.pop('total')
+        return cls(total, values)
+
+    def remaining(self):
+        return max(0.0, self.total - (time.monotonic() - self.started))
+
+    def deadline(self, stage):
+        limit = self.stages.get(stage)
+        remaining = self.remaining()
+        return remaining if limit is None else min(limit, remaining)
+
+    def run(self, stage, fn, fallback=None, on_late=None):
+        """
+        Ejecuta fn() con el plazo de la etapa.
+        - Si termina a tiempo devuelve su resultado (las excepciones se propagan igual).
+        - Si no, cuenta el incumplimiento y devuelve fallback() (o MISSED) sin esperar más;
+          fn sigue en segundo plano y, si se indica, on_late(resultado) recibe la respuesta tardía.
+        """
+        timeout = self.deadline(stage)
+        started = time.time()
+        if timeout <= 0:
+            logger.warning(f"Presupuesto agotado antes de la etapa '{stage}': usando fallback.")
+            _count_miss(stage, started, timeout)
+            return fallback() if fallback else MISSED
+
+        # La etapa corre en el contexto actual (traza y span abiertos)
+        future = _executor.submit(contextvars.copy_context().run, fn)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeout:
+            logger.warning(f"Etapa '{stage}' sin respuesta en {timeout:.2f}s: usando fallback.")
+            _count_miss(stage, started, timeout)
+            if on_late:
+                future.add_done_callback(lambda f: _deliver_late(stage, f, on_late))
+            return fallback() if fallback else MISSED
+
+def _deliver_late(stage, future, on_late):
+    try:
+        result = future.result()
+    except Exception as e:
+        logger.error(f"Etapa '{stage}' terminó tarde con error: {e}")
+        return
+    try:
+        on_late(result)
+    except Exception as e:
+        logger.error(f"Error entregando el resultado tardío de '{stage}': {e}")
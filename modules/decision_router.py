@@ -1,6 +1,7 @@
 import logging
 from functools import lru_cache
 from modules.logger import app_logger
+from modules.metrics_registry import timed, ROUTER_PREDICT
 
 # Fallback si no está transformers
 try:
@@ -66,6 +67,7 @@ class DecisionRouter:
             app_logger.error(f"Error en Router Predict: {e}")
             return None, 0.0
 
+    @timed(ROUTER_PREDICT)
     def predict(self, text):
         """
         Clasifica el texto de entrada usando el modelo.
@@ -0,0 +1,309 @@
+import queue
+import time
+import threading
+import logging
+from collections import deque
+
+logger = logging.getLogger("EventQueue")
+
+# Políticas por clase de mensaje
+NEVER_DROP = 'never_drop'   # Alertas y voz: nunca se descartan
+DROP_OLDEST = 'drop_oldest' # Telemetría: al superar el límite se descarta la más antigua de su clase
+COALESCE = 'coalesce'       # Estado: solo cuenta el último valor por clave (sustituye al pendiente)
+
+# Carriles de prioridad (menor = más urgente). get() atiende siempre el carril más urgente con items.
+PRIORITIES = {'critical': 0, 'high': 1, 'normal': 2, 'low': 3}
+PRIORITY_NAMES = {level: name for name, level in PRIORITIES.items()}
+
+class MessageClass:
+    def __init__(self, name, policy=NEVER_DROP, limit=None, priority='normal'):
+        self.name = name
+        self.policy = policy
+        self.limit = limit
+        self.priority = PRIORITIES[priority]
+
+class PolicyQueue:
+    """
+    Cola acotada con política por clase de mensaje (API compatible con queue.Queue).
+    `classify(item)` devuelve (clase, clave); la clave solo se usa para COALESCE.
+    put() nunca bloquea: la presión se resuelve descartando o fusionando según la clase.
+    Cada item va al carril de prioridad de su clase, salvo que `priority_of(item)` o
+    put(priority=...) indiquen otra; dentro de un carril el orden es FIFO.
+    """
+
+    def __init__(self, name, classify, classes, default_class='default', priority_of=None):
+        self.name = name
+        self.classify = classify
+        self.priority_of = priority_of
+        self.classes = {c.name: c for c in classes}
+        self.default_class = default_class
+        if default_class not in self.classes:
+            self.classes[default_class] = MessageClass(default_class, DROP_OLDEST, 500)
+
+        self._lanes = {level: deque() for level in PRIORITY_NAMES} # Slots [item, clase, vivo, prioridad, t_put]
+        self._by_class = {name: deque() for name in self.classes}
+        self._pending_keys = {} # (clase, clave) -> slot pendiente (COALESCE)
+        self._dead = {level: 0 for level in PRIORITY_NAMES} # Slots descartados aún en su carril
+        self._size = 0
+        self._unfinished = 0
+        self._cond = threading.Condition()
+        self._all_done = threading.Condition(self._cond)
+
+        self.stats = {name: {'put': 0, 'dropped': 0, 'coalesced': 0, 'max_depth': 0} for name in self.classes}
+        self.waits = {level: deque(maxlen=500) for level in PRIORITY_NAMES} # Tiempo en cola por prioridad
+        register_queue(self)
+
+    # --- API queue.Queue ---
+
+    def put(self, item, block=True, timeout=None, priority=None):
+        cls_name, key = self._classify(item)
+        msg_class = self.classes[cls_name]
+        stats = self.stats[cls_name]
+        level = self._priority(item, msg_class, priority)
+
+        with self._cond:
+            stats['put'] += 1
+
+            if msg_class.policy == COALESCE:
+                slot = self._pending_keys.get((cls_name, key))
+                if slot is not None and slot[2]:
+                    slot[0] = item # El último valor sustituye al pendiente (mantiene su turno)
+                    stats['coalesced'] += 1
+                    return
+
+            slot = [item, cls_name, True, level, time.monotonic()]
+            self._lanes[level].append(slot)
+            self._by_class[cls_name].append(slot)
+            self._size += 1
+            self._unfinished += 1
+            if msg_class.policy == COALESCE:
+                self._pending_keys[(cls_name, key)] = slot
+
+            if msg_class.policy == DROP_OLDEST and msg_class.limit:
+                lane = self._by_class[cls_name]
+                while len(lane) > msg_class.limit:
+                    oldest = lane.popleft()
+                    oldest[0] = None # Libera el payload ya; el slot se retira de su carril en get() o al compactar
+                    oldest[2] = False
+                    self._dead[oldest[3]] += 1
+                    self._size -= 1
+                    self._unfinished -= 1
+                    stats['dropped'] += 1
+                    if stats['dropped'] % 100 == 1:
+                        logger.warning(f"Cola '{self.name}': descartando '{cls_name}' (límite {msg_class.limit}).")
+                self._compact(level)
+
+            depth = len(self._by_class[cls_name])
+            if depth > stats['max_depth']:
+                stats['max_depth'] = depth
+            self._cond.notify()
+
+    def put_nowait(self, item):
+        self.put(item, block=False)
+
+    def get(self, block=True, timeout=None):
+        return self.get_with_priority(block, timeout)[0]
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+    def get_with_priority(self, block=True, timeout=None):
+        """Como get(), pero retorna (item, nombre_de_prioridad)."""
+        with self._cond:
+            if not block:
+                if not self._size:
+                    raise queue.Empty
+            elif timeout is None:
+                while not self._size:
+                    self._cond.wait()
+            elif not self._cond.wait_for(lambda: self._size > 0, timeout):
+                raise queue.Empty
+            slot = self._pop()
+            return slot[0], PRIORITY_NAMES[slot[3]]
+
+    def discard_below(self, priority):
+        """Retira los items pendientes menos urgentes que `priority` (cuentan como terminados). Retorna cuántos."""
+        level = PRIORITIES[priority]
+        removed = 0
+        with self._cond:
+            for lane_level, lane in self._lanes.items():
+                if lane_level <= level:
+                    continue
+                for slot in lane:
+                    if slot[2]:
+                        slot[0] = None
+                        slot[2] = False
+                        self._by_class[slot[1]].remove(slot)
+                        self.stats[slot[1]]['dropped'] += 1
+                        removed += 1
+                lane.clear()
+                self._dead[lane_level] = 0
+            self._size -= removed
+            self._unfinished = max(0, self._unfinished - removed)
+            if self._unfinished == 0:
+                self._all_done.notify_all()
+        return removed
+
+    def qsize(self):
+        with self._cond:
+            return self._size
+
+    def empty(self):
+        return self.qsize() == 0
+
+    def task_done(self):
+        with self._cond:
+            if self._unfinished > 0:
+                self._unfinished -= 1
+            if self._unfinished == 0:
+                self._all_done.notify_all()
+
+    def join(self):
+        with self._cond:
+            while self._unfinished:
+                self._all_done.wait()
+
+    # --- Métricas ---
+
+    def get_stats(self):
+        def summary(values):
+            if not values:
+                return {'count': 0, 'avg': None, 'p95': None, 'max': None}
+            ordered = sorted(values)
+            return {
+                'count': len(ordered),
+                'avg': round(sum(ordered) / len(ordered), 4),
+                'p95': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 4),
+                'max': round(ordered[-1], 4)
+            }
+        with self._cond:
+            return {
+                'depth': self._size,
+                'classes': {
+                    name: dict(stats, depth=len(self._by_class[name]), policy=self.classes[name].policy,
+                               limit=self.classes[name].limit, priority=PRIORITY_NAMES[self.classes[name].priority])
+                    for name, stats in self.stats.items()
+                },
+                'wait': {PRIORITY_NAMES[level]: summary(values) for level, values in self.waits.items()}
+            }
+
+    # --- Internos ---
+
+    def _classify(self, item):
+        try:
+            cls_name, key = self.classify(item)
+        except Exception:
+            cls_name, key = self.default_class, None
+        if cls_name not in self.classes:
+            cls_name = self.default_class
+        return cls_name, key
+
+    def _priority(self, item, msg_class, priority):
+        if priority is None and self.priority_of:
+            try:
+                priority = self.priority_of(item)
+            except Exception:
+                priority = None
+        return PRIORITIES.get(priority, msg_class.priority)
+
+    def _pop(self):
+        """Saca el siguiente slot vivo del carril más urgente (llamar con el lock)."""
+        slot = None
+        for level in sorted(self._lanes):
+            lane = self._lanes[level]
+            while lane:
+                candidate = lane.popleft()
+                if candidate[2]:
+                    slot = candidate
+                    break
+                self._dead[level] -= 1
+            if slot:
+                break
+        lane = self._by_class[slot[1]]
+        if lane and lane[0] is slot:
+            lane.popleft()
+        else:
+            lane.remove(slot)
+        slot[2] = False
+        self._size -= 1
+        self.waits[slot[3]].append(time.monotonic() - slot[4])
+        return slot
+
+    def _compact(self, level, threshold=64):
+        """Retira los slots muertos de un carril cuando superan a los vivos (llamar con el lock)."""
+        lane = self._lanes[level]
+        if self._dead[level] < threshold or self._dead[level] < len(lane) // 2:
+            return
+        self._lanes[level] = deque(slot for slot in lane if slot[2])
+        self._dead[level] = 0
+
+# --- Registro de colas (profundidad y descartes exportables) ---
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+def register_queue(q):
+    with _registry_lock:
+        _registry[q.name] = q
+
+def get_queue_stats():
+    with _registry_lock:
+        queues = list(_registry.values())
+    return {q.name: q.get_stats() for q in queues}
+
+# --- Clasificadores de las colas del sistema ---
+
+# Centinela de parada (None): clase propia que nunca se descarta y se atiende antes que nada
+CONTROL_CLASS = MessageClass('control', NEVER_DROP, priority='critical')
+
+EVENT_CLASSES = [
+    CONTROL_CLASS,
+    MessageClass('speech', NEVER_DROP, priority='high'),
+    MessageClass('alert', NEVER_DROP, priority='critical'),
+    MessageClass('status', COALESCE, priority='normal'),
+    MessageClass('telemetry', DROP_OLDEST, 50, priority='low'),
+    MessageClass('default', DROP_OLDEST, 500, priority='normal'),
+]
+
+def event_priority(item):
+    """Prioridad explícita del evento (p.ej. Guard: 'priority': 'critical')."""
+    return item.get('priority') if item is not None else None
+
+def classify_event(item):
+    """Clasificación de NeoCore.event_queue por 'type'."""
+    if item is None:
+        return 'control', None
+    msg_type = item.get('type')
+    if msg_type == 'speak':
+        return 'speech', None
+    if msg_type == 'mqtt_alert':
+        return 'alert', None
+    if msg_type in ('speaker_status', 'mqtt_status', 'vision_wake'):
+        return 'status', msg_type
+    if msg_type == 'mqtt_telemetry':
+        return 'telemetry', item.get('agent')
+    return 'default', None
+
+BUS_CLASSES = [
+    CONTROL_CLASS,
+    MessageClass('speech', NEVER_DROP),
+    MessageClass('alert', NEVER_DROP),
+    MessageClass('status', COALESCE),
+    MessageClass('telemetry', DROP_OLDEST, 200),
+    MessageClass('default', DROP_OLDEST, 1000),
+]
+
+def classify_bus_message(payload):
+    """Clasificación de los mensajes del bus por topic."""
+    if payload is None:
+        return 'control', None
+    topic = str(payload.get('type', ''))
+    if topic.startswith('speak') or topic == 'command:inject':
+        return 'speech', None
+    if 'alert' in topic:
+        return 'alert', None
+    if topic.endswith(':status') or topic.endswith('.update'):
+        return 'status', topic
+    if topic == 'recognizer_loop:audio' or 'telemetry' in topic:
+        return 'telemetry', None
+    return 'default', None
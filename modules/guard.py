@@ -6,6 +6,7 @@ import os
 import psutil
 from collections import deque
 from modules.virus_scanner import VirusScanner
+from modules.metrics_sampler import MetricsSampler
 
 logger = logging.getLogger("NeoGuard")
 
@@ -94,8 +95,9 @@ class Guard:
         current_time = time.time()
         
         # Recolectar métricas una vez
-        cpu_pct = psutil.cpu_percent(interval=None)
-        mem_pct = psutil.virtual_memory().percent
+        snapshot = MetricsSampler.instance().snapshot()
+        cpu_pct = snapshot.cpu_percent
+        mem_pct = snapshot.ram_percent
         
         # Contar conexiones SYN_SENT para DDoS
         syn_sent = 0
@@ -1,10 +1,11 @@
 import os
-import json
 import time
 import threading
 import logging
-from datetime import datetime
 from modules.sysadmin import SysAdminManager
+from modules.metrics_store import MetricsStore
+from modules.systemd_units import UnitMonitor, is_down, is_installed
+from modules.incident_store import IncidentStore
 
 # Configure Logging
 logger = logging.getLogger("HealthManager")
@@ -14,11 +15,16 @@ class HealthManager:
     Gestor de Auto-curación y Mantenimiento Predictivo.
     - Reactivo: Detecta servicios caídos y los reinicia.
     - Predictivo: Aprende patrones de fallo basándose en historial.
+    El estado de los servicios llega de un UnitMonitor (una consulta `systemctl show` para todos):
+    una caída se atiende en cuanto se detecta la transición y el bucle solo reintenta.
+    `systemd_backend` permite inyectar un FakeSystemdBackend en pruebas.
     """
     
-    def __init__(self, config_manager):
+    def __init__(self, config_manager, systemd_backend=None):
         self.config = config_manager
         self.sys_admin = SysAdminManager()
+        self.systemd_backend = systemd_backend or self.sys_admin.systemd
+        self.metrics_store = MetricsStore.instance()
         self.running = False
         self.thread = None
         
@@ -38,36 +44,42 @@ class HealthManager:
             # 'bluetooth', 'avahi-daemon'           # Hardware/Discovery (Disabled: unsupported env)
         ]
         
-        # Historial de incidentes
-        self.history_file = 'data/health_history.json'
-        self.incident_history = self._load_history()
+        # Historial de incidentes (SQLite, contadores de 24 h actualizados al insertar)
+        self.incidents = IncidentStore.instance()
         
         # Configuración de recuperación
         self.recovery_attempts = {} # {service: count}
         self.max_attempts = 3
         self.cooldown_window = 300 # 5 minutos para resetear intentos
+        self.retry_interval = 30 # Reintento de recuperación mientras siga caído
         self.last_recovery_time = {} # {service: timestamp}
+        self._recovery_lock = threading.Lock() # Transiciones (hilo del monitor) y reintentos (bucle)
+        self.unit_monitor = None
 
     def start(self):
         """Inicia el hilo de monitorización."""
         if self.running: return
         
         # Check for systemd (Fix for Distrobox/Containers)
-        if not os.path.exists("/run/systemd/system"):
+        if not os.path.exists("/run/systemd/system") and self.systemd_backend is self.sys_admin.systemd:
             logger.warning("Systemd not detected (Container/Distrobox?). Disabling service auto-healing.")
             self.monitored_services = []
         else:
-            # Filter services that are not installed
-            valid_services = []
+            # Filter services that are not installed (una sola consulta para todos)
+            states = self.systemd_backend.query(self.monitored_services)
             for srv in self.monitored_services:
-                if self.sys_admin.is_service_installed(srv):
-                    valid_services.append(srv)
-                else:
+                if not is_installed(states.get(srv)):
                     logger.info(f"ℹ️ Skipping {srv}: Service not found on system.")
-            self.monitored_services = valid_services
+            self.monitored_services = [srv for srv in self.monitored_services if is_installed(states.get(srv))]
             
         logger.info(f"HealthManager checking: {self.monitored_services}")
 
+        if self.monitored_services:
+            interval = (self.config.get('health', {}) or {}).get('poll_interval', 5.0)
+            self.unit_monitor = UnitMonitor(self.monitored_services, backend=self.systemd_backend, interval=interval)
+            self.unit_monitor.add_listener(self._on_unit_change)
+            self.unit_monitor.start()
+
         self.running = True
         self.thread = threading.Thread(target=self._monitor_loop, daemon=True)
         self.thread.start()
@@ -76,6 +88,8 @@ class HealthManager:
     def stop(self):
         """Detiene la monitorización."""
         self.running = False
+        if self.unit_monitor:
+            self.unit_monitor.stop()
         if self.thread:
             self.thread.join()
 
@@ -94,32 +108,37 @@ class HealthManager:
                 
             time.sleep(30) # Comprobar cada 30 segundos
 
-    def _check_services(self):
-        """Comprueba el estado de los servicios críticos y actúa si fallan."""
-        # Check only specific services we care about
-        services_status = self.sys_admin.get_services(self.monitored_services) 
-
-        
-        for srv in services_status:
-            name = srv['name']
-            status = srv['status']
-            
-            # Solo nos importan los que estamos vigilando explícitamente
-            if name not in self.monitored_services and name != 'cron': # cron a veces viene por defecto
-                continue
+    def _on_unit_change(self, name, old, new):
+        """Transición de estado de una unidad (hilo del UnitMonitor): la caída se atiende al momento."""
+        if old is not None:
+            logger.info(f"Service {name}: {old.active_state} -> {new.active_state}")
+        if is_down(new):
+            # Ignore 'activating' because it might just be starting up.
+            logger.warning(f"Service DOWN detected: {name} (Status: {new.active_state})")
+            self._handle_failure(name)
 
-            if status != 'active' and status != 'activating':
-                # Ignore 'activating' because it might just be starting up.
-                logger.warning(f"Service DOWN detected: {name} (Status: {status})")
-                self._handle_failure(name)
+    def _check_services(self):
+        """Reintenta la recuperación de los servicios que siguen caídos (estado en memoria, sin procesos)."""
+        if not self.unit_monitor:
+            return
+        for name, state in self.unit_monitor.states().items():
+            if is_down(state):
+                # La primera caída ya la atendió _on_unit_change; aquí solo se reintenta
+                self._handle_failure(name, retry=True)
             else:
                 # Si está activo, reseteamos contadores si ha pasado tiempo suficiente
                 if name in self.last_recovery_time:
                     if time.time() - self.last_recovery_time[name] > self.cooldown_window:
                         self.recovery_attempts[name] = 0
 
-    def _handle_failure(self, service_name):
-        """Intenta recuperar un servicio caído."""
+    def _handle_failure(self, service_name, retry=False):
+        """Intenta recuperar un servicio caído (un reintento solo si pasó `retry_interval` desde el anterior)."""
+        with self._recovery_lock:
+            if retry and time.time() - self.last_recovery_time.get(service_name, 0) < self.retry_interval:
+                return
+            self._recover(service_name)
+
+    def _recover(self, service_name):
         attempts = self.recovery_attempts.get(service_name, 0)
         
         if attempts < self.max_attempts:
@@ -158,6 +177,9 @@ class HealthManager:
         try:
             cpu = float(self.sys_admin.get_cpu_usage().replace('%', ''))
             ram = float(self.sys_admin.get_ram_usage().replace('%', ''))
+            # Carga sostenida (media de los últimos 5 min del historial), no un pico puntual
+            cpu = self.metrics_store.mean('host.cpu', 300) or cpu
+            ram = self.metrics_store.mean('host.ram', 300) or ram
             
             # Regla Heurística 1: Alta Carga Persistente
             if cpu > 90 or ram > 90:
@@ -167,9 +189,9 @@ class HealthManager:
             # Regla Heurística 2: Patrón de fallo recurrente (Aprendizaje simple)
             # Analizamos si fallos recientes coinciden con ciertas horas o condiciones
             # Por ahora, implementación simple basada en frecuencia.
-            recent_crashes = [i for i in self.incident_history if (time.time() - i['timestamp']) < 86400 and i['event'] == 'CRASH_DETECTED']
+            recent_crashes = self.incidents.count(event='CRASH_DETECTED')
             
-            if len(recent_crashes) > 5:
+            if recent_crashes > 5:
                 logger.warning("Prediction: System instability detected. High frequency of crashes in last 24h.")
                 
         except Exception:
@@ -184,30 +206,4 @@ class HealthManager:
             'temp': self.sys_admin.get_cpu_temp()
         }
         
-        entry = {
-            'timestamp': time.time(),
-            'date': datetime.now().isoformat(),
-            'target': target,
-            'event': event,
-            'context': snapshot
-        }
-        
-        self.incident_history.append(entry)
-        self._save_history()
-
-    def _load_history(self):
-        if os.path.exists(self.history_file):
-            try:
-                with open(self.history_file, 'r') as f:
-                    return json.load(f)
-            except:
-                return []
-        return []
-
-    def _save_history(self):
-        # Asegurar directorio
-        os.makedirs(os.path.dirname(self.history_file), exist_ok=True)
-        # Guardar solo los últimos 1000 eventos para no llenar disco
-        keep = self.incident_history[-1000:]
-        with open(self.history_file, 'w') as f:
-            json.dump(keep, f, indent=4)
+        self.incidents.add(target, event, snapshot)
@@ -0,0 +1,162 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from collections import deque, Counter
+from datetime import datetime
+
+from modules.config_manager import ConfigManager
+
+logger = logging.getLogger("IncidentStore")
+
+class IncidentStore:
+    """
+    Historial de incidentes de HealthManager en una tabla SQLite indexada de solo inserción.
+    - add() es un INSERT; la retención borra por rangos de fecha (como mucho una vez por hora).
+    - Contadores móviles por (servicio, evento) de la última ventana (24 h) actualizados al insertar:
+      count() y summary() no recorren el historial.
+    - La primera vez importa el antiguo data/health_history.json.
+    """
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    @classmethod
+    def instance(cls):
+        with cls._instance_lock:
+            if cls._instance is None:
+                config = ConfigManager().get('health', {}) or {}
+                cls._instance = cls(db_path=config.get('incidents_db', 'data/health.db'),
+                                    retention_days=config.get('retention_days', 90))
+            return cls._instance
+
+    def __init__(self, db_path='data/health.db', retention_days=90, window=86400,
+                 legacy_path='data/health_history.json'):
+        self.db_path = db_path
+        self.retention_days = retention_days
+        self.window = window
+        self._lock = threading.Lock()
+        self._recent = deque() # (timestamp, target, event) dentro de la ventana, en orden
+        self._counts = Counter() # (target|None, event|None) -> incidentes en la ventana
+        self._last = None
+        self._last_cleanup = 0
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL;")
+        self.conn.execute("PRAGMA synchronous=NORMAL;")
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS incidents (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp REAL NOT NULL,
+                target TEXT NOT NULL,
+                event TEXT NOT NULL,
+                context TEXT
+            )
+        ''')
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_incidents_time ON incidents(timestamp)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_incidents_target ON incidents(target, timestamp)")
+        self.conn.commit()
+        self._import_legacy(legacy_path)
+        self._load_window()
+
+    # --- Escritura ---
+
+    def add(self, target, event, context=None, timestamp=None):
+        """Registra un incidente y actualiza los contadores de la ventana."""
+        timestamp = timestamp or time.time()
+        with self._lock:
+            cursor = self.conn.execute("INSERT INTO incidents (timestamp, target, event, context) VALUES (?, ?, ?, ?)",
+                                       (timestamp, target, event, json.dumps(context or {})))
+            self._maybe_cleanup(timestamp)
+            self.conn.commit()
+            entry = self._entry(cursor.lastrowid, timestamp, target, event, context or {})
+            self._count(timestamp, target, event, +1)
+            self._recent.append((timestamp, target, event))
+            self._last = entry
+        return entry
+
+    def _maybe_cleanup(self, now):
+        if not self.retention_days or now - self._last_cleanup < 3600:
+            return
+        self.conn.execute("DELETE FROM incidents WHERE timestamp < ?", (now - self.retention_days * 86400,))
+        self._last_cleanup = now
+
+    # --- Contadores móviles ---
+
+    def _count(self, timestamp, target, event, delta):
+        for key in ((target, event), (target, None), (None, event), (None, None)):
+            self._counts[key] += delta
+            if self._counts[key] <= 0:
+                del self._counts[key]
+
+    def _expire(self):
+        cutoff = time.time() - self.window
+        while self._recent and self._recent[0][0] < cutoff:
+            timestamp, target, event = self._recent.popleft()
+            self._count(timestamp, target, event, -1)
+
+    def count(self, event=None, target=None):
+        """Incidentes en la ventana (24 h) filtrando por evento y/o servicio."""
+        with self._lock:
+            self._expire()
+            return self._counts.get((target, event), 0)
+
+    def summary(self):
+        """Resumen para /api/health/status: total en la ventana, último incidente y caídas por servicio."""
+        with self._lock:
+            self._expire()
+            by_service = {target: n for (target, event), n in self._counts.items()
+                          if target is not None and event == 'CRASH_DETECTED'}
+            return {'recent_incidents': self._counts.get((None, None), 0),
+                    'last': self._last, 'crashes_by_service': by_service}
+
+    # --- Consulta ---
+
+    def recent(self, limit=50, target=None):
+        """Últimos incidentes (más reciente primero), por índice."""
+        query = "SELECT * FROM incidents"
+        params = []
+        if target:
+            query += " WHERE target = ?"
+            params.append(target)
+        query += " ORDER BY timestamp DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self.conn.execute(query, params).fetchall()
+        return [self._entry(r['id'], r['timestamp'], r['target'], r['event'], json.loads(r['context'] or '{}'))
+                for r in rows]
+
+    @staticmethod
+    def _entry(entry_id, timestamp, target, event, context):
+        return {'id': entry_id, 'timestamp': timestamp, 'date': datetime.fromtimestamp(timestamp).isoformat(),
+                'target': target, 'event': event, 'context': context}
+
+    # --- Arranque ---
+
+    def _load_window(self):
+        """Reconstruye los contadores de la ventana y el último incidente desde la tabla."""
+        rows = self.conn.execute("SELECT timestamp, target, event FROM incidents WHERE timestamp >= ? ORDER BY timestamp",
+                                 (time.time() - self.window,)).fetchall()
+        for r in rows:
+            self._recent.append((r['timestamp'], r['target'], r['event']))
+            self._count(r['timestamp'], r['target'], r['event'], +1)
+        last = self.recent(1)
+        self._last = last[0] if last else None
+
+    def _import_legacy(self, legacy_path):
+        if not legacy_path or not os.path.exists(legacy_path):
+            return
+        if self.conn.execute("SELECT 1 FROM incidents LIMIT 1").fetchone():
+            return
+        try:
+            with open(legacy_path, 'r') as f:
+                history = json.load(f)
+            self.conn.executemany("INSERT INTO incidents (timestamp, target, event, context) VALUES (?, ?, ?, ?)",
+                                  [(i['timestamp'], i['target'], i['event'], json.dumps(i.get('context', {})))
+                                   for i in history if 'timestamp' in i])
+            self.conn.commit()
+            logger.info(f"Importados {len(history)} incidentes de {legacy_path}.")
+        except Exception as e:
+            logger.error(f"Error importando {legacy_path}: {e}")
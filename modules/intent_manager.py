@@ -1,6 +1,7 @@
 import logging
 from modules.utils import load_json_data
 from modules.logger import app_logger
+from modules.metrics_registry import timed, INTENT_MATCH
 
 try:
     from rapidfuzz import process, fuzz
@@ -40,6 +41,7 @@ class IntentManager:
 
     from functools import lru_cache
 
+    @timed(INTENT_MATCH)
     @lru_cache(maxsize=128)
     def find_best_intent(self, command_text):
         """Busca la mejor intención usando RapidFuzz y Caché."""
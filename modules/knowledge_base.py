@@ -1,7 +1,9 @@
 import os
 import logging
 import glob
-from typing import List, Dict
+import threading
+from typing import List, Dict, Optional
+import numpy as np
 import chromadb
 from chromadb.utils import embedding_functions
 from sentence_transformers import SentenceTransformer
@@ -15,6 +17,11 @@ import transformers
 transformers.logging.set_verbosity_error()
 
 class KnowledgeBase:
+    # Contador de ingestas compartido por todas las instancias (NeoCore y Web Admin
+    # tienen la suya). Las cachés que dependen del RAG lo comparan para invalidarse.
+    _generation = 0
+    _generation_lock = threading.Lock()
+
     def __init__(self, docs_path: str = "docs", db_path: str = "database/knowledge_db"):
         self.docs_path = docs_path
         self.db_path = db_path
@@ -35,6 +42,31 @@ class KnowledgeBase:
         
         logger.info(f"KnowledgeBase initialized at {self.db_path}")
 
+    @property
+    def generation(self) -> int:
+        """Número de veces que se ha (re)ingestado la base de conocimiento."""
+        return KnowledgeBase._generation
+
+    @classmethod
+    def _bump_generation(cls):
+        with cls._generation_lock:
+            cls._generation += 1
+
+    def embed(self, text: str) -> Optional[np.ndarray]:
+        """
+        Devuelve el embedding normalizado (L2) de un texto usando el mismo modelo MiniLM
+        que la colección. Retorna None si falla.
+        """
+        try:
+            vector = np.asarray(self.embedding_fn([text])[0], dtype=np.float32)
+            norm = np.linalg.norm(vector)
+            if norm == 0:
+                return None
+            return vector / norm
+        except Exception as e:
+            logger.error(f"Error generating embedding: {e}")
+            return None
+
     def ingest_docs(self, force: bool = False):
         """
         Scans the docs directory and ingests markdown files into the vector DB.
@@ -47,6 +79,7 @@ class KnowledgeBase:
                 name=self.collection_name,
                 embedding_function=self.embedding_fn
             )
+            self._bump_generation()
 
         # Find all supported files
         extensions = ['*.md', '*.txt', '*.pdf']
@@ -97,17 +130,27 @@ class KnowledgeBase:
                 logger.error(f"Error ingesting {file_path}: {e}")
 
         logger.info(f"Ingestion complete. Total chunks: {count}")
+        if count:
+            self._bump_generation()
 
-    def query(self, query_text: str, n_results: int = 3) -> List[str]:
+    def query(self, query_text: str, n_results: int = 3, query_embedding: Optional[np.ndarray] = None) -> List[str]:
         """
         Queries the knowledge base for relevant context.
+        If query_embedding is given (e.g. already computed by the response cache),
+        it is reused instead of embedding the text again.
         Returns a list of text chunks.
         """
         try:
-            results = self.collection.query(
-                query_texts=[query_text],
-                n_results=n_results
-            )
+            if query_embedding is not None:
+                results = self.collection.query(
+                    query_embeddings=[query_embedding.tolist()],
+                    n_results=n_results
+                )
+            else:
+                results = self.collection.query(
+                    query_texts=[query_text],
+                    n_results=n_results
+                )
             
             # results['documents'] is a list of lists (one list per query)
             if results['documents'] and results['documents'][0]:
@@ -0,0 +1,93 @@
+import queue
+import logging
+import threading
+from fnmatch import fnmatchcase
+
+logger = logging.getLogger("LocalBus")
+
+LOCAL_HOSTS = ('localhost', '127.0.0.1', '0.0.0.0', '::1')
+
+def topic_matches(topic, patterns):
+    """
+    True si el topic encaja con las suscripciones: comodines estilo shell ('mic:*', '*')
+    y exclusiones con '!' ('!recognizer_loop:audio').
+    """
+    included = False
+    for pattern in patterns:
+        if pattern.startswith('!'):
+            if fnmatchcase(topic, pattern[1:]):
+                return False
+        elif not included and fnmatchcase(topic, pattern):
+            included = True
+    return included
+
+class LocalBus:
+    """
+    Transporte en memoria para BusClients que corren en el mismo proceso que el servidor
+    del bus (web_admin). Mismo API on/emit, sin HTTP/websocket ni serialización:
+    - Entre clientes locales: cola por cliente + hilo de despacho (como Socket.IO,
+      los handlers no bloquean al emisor).
+    - Hacia clientes externos: se entrega al BusRouter del servidor, que reparte por red.
+    - Desde clientes externos: el BusRouter llama a deliver() para los locales.
+    """
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    @classmethod
+    def instance(cls):
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    def __init__(self):
+        self.servers = {} # port -> BusRouter
+        self.clients = [] # BusClients locales conectados
+        self._lock = threading.Lock()
+
+    def attach_server(self, port, router):
+        """El servidor Socket.IO de este proceso se registra para que los BusClients locales lo usen."""
+        self.servers[int(port)] = router
+        router.local_bus = self
+        logger.info(f"Bus en memoria disponible para clientes del puerto {port}.")
+
+    def serves(self, host, port):
+        return host in LOCAL_HOSTS and int(port) in self.servers
+
+    def join(self, client):
+        with self._lock:
+            if client not in self.clients:
+                self.clients.append(client)
+
+    def leave(self, client):
+        with self._lock:
+            if client in self.clients:
+                self.clients.remove(client)
+
+    def publish(self, payload, sender, port):
+        """Mensaje emitido por un cliente local."""
+        router = self.servers.get(int(port))
+        include_self = router.include_self if router else False
+        self.deliver(payload, sender=None if include_self else sender)
+        if router:
+            router.route(payload, sender=None, local=False) # Solo clientes de red
+
+    def deliver(self, payload, sender=None):
+        """Entrega a los clientes locales suscritos (sin copiar ni serializar)."""
+        topic = str(payload.get('type', 'unknown'))
+        with self._lock:
+            targets = [c for c in self.clients if c is not sender and topic_matches(topic, c._topics())]
+        for client in targets:
+            client._local_inbox.put(payload)
+        return len(targets)
+
+def local_dispatch_loop(client):
+    """Hilo de despacho de un BusClient local (un hilo por cliente, handlers en orden)."""
+    while client.connected:
+        try:
+            payload = client._local_inbox.get(timeout=1.0)
+        except queue.Empty:
+            continue
+        if payload is None:
+            break
+        client._dispatch(payload)
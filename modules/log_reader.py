@@ -0,0 +1,252 @@
+import os
+import json
+import time
+import logging
+import threading
+import subprocess
+
+logger = logging.getLogger("LogReader")
+
+def tail_lines(path, count=100, block_size=8192):
+    """Últimas `count` líneas leyendo bloques hacia atrás desde EOF (sin cargar el fichero entero)."""
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        data = b''
+        while position > 0 and data.count(b'\n') <= count:
+            step = min(block_size, position)
+            position -= step
+            f.seek(position)
+            data = f.read(step) + data
+    lines = data.decode('utf-8', errors='replace').splitlines()
+    return lines[-count:] if count else []
+
+class LogIndex:
+    """
+    Índice disperso de offsets (un offset cada `stride` líneas) para paginar rangos antiguos
+    de un log sin releerlo: se amplía de forma incremental a medida que el fichero crece
+    y se reinicia si el fichero rota (cambia el inodo o encoge).
+    """
+
+    def __init__(self, path, stride=500):
+        self.path = path
+        self.stride = stride
+        self._offsets = [0] # offset del inicio de la línea i * stride
+        self._lines = 0     # líneas completas indexadas
+        self._indexed = 0   # bytes indexados
+        self._inode = None
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        st = os.stat(self.path)
+        with self._lock:
+            if st.st_ino != self._inode or st.st_size < self._indexed:
+                self._offsets, self._lines, self._indexed, self._inode = [0], 0, 0, st.st_ino
+            if st.st_size == self._indexed:
+                return self._lines
+            with open(self.path, 'rb') as f:
+                f.seek(self._indexed)
+                offset = self._indexed
+                for raw in f:
+                    if not raw.endswith(b'\n'):
+                        break # Línea a medio escribir: se indexa en la próxima llamada
+                    offset += len(raw)
+                    self._lines += 1
+                    if self._lines % self.stride == 0:
+                        self._offsets.append(offset)
+                self._indexed = offset
+            return self._lines
+
+    def read_lines(self, start, count):
+        """Líneas [start, start + count) saltando al offset indexado más cercano."""
+        with self._lock:
+            base = min(start // self.stride, len(self._offsets) - 1)
+            offset = self._offsets[base]
+        skip = start - base * self.stride
+        lines = []
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            for raw in f:
+                if skip:
+                    skip -= 1
+                    continue
+                lines.append(raw.decode('utf-8', errors='replace').rstrip('\n'))
+                if len(lines) >= count:
+                    break
+        return lines
+
+    def page(self, page=0, page_size=200):
+        """Página contada desde el final (0 = las más recientes)."""
+        total = self.refresh()
+        end = max(0, total - page * page_size)
+        start = max(0, end - page_size)
+        return {
+            'lines': self.read_lines(start, end - start) if end > start else [],
+            'page': page,
+            'page_size': page_size,
+            'total_lines': total,
+            'has_more': start > 0
+        }
+
+class LogStreamer:
+    """
+    Empuja líneas nuevas por socketio a la sala 'logs:<fuente>' (evento 'log_lines').
+    - Ficheros: seguimiento por offset (detecta rotación por inodo/tamaño).
+    - journald: un único `journalctl -f -o json`; reanuda desde el último cursor si se reinicia.
+    Un hilo por fuente, arrancado con el primer cliente que la sigue y parado cuando la deja el último.
+    """
+
+    def __init__(self, socketio, files=None, units=None, poll_interval=0.5):
+        self.socketio = socketio
+        self.files = dict(files or {})  # fuente -> ruta
+        self.units = dict(units or {})  # fuente -> unidad systemd
+        self.poll_interval = poll_interval
+        self.cursors = {}
+        self._threads = {}
+        self._stops = {} # fuente -> Event que detiene su hilo
+        self._procs = {} # fuente -> journalctl -f en curso
+        self._followers = {} # fuente -> sids que la siguen (espejo de la sala 'logs:<fuente>')
+        self._flusher = None
+        self._pending = {} # fuente -> líneas aún no enviadas
+        self._lock = threading.Lock()
+
+    def sources(self):
+        return list(self.files) + list(self.units)
+
+    def follow(self, source, sid=None):
+        """Arranca (si hace falta) el seguimiento de una fuente para el cliente `sid`. Retorna False si no existe."""
+        if source not in self.files and source not in self.units:
+            return False
+        with self._lock:
+            self._followers.setdefault(source, set()).add(sid)
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._flush_loop, daemon=True, name="LogFollow_Flush")
+                self._flusher.start()
+            if source not in self._threads:
+                target = self._follow_file if source in self.files else self._follow_journal
+                stop = threading.Event()
+                thread = threading.Thread(target=target, args=(source, stop), daemon=True, name=f"LogFollow_{source}")
+                self._threads[source] = thread
+                self._stops[source] = stop
+                thread.start()
+        return True
+
+    def unfollow(self, source, sid=None):
+        """El cliente deja la fuente; sin seguidores se para su hilo."""
+        with self._lock:
+            followers = self._followers.get(source)
+            if followers is None:
+                return
+            followers.discard(sid)
+            if followers:
+                return
+            del self._followers[source]
+            self._threads.pop(source, None)
+            self._pending.pop(source, None)
+            self.cursors.pop(source, None) # Al volver se sigue desde el final, sin reenviar lo perdido
+            self._stops.pop(source).set()
+            proc = self._procs.pop(source, None)
+        if proc:
+            proc.kill() # Desbloquea la lectura de journalctl -f
+        logger.info(f"Seguimiento de {source} detenido (sin clientes).")
+
+    def unfollow_all(self, sid):
+        """Desconexión del cliente: deja todas sus fuentes."""
+        with self._lock:
+            sources = [source for source, followers in self._followers.items() if sid in followers]
+        for source in sources:
+            self.unfollow(source, sid)
+
+    def _push(self, source, lines):
+        if lines:
+            with self._lock:
+                self._pending.setdefault(source, []).extend(lines)
+
+    def _flush_loop(self):
+        """Envía lo acumulado de cada fuente una vez por intervalo (las ráfagas van en un solo emit)."""
+        while True:
+            time.sleep(self.poll_interval)
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            for source, lines in pending.items():
+                try:
+                    self.socketio.emit('log_lines', {'source': source, 'lines': lines[-1000:],
+                                                     'cursor': self.cursors.get(source)}, to=f"logs:{source}")
+                except Exception as e:
+                    logger.warning(f"Error enviando log_lines ({source}): {e}")
+
+    def _follow_file(self, source, stop):
+        path = self.files[source]
+        position, inode = None, None
+        partial = b''
+        while not stop.is_set():
+            try:
+                st = os.stat(path)
+                if position is None or st.st_ino != inode or st.st_size < position:
+                    # Primer arranque: desde EOF. Rotación: desde el principio del fichero nuevo
+                    position = st.st_size if position is None else 0
+                    inode, partial = st.st_ino, b''
+                if st.st_size > position:
+                    with open(path, 'rb') as f:
+                        f.seek(position)
+                        data = partial + f.read(st.st_size - position)
+                    position = st.st_size
+                    *complete, partial = data.split(b'\n')
+                    self.cursors[source] = position
+                    self._push(source, [line.decode('utf-8', errors='replace') for line in complete])
+            except FileNotFoundError:
+                position = 0 if position is not None else None
+            except Exception as e:
+                logger.warning(f"Error siguiendo {path}: {e}")
+            stop.wait(self.poll_interval)
+
+    def _follow_journal(self, source, stop):
+        unit = self.units[source]
+        while not stop.is_set():
+            cmd = ['journalctl', '-u', unit, '-f', '-o', 'json', '--no-pager']
+            cursor = self.cursors.get(source)
+            cmd += ['--after-cursor', cursor] if cursor else ['-n', '0']
+            try:
+                proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+            except FileNotFoundError:
+                logger.warning("journalctl no disponible: sin seguimiento de journald.")
+                return
+            with self._lock:
+                if stop.is_set():
+                    proc.kill()
+                else:
+                    self._procs[source] = proc
+            for raw in proc.stdout:
+                try:
+                    entry = json.loads(raw)
+                except ValueError:
+                    continue
+                if stop.is_set():
+                    break
+                self.cursors[source] = entry.get('__CURSOR', cursor)
+                self._push(source, [format_journal_entry(entry)])
+            proc.wait()
+            stop.wait(2) # journalctl terminó (¿reinicio de journald?): reanudar desde el cursor
+
+def format_journal_entry(entry):
+    """Línea estilo `journalctl -o short` a partir de una entrada JSON."""
+    stamp = entry.get('__REALTIME_TIMESTAMP')
+    when = time.strftime('%b %d %H:%M:%S', time.localtime(int(stamp) / 1e6)) if stamp else ''
+    message = entry.get('MESSAGE', '')
+    if isinstance(message, list): # Mensajes no UTF-8 llegan como lista de bytes
+        message = bytes(message).decode('utf-8', errors='replace')
+    return f"{when} {entry.get('SYSLOG_IDENTIFIER', '')}: {message}".strip()
+
+def read_journal(unit, count=200):
+    """Últimas `count` entradas de una unidad y el cursor para seguirla desde ahí."""
+    result = subprocess.run(['journalctl', '-u', unit, '-n', str(count), '-o', 'json', '--no-pager'],
+                            capture_output=True, text=True)
+    lines, cursor = [], None
+    for raw in result.stdout.splitlines():
+        try:
+            entry = json.loads(raw)
+        except ValueError:
+            continue
+        cursor = entry.get('__CURSOR', cursor)
+        lines.append(format_journal_entry(entry))
+    return lines, cursor
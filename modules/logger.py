@@ -1,21 +1,200 @@
 import logging
+import logging.handlers
 import os
+import json
+import time
+import queue
+import atexit
+import threading
+from collections import deque
+
+from modules.config_manager import ConfigManager
 
 # Crear directorio de logs si no existe
 os.makedirs('logs', exist_ok=True)
 
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+class JsonLinesFormatter(logging.Formatter):
+    """Una línea JSON por record: hora, nivel, logger, componente e hilo."""
+    def format(self, record):
+        entry = {
+            'ts': round(record.created, 3),
+            'level': record.levelname,
+            'logger': record.name,
+            'component': getattr(record, 'component', record.name),
+            'thread': record.threadName,
+            'msg': record.getMessage()
+        }
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+class LogRing(logging.Handler):
+    """Últimos N records en memoria, consultables sin tocar disco (get_recent_logs)."""
+    def __init__(self, capacity=2000):
+        super().__init__()
+        self.records = deque(maxlen=capacity)
+
+    def emit(self, record):
+        self.records.append({
+            'ts': record.created,
+            'level': record.levelname,
+            'levelno': record.levelno,
+            'logger': record.name,
+            'component': getattr(record, 'component', record.name),
+            'thread': record.threadName,
+            'msg': record.getMessage()
+        })
+
+    def query(self, limit=100, level=None, logger=None, since=None, contains=None):
+        min_level = logging.getLevelName(level.upper()) if isinstance(level, str) else (level or 0)
+        if not isinstance(min_level, int):
+            min_level = 0
+        result = []
+        for entry in reversed(list(self.records)):
+            if since is not None and entry['ts'] <= since:
+                break
+            if entry['levelno'] < min_level:
+                continue
+            if logger and entry['logger'] != logger and entry['component'] != logger:
+                continue
+            if contains and contains.lower() not in entry['msg'].lower():
+                continue
+            result.append(entry)
+            if len(result) >= limit:
+                break
+        result.reverse()
+        return result
+
+class _RouteByLogger(logging.Handler):
+    """Destino del QueueListener: cada record va a los handlers de su logger y al anillo."""
+    def __init__(self, ring):
+        super().__init__()
+        self.ring = ring
+        self.routes = {}
+
+    def emit(self, record):
+        for handler in self.routes.get(record.name, ()):
+            if record.levelno >= handler.level:
+                handler.handle(record)
+        self.ring.handle(record)
+
+_log_config = ConfigManager().get('logging', {})
+log_ring = LogRing(_log_config.get('ring_size', 2000))
+_router = _RouteByLogger(log_ring)
+# Un único hilo escribe a disco: el llamante (audio, inferencia...) solo encola
+_log_queue = queue.SimpleQueue()
+_listener = logging.handlers.QueueListener(_log_queue, _router)
+_listener.start()
+atexit.register(_listener.stop)
+
+def _file_handler(path, config):
+    """Handler de fichero en modo 'a' con rotación por tamaño (por defecto) o por tiempo."""
+    if config.get('rotation', 'size') == 'time':
+        return logging.handlers.TimedRotatingFileHandler(
+            path, when=config.get('when', 'midnight'), backupCount=config.get('backup_count', 5), encoding='utf-8')
+    return logging.handlers.RotatingFileHandler(
+        path, mode='a', maxBytes=int(config.get('max_mb', 10) * 1024 * 1024),
+        backupCount=config.get('backup_count', 5), encoding='utf-8')
+
 def setup_logger(name, log_file, level=logging.INFO):
-    """Función para configurar un logger específico."""
-    handler = logging.FileHandler(log_file, mode='w', encoding='utf-8')
-    handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
-    
+    """Función para configurar un logger específico (escritura asíncrona vía QueueListener)."""
+    handler = _file_handler(log_file, _log_config)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    handlers = [handler]
+    if _log_config.get('json', False):
+        json_handler = _file_handler(os.path.splitext(log_file)[0] + '.jsonl', _log_config)
+        json_handler.setFormatter(JsonLinesFormatter())
+        handlers.append(json_handler)
+    _router.routes[name] = handlers
+
     logger = logging.getLogger(name)
     logger.setLevel(level)
-    logger.addHandler(handler)
+    logger.addHandler(logging.handlers.QueueHandler(_log_queue))
     return logger
 
+def get_recent_logs(limit=100, level=None, logger=None, since=None, contains=None):
+    """
+    Records recientes del anillo en memoria (más antiguos primero).
+    level: nivel mínimo ('WARNING'); logger: nombre o componente; since: timestamp exclusivo.
+    """
+    return log_ring.query(limit=limit, level=level, logger=logger, since=since, contains=contains)
+
 # Configurar loggers globales
 app_logger = setup_logger('app', 'logs/app.log')
 tts_logger = setup_logger('tts', 'logs/tts.log')
 vosk_logger = setup_logger('vosk', 'logs/vosk.log')
 video_logger = setup_logger('video', 'logs/video.log')
+
+class SocketLogHandler(logging.Handler):
+    """
+    Streaming de logs al cliente web vía SocketIO, sin I/O en el hilo que loguea.
+    emit() solo encola el record (deque acotada, descarta los más antiguos si se llena);
+    un hilo propio formatea y envía un lote cada `interval` segundos como 'log_message'
+    ({'msg': líneas unidas, 'lines': [...]}). Por encima de `max_lines_per_second`
+    el lote se recorta y se añade una marca "... N líneas suprimidas".
+    """
+    def __init__(self, socketio, interval=0.25, max_lines_per_second=50, max_pending=5000):
+        super().__init__()
+        self.socketio = socketio
+        self.interval = interval
+        self.max_per_batch = max(1, int(max_lines_per_second * interval))
+        self.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+
+        self._pending = deque(maxlen=max_pending)
+        self._wake = threading.Event()
+        self._closed = False
+        self._overflow = 0
+        self.stats = {'records': 0, 'sent': 0, 'suppressed': 0, 'batches': 0}
+        self._thread = threading.Thread(target=self._run, daemon=True, name="Log_Stream")
+        self._thread.start()
+
+    def emit(self, record):
+        # Camino del llamante: solo un append (deque es thread-safe)
+        if len(self._pending) == self._pending.maxlen:
+            self._overflow += 1 # El append descarta el más antiguo
+        self._pending.append(record)
+        self.stats['records'] += 1
+
+    def close(self):
+        self._closed = True
+        self._wake.set()
+        super().close()
+
+    def _run(self):
+        while True:
+            started = time.monotonic()
+            batch = []
+            while self._pending:
+                try:
+                    batch.append(self._pending.popleft())
+                except IndexError:
+                    break
+            if batch:
+                self._send(batch)
+            if self._closed:
+                break # close() despierta la espera: el último lote ya se ha enviado
+            # Una sola espera por ciclo: un lote por intervalo aunque el envío tarde
+            remaining = self.interval - (time.monotonic() - started)
+            if remaining > 0:
+                self._wake.wait(remaining)
+
+    def _send(self, batch):
+        overflow, self._overflow = self._overflow, 0
+        suppressed = max(0, len(batch) - self.max_per_batch) + overflow
+        lines = []
+        for record in batch[:self.max_per_batch]:
+            try:
+                lines.append(self.format(record))
+            except Exception:
+                self.handleError(record)
+        if suppressed:
+            lines.append(f"... {suppressed} líneas suprimidas")
+            self.stats['suppressed'] += suppressed
+        try:
+            self.socketio.emit('log_message', {'msg': '\n'.join(lines), 'lines': lines}, namespace='/')
+            self.stats['sent'] += len(lines)
+            self.stats['batches'] += 1
+        except Exception:
+            pass
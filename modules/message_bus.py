@@ -3,8 +3,15 @@ import eventlet
 eventlet.monkey_patch()
 
 import logging
+import os
+import sys
 from flask import Flask
-from flask_socketio import SocketIO, emit
+from flask_socketio import SocketIO
+
+# Add root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+
+from modules.bus_router import BusRouter
 
 # Configure Logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - [BUS] - %(levelname)s - %(message)s')
@@ -20,29 +27,9 @@ class MessageBus:
         self.setup_routes()
 
     def setup_routes(self):
-        @self.socketio.on('connect')
-        def handle_connect():
-            logger.info("Client connected")
-
-        @self.socketio.on('disconnect')
-        def handle_disconnect():
-            logger.info("Client disconnected")
-
-        @self.socketio.on('message')
-        def handle_message(data):
-            """
-            Broadcasts any received message to all other clients.
-            Data structure expected:
-            {
-                "type": "event.name",
-                "data": { ... }
-            }
-            """
-            msg_type = data.get('type', 'unknown')
-            # logger.debug(f"Bus received: {msg_type}")
-            # Broadcast back to all clients (including sender, or exclude if needed)
-            # OVOS bus usually broadcasts to everyone.
-            emit('message', data, broadcast=True, include_self=False)
+        # Reparte cada mensaje al resto de clientes (sin eco al emisor), en el codec
+        # que haya negociado cada conexión (JSON o msgpack).
+        self.router = BusRouter(self.socketio, include_self=False).register()
 
     def run(self):
         logger.info(f"Starting Message Bus on {self.host}:{self.port}")
@@ -0,0 +1,199 @@
+import time
+import math
+import logging
+import functools
+import threading
+
+logger = logging.getLogger("Metrics")
+
+# Buckets por defecto (segundos): de 1 ms a 30 s, cubren desde RapidFuzz hasta el LLM
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    kind = 'untyped'
+
+    def __init__(self, name, help_text, labelnames=(), registry=None):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        (registry or REGISTRY).register(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(n, '')) for n in self.labelnames)
+
+    @property
+    def exposed_name(self):
+        # Los contadores se exponen con sufijo _total (HELP/TYPE con el mismo nombre que las muestras)
+        return f"{self.name}_total" if self.kind == 'counter' else self.name
+
+    def render(self):
+        lines = [f"# HELP {self.exposed_name} {self.help}", f"# TYPE {self.exposed_name} {self.kind}"]
+        with self._lock:
+            lines.extend(self._render_samples())
+        return lines
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _render_samples(self):
+        return [f"{self.exposed_name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in self._values.items()]
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS, registry=None):
+        super().__init__(name, help_text, labelnames, registry)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0] # cuentas, suma, total
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def time(self, **labels):
+        """Context manager: with HISTOGRAM.time(stage='x'): ..."""
+        return _Timer(self, labels)
+
+    def _render_samples(self):
+        lines = []
+        for key, (counts, total, count) in self._values.items():
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+class GaugeCallback(_Metric):
+    """Gauge (o contador ya acumulado en otro sitio) leído al exportar: fn() -> [(labels_dict, valor)]."""
+
+    def __init__(self, name, help_text, fn, labelnames=(), kind='gauge', registry=None):
+        self.fn = fn
+        self.kind = kind
+        super().__init__(name, help_text, labelnames, registry)
+
+    def _render_samples(self):
+        try:
+            samples = self.fn()
+        except Exception as e:
+            logger.debug(f"Error leyendo {self.name}: {e}")
+            return []
+        return [f"{self.exposed_name}{_format_labels(self.labelnames, self._key(labels))} {_format_value(value)}"
+                for labels, value in samples]
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+        return False
+
+def timed(histogram, **labels):
+    """Decorador: mide cada llamada en el histograma (incluye aciertos de caché si envuelve a lru_cache)."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start, **labels)
+        return wrapper
+    return decorator
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self.metrics = [m for m in self.metrics if m.name != metric.name] + [metric]
+
+    def render(self):
+        """Formato de texto de exposición de Prometheus (0.0.4)."""
+        lines = []
+        with self._lock:
+            metrics = list(self.metrics)
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+REGISTRY = Registry()
+
+# --- Métricas de los caminos calientes del pipeline de voz ---
+
+VAD_FRAME = Histogram('neo_vad_frame_seconds', "Detección de voz (energía RMS) por bloque de audio",
+                      labelnames=('engine',), buckets=(0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01))
+STT_DECODE = Histogram('neo_stt_decode_seconds', "Tiempo de decodificación STT por llamada",
+                       labelnames=('engine', 'stage'))
+INTENT_MATCH = Histogram('neo_intent_match_seconds', "IntentManager.find_best_intent (RapidFuzz + caché)")
+ROUTER_PREDICT = Histogram('neo_router_predict_seconds', "DecisionRouter.predict")
+MODEL_RUNNER = Histogram('neo_model_runner_seconds', "SpecificModelRunner.generate_command",
+                         labelnames=('label',))
+LLM_TTFT = Histogram('neo_llm_ttft_seconds', "Tiempo hasta el primer token del LLM", labelnames=('mode',))
+LLM_TOKENS_PER_SECOND = Histogram('neo_llm_tokens_per_second', "Velocidad de generación del LLM",
+                                  labelnames=('mode',), buckets=(1, 2, 5, 10, 15, 20, 30, 50, 100))
+LLM_TOKENS = Counter('neo_llm_tokens', "Tokens generados por el LLM", labelnames=('mode',))
+LLM_ERRORS = Counter('neo_llm_errors', "Errores de generación del LLM", labelnames=('mode',))
+TTS_SYNTHESIS = Histogram('neo_tts_synthesis_seconds', "Síntesis TTS por item (incluye caché)",
+                          labelnames=('engine',))
+TTS_PLAYBACK = Histogram('neo_tts_playback_seconds', "Reproducción de cada clip de audio",
+                         labelnames=('kind',), buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0))
+TTS_TTFA = Histogram('neo_tts_time_to_first_audio_seconds', "Desde el inicio de la respuesta hasta el primer audio")
+DEADLINE_MISSES = Counter('neo_deadline_misses', "Etapas de handle_command que agotaron su plazo (fallback)",
+                          labelnames=('stage',))
+
+def _queue_samples(field):
+    from modules.event_queue import get_queue_stats
+    samples = []
+    for queue_name, stats in get_queue_stats().items():
+        for class_name, class_stats in stats['classes'].items():
+            samples.append(({'queue': queue_name, 'class': class_name}, class_stats[field]))
+    return samples
+
+GaugeCallback('neo_queue_depth', "Items pendientes por cola y clase de mensaje",
+              lambda: _queue_samples('depth'), labelnames=('queue', 'class'))
+GaugeCallback('neo_queue_dropped', "Items descartados por cola y clase",
+              lambda: _queue_samples('dropped'), labelnames=('queue', 'class'), kind='counter')
+GaugeCallback('neo_queue_coalesced', "Items fusionados (último valor) por cola y clase",
+              lambda: _queue_samples('coalesced'), labelnames=('queue', 'class'), kind='counter')
@@ -0,0 +1,136 @@
+import time
+import logging
+import threading
+from collections import namedtuple
+
+import psutil
+
+from modules.config_manager import ConfigManager
+
+logger = logging.getLogger("MetricsSampler")
+
+# Instantánea inmutable: los consumidores la leen sin locks ni llamadas a psutil
+MetricsSnapshot = namedtuple('MetricsSnapshot', [
+    'timestamp',      # time.time() de la muestra
+    'cpu_percent',    # % CPU global desde la muestra anterior
+    'ram_percent',
+    'ram_used',       # bytes
+    'ram_total',
+    'disk_percent',   # '/' (se refresca cada `disk_every` muestras)
+    'temp_c',         # float o None si no hay sensor
+    'load_avg',       # (1, 5, 15) o None
+    'net_sent',       # bytes acumulados
+    'net_recv',
+])
+
+def read_cpu_temp():
+    """
+    Temperatura de la CPU en °C (None si no hay sensor).
+    Intenta psutil primero y luego el fichero de sistema (Raspberry Pi).
+    """
+    try:
+        temps = psutil.sensors_temperatures()
+        if temps:
+            # Busca sensores comunes; si no, el primero que encuentre
+            for name in ['cpu_thermal', 'coretemp', 'k10temp', 'acpitz']:
+                if name in temps:
+                    return temps[name][0].current
+            return temps[list(temps.keys())[0]][0].current
+    except Exception as e:
+        logger.debug(f"Error leyendo temperatura con psutil: {e}")
+
+    try:
+        with open("/sys/class/thermal/thermal_zone0/temp", "r") as f:
+            return int(f.read()) / 1000.0
+    except (FileNotFoundError, ValueError):
+        return None
+
+class MetricsSampler:
+    """
+    Muestreo único de métricas del host en segundo plano (cadencia fija, `metrics.interval`).
+    Cada muestra se publica como una MetricsSnapshot nueva; snapshot() nunca bloquea.
+    Es el único que llama a psutil.cpu_percent(), cuyo estado interno es global al proceso.
+    """
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    @classmethod
+    def instance(cls):
+        with cls._instance_lock:
+            if cls._instance is None:
+                config = ConfigManager().get('metrics', {})
+                cls._instance = cls(interval=config.get('interval', 2.0), disk_every=config.get('disk_every', 5))
+                cls._instance.start()
+            return cls._instance
+
+    def __init__(self, interval=2.0, disk_every=5):
+        self.interval = interval
+        self.disk_every = max(1, disk_every)
+        self._listeners = []
+        self._thread = None
+        self._ticks = 0
+        self._disk_percent = 0.0
+        psutil.cpu_percent(interval=None) # Referencia para la primera muestra
+        self._snapshot = self._sample()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True, name="Metrics_Sampler")
+            self._thread.start()
+        return self
+
+    def snapshot(self):
+        """Última instantánea (asignación atómica de referencia: sin lock)."""
+        return self._snapshot
+
+    def add_listener(self, callback):
+        """callback(snapshot) tras cada muestra (en el hilo del sampler: debe ser rápido)."""
+        self._listeners.append(callback)
+
+    def _run(self):
+        next_tick = time.monotonic()
+        while True:
+            next_tick += self.interval
+            time.sleep(max(0.0, next_tick - time.monotonic()))
+            try:
+                self._snapshot = snapshot = self._sample()
+            except Exception as e:
+                logger.error(f"Error muestreando métricas: {e}")
+                continue
+            for callback in self._listeners:
+                try:
+                    callback(snapshot)
+                except Exception as e:
+                    logger.error(f"Error en listener de métricas: {e}")
+
+    def _sample(self):
+        if self._ticks % self.disk_every == 0:
+            try:
+                self._disk_percent = psutil.disk_usage('/').percent
+            except Exception:
+                pass
+        self._ticks += 1
+
+        ram = psutil.virtual_memory()
+        try:
+            load = psutil.getloadavg()
+        except (AttributeError, OSError):
+            load = None
+        try:
+            net = psutil.net_io_counters()
+            sent, recv = net.bytes_sent, net.bytes_recv
+        except Exception:
+            sent = recv = 0
+
+        return MetricsSnapshot(
+            timestamp=time.time(),
+            cpu_percent=psutil.cpu_percent(interval=None),
+            ram_percent=ram.percent,
+            ram_used=ram.used,
+            ram_total=ram.total,
+            disk_percent=self._disk_percent,
+            temp_c=read_cpu_temp(),
+            load_avg=load,
+            net_sent=sent,
+            net_recv=recv,
+        )
@@ -0,0 +1,241 @@
+import os
+import json
+import math
+import time
+import atexit
+import logging
+import threading
+
+import numpy as np
+
+from modules.config_manager import ConfigManager
+from modules.metrics_sampler import MetricsSampler
+
+logger = logging.getLogger("MetricsStore")
+
+# (paso en segundos, número de huecos): 1 s x 10 min, 1 min x 24 h, 1 h x 30 días
+DEFAULT_RESOLUTIONS = ((1, 600), (60, 1440), (3600, 720))
+
+class RingSeries:
+    """
+    Buffer circular de tamaño fijo para una resolución: cada hueco es un intervalo de `step`
+    segundos con suma, número de muestras y máximo. La media se calcula al consultar.
+    """
+
+    def __init__(self, step, size):
+        self.step = step
+        self.size = size
+        self.ts = np.full(size, np.nan) # Inicio del intervalo de cada hueco
+        self.sum = np.zeros(size)
+        self.count = np.zeros(size, dtype=np.int32)
+        self.max = np.full(size, np.nan)
+        self.pos = -1 # Hueco actual
+
+    def add(self, ts, value):
+        bucket = math.floor(ts / self.step) * self.step
+        if self.pos < 0 or bucket > self.ts[self.pos]:
+            # Nuevo intervalo: avanza (sobrescribe el más antiguo)
+            self.pos = (self.pos + 1) % self.size
+            self.ts[self.pos] = bucket
+            self.sum[self.pos] = value
+            self.count[self.pos] = 1
+            self.max[self.pos] = value
+        elif bucket == self.ts[self.pos]:
+            self.sum[self.pos] += value
+            self.count[self.pos] += 1
+            if value > self.max[self.pos]:
+                self.max[self.pos] = value
+        # Muestras más antiguas que el hueco actual (reloj hacia atrás) se ignoran
+
+    def query(self, start=None, end=None):
+        """Puntos (ts, media, máximo) en orden cronológico dentro de [start, end]."""
+        if self.pos < 0:
+            return np.empty((0, 3))
+        order = np.roll(np.arange(self.size), -(self.pos + 1))
+        ts = self.ts[order]
+        mask = ~np.isnan(ts) & (self.count[order] > 0)
+        if start is not None:
+            mask &= ts >= start - self.step # Incluye el intervalo que contiene `start`
+        if end is not None:
+            mask &= ts <= end
+        idx = order[mask]
+        return np.column_stack((self.ts[idx], self.sum[idx] / self.count[idx], self.max[idx]))
+
+    def coverage(self):
+        return self.step * self.size
+
+class MetricsStore:
+    """
+    Almacén embebido de series temporales (host y agentes) a varias resoluciones.
+    - record() reduce al insertar: cada muestra se acumula en el hueco actual de cada resolución.
+    - query() elige la resolución más fina que cubre el rango pedido.
+    - Se guarda periódicamente en un .npz (escritura atómica) y se recarga al arrancar.
+    - Como mucho `max_series` series: las claves nuevas por encima del límite se rechazan (y se loguean).
+    """
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    @classmethod
+    def instance(cls):
+        with cls._instance_lock:
+            if cls._instance is None:
+                config = ConfigManager().get('metrics', {})
+                resolutions = [tuple(r) for r in config.get('resolutions', DEFAULT_RESOLUTIONS)]
+                cls._instance = cls(config.get('history_path', 'data/metrics_history.npz'),
+                                    resolutions, config.get('flush_seconds', 300),
+                                    max_series=config.get('max_series', 500))
+                # Las métricas del host llegan del muestreador compartido
+                MetricsSampler.instance().add_listener(cls._instance.record_snapshot)
+            return cls._instance
+
+    def __init__(self, path='data/metrics_history.npz', resolutions=DEFAULT_RESOLUTIONS, flush_seconds=300,
+                 max_series=500):
+        self.path = path
+        self.resolutions = sorted(resolutions)
+        self.flush_seconds = flush_seconds
+        self.max_series = max_series
+        self.series = {} # nombre -> [RingSeries por resolución]
+        self.refused = 0 # Muestras rechazadas por superar max_series
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.load()
+        if flush_seconds:
+            threading.Thread(target=self._flush_loop, daemon=True, name="Metrics_Flush").start()
+            atexit.register(self.save)
+
+    # --- Escritura ---
+
+    def record(self, name, value, ts=None):
+        if value is None:
+            return
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            return
+        if math.isnan(value):
+            return
+        ts = ts or time.time()
+        with self._lock:
+            rings = self.series.get(name)
+            if rings is None:
+                if self.max_series and len(self.series) >= self.max_series:
+                    self.refused += 1
+                    if self.refused % 100 == 1:
+                        logger.warning(f"Límite de {self.max_series} series alcanzado: se rechaza '{name}' "
+                                       f"({self.refused} muestras rechazadas).")
+                    return
+                rings = self.series[name] = [RingSeries(step, size) for step, size in self.resolutions]
+            for ring in rings:
+                ring.add(ts, value)
+            self._dirty = True
+
+    def record_many(self, values, ts=None, prefix=''):
+        """Registra los valores numéricos de un dict (p.ej. telemetría de un agente)."""
+        ts = ts or time.time()
+        for key, value in values.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                self.record(f"{prefix}{key}", value, ts)
+
+    def record_snapshot(self, snapshot):
+        """Listener del MetricsSampler."""
+        ts = snapshot.timestamp
+        self.record('host.cpu', snapshot.cpu_percent, ts)
+        self.record('host.ram', snapshot.ram_percent, ts)
+        self.record('host.disk', snapshot.disk_percent, ts)
+        self.record('host.temp', snapshot.temp_c, ts)
+        if snapshot.load_avg:
+            self.record('host.load1', snapshot.load_avg[0], ts)
+
+    # --- Consulta ---
+
+    def names(self):
+        with self._lock:
+            return sorted(self.series)
+
+    def query(self, name, start=None, end=None, resolution=None, max_points=None):
+        """
+        Historial de una serie: {'resolution': paso, 'points': [[ts, media, máximo], ...]}.
+        Sin `resolution` se usa la más fina cuya ventana cubre `start`.
+        """
+        now = time.time()
+        with self._lock:
+            rings = self.series.get(name)
+            if not rings:
+                return {'name': name, 'resolution': None, 'points': []}
+            ring = None
+            if resolution:
+                ring = next((r for r in rings if r.step == int(resolution)), None)
+            if ring is None:
+                span = now - start if start else 0
+                ring = next((r for r in rings if r.coverage() >= span), rings[-1])
+            points = ring.query(start, end)
+        if max_points and len(points) > max_points:
+            # Reducción extra para el gráfico: agrupa puntos consecutivos
+            groups = np.array_split(points, max_points)
+            points = np.array([[g[0, 0], g[:, 1].mean(), g[:, 2].max()] for g in groups if len(g)])
+        return {
+            'name': name,
+            'resolution': ring.step,
+            'points': [[round(float(t), 3), round(float(v), 3), round(float(m), 3)] for t, v, m in points]
+        }
+
+    def mean(self, name, seconds):
+        """Media de los últimos `seconds` segundos (None si no hay datos)."""
+        points = self.query(name, start=time.time() - seconds)['points']
+        if not points:
+            return None
+        return sum(p[1] for p in points) / len(points)
+
+    # --- Persistencia ---
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            arrays, meta = {}, []
+            for i, (name, rings) in enumerate(self.series.items()):
+                for j, ring in enumerate(rings):
+                    key = f"s{i}_{j}"
+                    meta.append({'key': key, 'name': name, 'step': ring.step, 'size': ring.size, 'pos': ring.pos})
+                    arrays[f"{key}_ts"] = ring.ts.copy()
+                    arrays[f"{key}_sum"] = ring.sum.copy()
+                    arrays[f"{key}_count"] = ring.count.copy()
+                    arrays[f"{key}_max"] = ring.max.copy()
+            self._dirty = False
+        arrays['meta'] = np.array(json.dumps(meta))
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = f"{self.path}.tmp.npz"
+            np.savez_compressed(tmp_path, **arrays)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.error(f"Error guardando historial de métricas: {e}")
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with np.load(self.path) as data:
+                meta = json.loads(str(data['meta']))
+                wanted = dict(self.resolutions)
+                for entry in meta:
+                    # Solo se recuperan resoluciones que sigan configuradas con el mismo tamaño
+                    if wanted.get(entry['step']) != entry['size']:
+                        continue
+                    rings = self.series.setdefault(
+                        entry['name'], [RingSeries(step, size) for step, size in self.resolutions])
+                    ring = next(r for r in rings if r.step == entry['step'])
+                    key = entry['key']
+                    ring.ts = data[f"{key}_ts"]
+                    ring.sum = data[f"{key}_sum"]
+                    ring.count = data[f"{key}_count"]
+                    ring.max = data[f"{key}_max"]
+                    ring.pos = entry['pos']
+            logger.info(f"Historial de métricas cargado ({len(self.series)} series).")
+        except Exception as e:
+            logger.error(f"Error cargando historial de métricas: {e}")
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_seconds)
+            self.save()
@@ -4,6 +4,7 @@ import json
 import time
 import threading
 from modules.logger import app_logger
+from modules.metrics_registry import MODEL_RUNNER
 
 # Fallback dependencies
 try:
@@ -168,6 +169,10 @@ class SpecificModelRunner:
                 # Force GC optional here, but Python refcounting usually sufficient for classes
 
     def generate_command(self, text, label):
+        with MODEL_RUNNER.time(label=label):
+            return self._generate_command(text, label)
+
+    def _generate_command(self, text, label):
         if not ONNX_AVAILABLE:
             raise ImportError("Librerías ONNX no disponibles.")
 
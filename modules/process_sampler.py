@@ -0,0 +1,131 @@
+import time
+import heapq
+import logging
+import threading
+
+import psutil
+
+from modules.config_manager import ConfigManager
+
+logger = logging.getLogger("ProcessSampler")
+
+class ProcessSampler:
+    """
+    Top de procesos en segundo plano, incremental.
+    - Guarda por PID (y create_time, para detectar reutilización) el tiempo de CPU acumulado
+      de la muestra anterior: el % de CPU es el delta entre ticks (sin primeras lecturas a 0).
+    - En cada tick mantiene el top-N por CPU y por RSS con heapq.nlargest y lo publica como tupla inmutable.
+    - Si nadie consulta durante `idle_after` segundos deja de muestrear hasta la siguiente consulta.
+      Al arrancar o reanudar hace un tick de cebado (solo bases); mientras tanto top() devuelve el último
+      ranking publicado (vacío o `stale`) sin esperar.
+    """
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    @classmethod
+    def instance(cls):
+        with cls._instance_lock:
+            if cls._instance is None:
+                config = ConfigManager().get('metrics', {})
+                cls._instance = cls(interval=config.get('process_interval', 3.0),
+                                    keep=config.get('process_top', 50))
+            return cls._instance
+
+    def __init__(self, interval=3.0, keep=50, idle_after=60.0):
+        self.interval = interval
+        self.keep = keep
+        self.idle_after = idle_after
+        self._baselines = {} # pid -> (create_time, cpu_total, monotonic)
+        self._top_cpu = ()
+        self._top_rss = ()
+        self.sampled_at = None
+        self.last_duration = None
+        self._last_read = time.monotonic()
+        self._wake = threading.Event()
+        self._sampled = threading.Event() # Hay un top medido con delta (se limpia en la pausa)
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        """Arranca el muestreo sin consulta (ceba las bases para que la primera lectura ya tenga delta)."""
+        self._last_read = time.monotonic()
+        self._ensure_running()
+        return self
+
+    @property
+    def stale(self):
+        """El ranking publicado no es del muestreo actual (aún cebando o recién reanudado)."""
+        return not self._sampled.is_set()
+
+    def top(self, limit=10, sort='cpu'):
+        """Último top publicado (instantáneo). Cada consulta mantiene vivo el muestreo."""
+        self._last_read = time.monotonic()
+        self._ensure_running()
+        ranking = self._top_rss if sort == 'memory' else self._top_cpu
+        return [dict(p) for p in ranking[:limit]]
+
+    def _ensure_running(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True, name="Process_Sampler")
+                self._thread.start()
+        self._wake.set()
+
+    def _run(self):
+        primed = False
+        while True:
+            if time.monotonic() - self._last_read > self.idle_after:
+                # Sin consumidores: se pausa hasta la siguiente consulta
+                self._wake.clear()
+                self._sampled.clear()
+                self._wake.wait()
+                primed = False
+            started = time.monotonic()
+            try:
+                # Tras arrancar o reanudar, el primer tick solo renueva las bases: un delta
+                # sobre toda la pausa no es el uso actual
+                self._tick(publish=primed)
+                primed = True
+            except Exception as e:
+                logger.error(f"Error muestreando procesos: {e}")
+            self.last_duration = time.monotonic() - started
+            time.sleep(max(0.0, self.interval - self.last_duration))
+
+    def _tick(self, publish=True):
+        now = time.monotonic()
+        total_ram = psutil.virtual_memory().total or 1
+        baselines = {}
+        samples = []
+        for proc in psutil.process_iter(['pid', 'name', 'username']):
+            try:
+                with proc.oneshot():
+                    created = proc.create_time()
+                    times = proc.cpu_times()
+                    rss = proc.memory_info().rss
+            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                continue
+            pid = proc.info['pid']
+            cpu_total = times.user + times.system
+            baselines[pid] = (created, cpu_total, now)
+
+            previous = self._baselines.get(pid)
+            if previous and previous[0] == created and now > previous[2]:
+                cpu = max(0.0, (cpu_total - previous[1]) / (now - previous[2]) * 100)
+            else:
+                cpu = 0.0 # Proceso nuevo: tendrá delta en el siguiente tick
+            samples.append((cpu, rss, pid, proc.info['name'], proc.info['username']))
+
+        # PIDs desaparecidos salen del diccionario al sustituirlo
+        self._baselines = baselines
+        if not publish:
+            return
+
+        def to_entry(sample):
+            cpu, rss, pid, name, username = sample
+            return {'pid': pid, 'name': name, 'username': username, 'cpu_percent': round(cpu, 1),
+                    'memory_percent': round(rss / total_ram * 100, 2), 'rss': rss}
+
+        self._top_cpu = tuple(to_entry(s) for s in heapq.nlargest(self.keep, samples, key=lambda s: (s[0], s[1])))
+        self._top_rss = tuple(to_entry(s) for s in heapq.nlargest(self.keep, samples, key=lambda s: s[1]))
+        self.sampled_at = time.time()
+        self._sampled.set()
@@ -1,6 +1,7 @@
 import datetime
 import json
 import os
+from modules.speech_template import SpeechTemplate
 
 class ReminderManager:
     """Gestiona los recordatorios (medicación, citas, etc.)."""
@@ -63,7 +64,8 @@ class ReminderManager:
                 if current_time >= reminder['time']:
                     actions.append({'type': 'highlight_icon', 'icon_id': reminder['icon_id']})
                     actions.append({'type': 'sound', 'sound_name': 'clear_chime'})
-                    actions.append({'type': 'speak', 'text': f"Es la hora de tu medicación: {reminder['details']}."})
+                    actions.append({'type': 'speak', 'text': SpeechTemplate.render(
+                        "Es la hora de tu medicación: {details}.", details=reminder['details'])})
                     reminder['triggered_main'] = True
                     # No guardamos aquí para no escribir en disco constantemente
 
@@ -0,0 +1,170 @@
+import time
+import threading
+import logging
+from collections import OrderedDict
+
+import numpy as np
+
+logger = logging.getLogger("ResponseCache")
+
+class ResponseCache:
+    """
+    Caché semántica de respuestas del LLM.
+    - Indexa por el embedding de la pregunta (MiniLM ya cargado por KnowledgeBase).
+    - Una pregunta "parecida" (similitud coseno >= umbral) reutiliza la respuesta.
+    - Entradas con TTL y tamaño máximo (Eviction Policy: LRU).
+    - Se invalida cuando KnowledgeBase vuelve a ingerir documentos.
+    """
+
+    def __init__(self, knowledge_base, similarity_threshold=0.92, ttl_seconds=86400, max_entries=256):
+        self.knowledge_base = knowledge_base
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+        self._entries = OrderedDict() # query -> {embedding, response, created, gen_time, hits}
+        self._matrix = None # Embeddings apilados (se reconstruye bajo demanda)
+        self._keys = []
+        self._lock = threading.Lock()
+        self._kb_generation = knowledge_base.generation if knowledge_base else 0
+
+        # Estadísticas exportadas
+        self.lookups = 0
+        self.hits = 0
+        self.misses = 0
+        self.saved_time = 0.0 # Segundos de generación ahorrados
+        self.evictions = 0
+        self.invalidations = 0
+
+    @classmethod
+    def from_config(cls, knowledge_base, config):
+        """Crea la caché a partir de la sección 'ai_cache' de la configuración."""
+        return cls(
+            knowledge_base,
+            similarity_threshold=float(config.get('similarity_threshold', 0.92)),
+            ttl_seconds=int(config.get('ttl_seconds', 86400)),
+            max_entries=int(config.get('max_entries', 256))
+        )
+
+    def embed(self, text):
+        """Devuelve el embedding normalizado de la pregunta (o None si no hay modelo)."""
+        if not self.knowledge_base:
+            return None
+        return self.knowledge_base.embed(text)
+
+    def lookup(self, query, embedding=None):
+        """
+        Busca una respuesta cacheada para una pregunta semánticamente equivalente.
+        Retorna la respuesta o None.
+        """
+        if embedding is None:
+            embedding = self.embed(query)
+        if embedding is None:
+            return None
+
+        with self._lock:
+            self._check_generation()
+            self._expire()
+            self.lookups += 1
+
+            if not self._entries:
+                self.misses += 1
+                return None
+
+            if self._matrix is None:
+                self._keys = list(self._entries.keys())
+                self._matrix = np.vstack([self._entries[k]['embedding'] for k in self._keys])
+
+            # Embeddings normalizados -> producto escalar == similitud coseno
+            scores = self._matrix @ embedding
+            best = int(np.argmax(scores))
+            best_score = float(scores[best])
+
+            if best_score < self.similarity_threshold:
+                self.misses += 1
+                return None
+
+            key = self._keys[best]
+            entry = self._entries[key]
+            entry['hits'] += 1
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.saved_time += entry['gen_time']
+            logger.info(f"Cache HIT ({best_score:.3f}): '{query}' ~= '{key}'")
+            return entry['response']
+
+    def store(self, query, response, gen_time, embedding=None):
+        """Guarda una respuesta generada junto con lo que costó generarla."""
+        if not response or not response.strip():
+            return
+        if embedding is None:
+            embedding = self.embed(query)
+        if embedding is None:
+            return
+
+        with self._lock:
+            self._check_generation()
+            self._entries[query] = {
+                'embedding': embedding,
+                'response': response,
+                'created': time.time(),
+                'gen_time': gen_time,
+                'hits': 0
+            }
+            self._entries.move_to_end(query)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+            self._matrix = None
+
+    def invalidate(self):
+        """Vacía la caché (p.ej. tras re-ingestar la base de conocimiento)."""
+        with self._lock:
+            self._clear()
+
+    def get_stats(self):
+        """Estadísticas para la web / métricas."""
+        with self._lock:
+            hit_rate = (self.hits / self.lookups) if self.lookups else 0.0
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'lookups': self.lookups,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(hit_rate, 3),
+                'saved_generation_seconds': round(self.saved_time, 2),
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'similarity_threshold': self.similarity_threshold,
+                'ttl_seconds': self.ttl_seconds
+            }
+
+    # --- Internos (llamar con el lock adquirido) ---
+
+    def _clear(self):
+        if self._entries:
+            logger.info(f"Invalidando caché de respuestas ({len(self._entries)} entradas).")
+        self._entries.clear()
+        self._matrix = None
+        self._keys = []
+        self.invalidations += 1
+
+    def _check_generation(self):
+        """Invalida si la base de conocimiento se ha re-ingestado desde el último acceso."""
+        if not self.knowledge_base:
+            return
+        current = self.knowledge_base.generation
+        if current != self._kb_generation:
+            self._kb_generation = current
+            self._clear()
+
+    def _expire(self):
+        now = time.time()
+        expired = [k for k, e in self._entries.items() if now - e['created'] > self.ttl_seconds]
+        for k in expired:
+            del self._entries[k]
+        if expired:
+            self._matrix = None
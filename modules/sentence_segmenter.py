@@ -0,0 +1,37 @@
+class SentenceSegmenter:
+    """
+    Segmentador incremental de frases para respuestas en streaming del LLM.
+    Cada token se examina una sola vez (coste lineal con la longitud de la respuesta),
+    en lugar de re-partir todo el buffer con re.split en cada token.
+    Corta en los mismos delimitadores que el antiguo heurístico: . ! ? y salto de línea.
+    """
+    DELIMITERS = frozenset('.!?\n')
+
+    def __init__(self):
+        self._parts = [] # Fragmentos de la frase en curso (aún sin delimitador)
+
+    def feed(self, chunk):
+        """Añade un fragmento y devuelve la lista de frases completas que cierra."""
+        sentences = []
+        if not chunk:
+            return sentences
+
+        start = 0
+        for i, char in enumerate(chunk):
+            if char in self.DELIMITERS:
+                self._parts.append(chunk[start:i + 1])
+                sentence = "".join(self._parts).strip()
+                self._parts = []
+                start = i + 1
+                if sentence:
+                    sentences.append(sentence)
+
+        if start < len(chunk):
+            self._parts.append(chunk[start:])
+        return sentences
+
+    def flush(self):
+        """Devuelve el resto pendiente (frase sin delimitador final) o None."""
+        remaining = "".join(self._parts).strip()
+        self._parts = []
+        return remaining or None
@@ -419,8 +419,11 @@ class SkillsService:
         self.bus.run_forever()
 
     # Helper for skills that might call self.core.speak directly (if any)
-    def speak(self, text):
-        self.bus.emit('speak', {'text': text})
+    def speak(self, text, priority=None):
+        data = {'text': text}
+        if priority:
+            data['priority'] = priority
+        self.bus.emit('speak', data)
 
     def on_closing(self):
         # Cleanup
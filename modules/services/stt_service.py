@@ -12,6 +12,7 @@ import base64
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
 
 from modules.bus_client import BusClient
+from modules.metrics_registry import STT_DECODE
 from modules.config_manager import ConfigManager
 from modules.utils import normalize_text
 from modules.stt_postprocessor import get_processor
@@ -106,7 +107,8 @@ class STTService:
             
             text = ""
             if self.sherpa_recognizer:
-                text = self.transcribe_sherpa(raw_data, rate)
+                with STT_DECODE.time(engine='sherpa', stage='final'):
+                    text = self.transcribe_sherpa(raw_data, rate)
             
             if text:
                 self.process_text(text)
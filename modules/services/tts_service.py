@@ -34,7 +34,7 @@ class TTSService:
         text = data.get('text', '')
         if text:
             logger.info(f"Speaking: {text}")
-            self.speaker.speak(text)
+            self.speaker.speak(text, priority=data.get('priority', 'normal'))
 
     def monitor_speaker(self):
         """Relay speaker events to bus."""
@@ -7,7 +7,7 @@ import threading
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
 
 from modules.bus_client import BusClient
-from modules.web_admin import app, socketio
+from modules.web_admin import app, socketio, update_face
 
 # Setup Logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - [WEB] - %(levelname)s - %(message)s')
@@ -49,8 +49,8 @@ class WebService:
 
     def update_face(self, state, data=None):
         if data is None: data = {}
-        logger.info(f"Updating Face: {state}")
-        socketio.emit('face_update', {'state': state, 'data': data})
+        logger.debug(f"Updating Face: {state}")
+        update_face(state, data)
 
     def on_speak_start(self, data):
         self.update_face('speaking')
@@ -2,11 +2,24 @@ import threading
 import queue
 import os
 import subprocess
-import hashlib
 import json
 import time
+import random
 import shlex
+import wave
+import tempfile
+from collections import deque
 from modules.logger import tts_logger
+from modules.config_manager import ConfigManager
+from modules.audio_output import AudioOutput, PYAUDIO_AVAILABLE, read_wav, resample, crossfade_concat
+from modules.tts_cache import TTSCache
+from modules.sentence_segmenter import SentenceSegmenter
+from modules.speech_template import SpeechTemplate
+from modules.event_queue import PolicyQueue, MessageClass, NEVER_DROP, PRIORITIES
+from modules.metrics_registry import TTS_SYNTHESIS, TTS_PLAYBACK, TTS_TTFA
+from modules import tracing
+
+import numpy as np
 
 try:
     from piper import PiperVoice
@@ -18,9 +31,103 @@ CACHE_DIR = "tts_cache"
 if not os.path.exists(CACHE_DIR):
     os.makedirs(CACHE_DIR)
 
+PLAY_QUEUE_LOOKAHEAD = 2 # Frases sintetizadas por delante de la que suena
+PCM_READ_SIZE = 4096
+
+# Pausas al unir segmentos de plantilla (segundos) según la puntuación del límite
+SEGMENT_PAUSES = (('.!?', 0.25), (',;:', 0.12))
+SEGMENT_PUNCTUATION = " ,.;:!?¿¡"
+
+FILLER_DIR = "resources/sounds/fillers"
+
+class AudioClip:
+    """
+    Audio producido por la etapa de síntesis.
+    Puede ser un fichero WAV (path) o PCM 16-bit mono en streaming (rate + chunks);
+    en este caso la reproducción empieza antes de que termine la síntesis.
+    """
+    def __init__(self, text=None, rate=None, path=None, kind='tts', epoch=0, priority='normal'):
+        self.text = text
+        self.rate = rate
+        self.path = path
+        self.kind = kind # 'tts', 'wav' (filler/fichero) o 'dummy'
+        self.epoch = epoch # Speaker.stop() invalida los clips de épocas anteriores
+        self.priority = priority # Prioridad de la locución (una alerta más urgente puede cortarla)
+        self.cancelled = False # Speaker.interrupt() descarta solo este clip
+        self.trace_id = tracing.current_trace_id() # Traza de la frase (la síntesis corre dentro de use_trace)
+        self._chunks = queue.Queue()
+        self._finished = threading.Event()
+
+    def add(self, pcm):
+        self._chunks.put(pcm)
+
+    def finish(self):
+        self._chunks.put(None)
+        self._finished.set()
+
+    def wait_finished(self, timeout=15):
+        self._finished.wait(timeout)
+
+    def iter_pcm(self):
+        while True:
+            pcm = self._chunks.get()
+            if pcm is None:
+                return
+            yield pcm
+
+class FillerBank:
+    """
+    Muletillas de relleno decodificadas una sola vez en memoria (ya remuestreadas a la
+    frecuencia de salida). Solo se vuelve a leer el directorio si cambia su mtime.
+    """
+    def __init__(self, directory=FILLER_DIR, rate=None):
+        self.directory = directory
+        self.rate = rate
+        self.clips = [] # [(path, np.int16, rate)]
+        self._mtime = None
+        self._last = None
+        self.refresh()
+
+    def refresh(self):
+        try:
+            mtime = os.stat(self.directory).st_mtime
+        except OSError:
+            self.clips = []
+            self._mtime = None
+            return
+        if mtime == self._mtime:
+            return
+
+        clips = []
+        for name in sorted(os.listdir(self.directory)):
+            if not name.endswith('.wav'):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                pcm, rate = read_wav(path)
+                if self.rate and rate != self.rate:
+                    pcm = (resample(pcm.astype(np.float32) / 32768.0, rate, self.rate) * 32767).astype(np.int16)
+                    rate = self.rate
+                clips.append((path, pcm, rate))
+            except Exception as e:
+                tts_logger.warning(f"Filler no válido {path}: {e}")
+        self.clips = clips
+        self._mtime = mtime
+        tts_logger.info(f"Fillers cargados en memoria: {len(clips)}")
+
+    def choice(self):
+        """Muletilla aleatoria (evitando repetir la anterior) o None."""
+        self.refresh()
+        if not self.clips:
+            return None
+        options = [c for c in self.clips if c[0] != self._last] or self.clips
+        clip = random.choice(options)
+        self._last = clip[0]
+        return clip
+
 class Speaker:
     def __init__(self, event_queue):
-        self.speak_queue = queue.Queue()
+        self.speak_queue = PolicyQueue('speaker.speak', lambda item: ('speech', None), [MessageClass('speech', NEVER_DROP)])
         self.event_queue = event_queue
         self._is_busy = False
         self.is_available = False
@@ -33,6 +140,12 @@ class Speaker:
         self.engine = tts_config.get('engine', 'piper')
         self.piper_model = tts_config.get('piper_model', 'piper/voices/es_ES-davefx-medium.onnx')
         self.espeak_args = tts_config.get('espeak_args', '-v es')
+
+        # --- Caché TTS indexada (LRU por presupuesto de bytes) ---
+        self.cache = TTSCache(CACHE_DIR, max_bytes=int(tts_config.get('cache_max_mb', 200)) * 1024 * 1024)
+        self.warmup_idle_seconds = float(tts_config.get('warmup_idle_seconds', 10))
+        self._warmup_phrases = deque()
+        self._last_activity = time.time()
         
         # Resolve paths
         cwd = os.getcwd()
@@ -51,15 +164,61 @@ class Speaker:
             self.engine = 'dummy'
             self.is_available = True
 
-        self.speak_thread = threading.Thread(target=self._process_queue, daemon=True)
+        # --- Salida de audio persistente (sin aplay por locución) ---
+        self.output = None
+        self._current_proc = None # Proceso aplay en curso (solo modo fallback)
+        if tts_config.get('output', 'pyaudio') == 'pyaudio' and PYAUDIO_AVAILABLE:
+            try:
+                self.output = AudioOutput(
+                    rate=int(tts_config.get('output_rate', 22050)),
+                    device_index=tts_config.get('output_device_index')
+                )
+            except Exception as e:
+                tts_logger.error(f"No se pudo abrir la salida PyAudio persistente: {e}. Usando aplay.")
+                self.output = None
+
+        self.fillers = FillerBank(FILLER_DIR, rate=self.output.rate if self.output else None)
+
+        # --- Pipeline de 2 etapas: síntesis (N+1) solapada con reproducción (N) ---
+        self.play_queue = queue.Queue(maxsize=PLAY_QUEUE_LOOKAHEAD)
+        self._state_lock = threading.Lock()
+        self._pending = 0 # Items aceptados y aún no reproducidos
+        self._response_start = None
+        self._last_playback_end = None
+        self._epoch = 0
+        self._current_priority = None # Prioridad del clip que está sonando (None = nada sonando)
+        self._playing = None # AudioClip en reproducción
+        self._synth_priority = None # Item en síntesis: prioridad, cancelación y clip ya encolado
+        self._synth_cancelled = False
+        self._synth_clip = None
+        self._queue_wait = 0.0 # Segundos bloqueado en play_queue.put() durante el item en síntesis
+        self.latency_stats = {
+            'ttfa': deque(maxlen=100), # Time-to-first-audio por respuesta
+            'gaps': deque(maxlen=500), # Silencio entre frases consecutivas
+            'output_overhead': deque(maxlen=200) # Tiempo de reproducción - duración del audio
+        }
+
+        # --- Publicación de estado (ocupado/libre) sin sondeo ---
+        self._state_listeners = []
+        self._notify_lock = threading.Lock()
+        self._last_busy = False
+        self._idle_event = threading.Event()
+        self._idle_event.set()
+        if self.output:
+            self.output.add_activity_listener(lambda active: self._notify_state())
+
+        self.speak_thread = threading.Thread(target=self._synthesis_loop, daemon=True, name="TTS_Synthesis")
         self.speak_thread.start()
+        self.playback_thread = threading.Thread(target=self._playback_loop, daemon=True, name="TTS_Playback")
+        self.playback_thread.start()
 
     def _load_config(self):
         try:
             with open('config.json', 'r') as f:
                 return json.load(f)
         except:
-            return {}
+            # La web guarda la sección 'tts' en config/config.json
+            return ConfigManager().get_all()
 
     def _check_engine(self):
         """Verifica si el motor seleccionado es viable."""
@@ -115,159 +274,628 @@ class Speaker:
         
         return False
 
-    def _process_queue(self):
-        """Procesa la cola de habla (TTS)."""
+    def _synthesis_loop(self):
+        """
+        Etapa 1 del pipeline: convierte texto en audio (AudioClip).
+        Mientras la etapa de reproducción suena la frase N, aquí se sintetiza la N+1.
+        """
         while True:
             # Blocking get with timeout - prevents CPU spinning
             try:
-                item = self.speak_queue.get(timeout=1.0)
+                (item, trace_id), priority = self.speak_queue.get_with_priority(timeout=1.0)
             except queue.Empty:
-                # No items in queue, loop continues
+                self._warm_up_step()
                 continue
-            
-            # Handle WAV file directly
-            if isinstance(item, dict) and item.get('type') == 'wav':
-                file_path = item.get('path')
-                tts_logger.info(f"Reproduciendo WAV: {file_path}")
-                self._is_busy = True
-                try:
-                    self.event_queue.put({'type': 'speaker_status', 'status': 'speaking'})
-                    subprocess.run(f'aplay -q "{file_path}"', shell=True, check=True, timeout=5)
-                except Exception as e:
-                    tts_logger.error(f"Error reproduciendo WAV: {e}")
-                finally:
-                    self._is_busy = False
-                    self.event_queue.put({'type': 'speaker_status', 'status': 'idle'})
-                    self.speak_queue.task_done()
+
+            clip = None
+            with self._state_lock:
+                self._synth_priority = priority
+                self._synth_cancelled = False
+                self._synth_clip = None
+            try:
+                if isinstance(item, dict) and item.get('type') == 'wav':
+                    # Handle WAV file directly
+                    clip = self._new_clip(path=item.get('path'), kind='wav')
+                    self._enqueue(clip)
+                    clip.finish()
+                else:
+                    self._queue_wait = 0.0
+                    synth_start = time.perf_counter()
+                    try:
+                        with tracing.use_trace(trace_id), \
+                                tracing.span('tts.synthesis', engine=self.engine) as attrs:
+                            if isinstance(item, SpeechTemplate) and item.template:
+                                clip = self._synthesize_template(item)
+                            else:
+                                clip = self._synthesize(item)
+                            attrs['queue_wait'] = round(self._queue_wait, 4)
+                    finally:
+                        # Sin la espera por la cola de reproducción llena (span 'tts.queue_wait')
+                        TTS_SYNTHESIS.observe(time.perf_counter() - synth_start - self._queue_wait, engine=self.engine)
+            except Exception as e:
+                tts_logger.error(f"Error en síntesis ({self.engine}): {e}")
+                if clip:
+                    clip.finish()
+            finally:
+                with self._state_lock:
+                    self._synth_priority = None
+                    self._synth_clip = None
+                if clip is None:
+                    # Nada que reproducir: el item se da por terminado aquí
+                    self._item_done()
+                self.speak_queue.task_done()
+
+    def _new_clip(self, **kwargs):
+        """AudioClip del item en síntesis (época y prioridad actuales)."""
+        with self._state_lock:
+            clip = AudioClip(epoch=self._epoch, priority=self._synth_priority or 'normal', **kwargs)
+            clip.cancelled = self._synth_cancelled
+            self._synth_clip = clip
+        return clip
+
+    def _enqueue(self, clip):
+        """Pasa el clip a reproducción; la espera si el lookahead está lleno se mide aparte de la síntesis."""
+        started = time.perf_counter()
+        with tracing.span('tts.queue_wait'):
+            self.play_queue.put(clip)
+        self._queue_wait += time.perf_counter() - started
+
+    def _synthesis_aborted(self, epoch):
+        """El item en síntesis ya no se va a reproducir (stop() o interrupt())."""
+        return self._epoch != epoch or self._synth_cancelled
+
+    def _is_live(self, clip):
+        return clip.epoch == self._epoch and not clip.cancelled
+
+    def _synthesize(self, text, cache=True):
+        """
+        Sintetiza un texto y lo encola para reproducción en cuanto hay audio.
+        Con cache=False (frases con valores variables) no se guarda en la caché TTS.
+        Retorna el AudioClip encolado o None si no se generó audio.
+        """
+        tts_logger.info(f"Speaker Queue recibió: '{text}'")
+
+        # --- DUMMY MODE ---
+        if self.engine == 'dummy':
+            clip = self._new_clip(text=text, kind='dummy')
+            self._enqueue(clip)
+            clip.finish()
+            return clip
+
+        # --- TTS CACHE ---
+        cache_file = self.cache.get(text, self.engine)
+        if cache_file:
+            tts_logger.info(f"Usando audio en caché: {cache_file}")
+            clip = self._new_clip(text=text, path=cache_file)
+            self._enqueue(clip)
+            clip.finish()
+            return clip
+
+        tts_logger.info(f"Intentando decir ({self.engine}): '{text}'")
+
+        if self.engine == 'piper':
+            # El clip se encola con el primer chunk y se sigue alimentando mientras
+            # la reproducción ya ha empezado. Al terminar se escribe en la caché.
+            clip = None
+            rate = None
+            parts = []
+            completed = False
+            epoch = self._epoch
+            chunks = self._piper_chunks(text)
+            try:
+                for rate, pcm in chunks:
+                    if self._synthesis_aborted(epoch):
+                        # Speaker.stop() (barge-in) o alerta más urgente: no se sigue sintetizando audio descartado
+                        tts_logger.info(f"Síntesis interrumpida: '{text}'")
+                        break
+                    if clip is None:
+                        clip = self._new_clip(text=text, rate=rate)
+                        self._enqueue(clip)
+                    clip.add(pcm)
+                    parts.append(pcm)
+                else:
+                    completed = True
+            except Exception as e:
+                tts_logger.error(f"Error crítico en Piper: {e}")
+            finally:
+                chunks.close() # Termina el binario de Piper si se interrumpió
+                if clip:
+                    clip.finish()
+            if completed and parts and cache:
+                self.cache.put_pcm(text, self.engine, b"".join(parts), rate)
+            return clip
+
+        if self.engine.startswith('espeak') and not cache:
+            pcm, rate = self._render_pcm(text)
+            clip = self._new_clip(text=text, rate=rate)
+            self._enqueue(clip)
+            clip.add(pcm.tobytes())
+            clip.finish()
+            return clip
+
+        if self.engine.startswith('espeak'):
+            cache_file = self._render_espeak(text)
+            clip = self._new_clip(text=text, path=cache_file)
+            self._enqueue(clip)
+            clip.finish()
+            return clip
+
+        return None
+
+    def _synthesize_template(self, speech):
+        """
+        Sintetiza una SpeechTemplate: las partes fijas salen de la caché (se renderizan
+        una vez) y solo se sintetizan los huecos variables, sin cachearlos (ni la frase
+        completa: contiene valores que cambian). Se unen con fundidos cortos.
+        Si la frase completa ya está en caché, o el motor es dummy, se usa el camino normal.
+        """
+        text = str(speech)
+        if self.engine == 'dummy' or self.cache.contains(text, self.engine):
+            return self._synthesize(text)
+
+        tts_logger.info(f"Speaker Queue recibió plantilla: '{text}'")
+        start = time.time()
+        epoch = self._epoch
+        try:
+            pieces = [] # np.int16 con su rate, o float (segundos de silencio)
+            for kind, segment in speech.segments():
+                core = segment.lstrip(SEGMENT_PUNCTUATION)
+                lead = segment[:len(segment) - len(core)]
+                if kind == 'static' and _segment_pause(lead):
+                    pieces.append(_segment_pause(lead))
+                if not any(c.isalnum() for c in core):
+                    if _segment_pause(core):
+                        pieces.append(_segment_pause(core))
+                    continue
+                path = self.cache.get(core.strip(), self.engine)
+                if path:
+                    pieces.append(read_wav(path))
+                elif kind == 'static':
+                    path = self._render_to_cache(core.strip())
+                    if not path:
+                        raise RuntimeError(f"Sin audio para el segmento '{core.strip()}'")
+                    pieces.append(read_wav(path))
+                else:
+                    pieces.append(self._render_pcm(core.strip()))
+
+            rates = [p[1] for p in pieces if isinstance(p, tuple)]
+            if not rates:
+                return self._synthesize(text, cache=False)
+            rate = rates[0]
+            segments = []
+            for piece in pieces:
+                if isinstance(piece, tuple):
+                    pcm, pcm_rate = piece
+                    if pcm_rate != rate:
+                        pcm = (resample(pcm.astype(np.float32) / 32768.0, pcm_rate, rate) * 32767).astype(np.int16)
+                    segments.append(pcm)
+                else:
+                    segments.append(np.zeros(int(rate * piece), dtype=np.int16))
+            pcm = crossfade_concat(segments, rate)
+        except Exception as e:
+            tts_logger.warning(f"Plantilla TTS no disponible ({e}). Sintetizando frase completa.")
+            return self._synthesize(text, cache=False)
+
+        tts_logger.info(f"Plantilla TTS montada en {(time.time() - start) * 1000:.0f} ms: '{text}'")
+        if self._synthesis_aborted(epoch):
+            return None # Interrumpida mientras se montaba
+        clip = self._new_clip(text=text, rate=rate)
+        self._enqueue(clip)
+        clip.add(pcm.tobytes())
+        clip.finish()
+        return clip
+
+    def _render_to_cache(self, text):
+        """Sintetiza un texto directamente a la caché (sin reproducir). Retorna la ruta o None."""
+        if self.engine == 'piper':
+            rate, pcm = self._render_piper(text)
+            return self.cache.put_pcm(text, self.engine, pcm, rate) if pcm else None
+        if self.engine.startswith('espeak'):
+            return self._render_espeak(text)
+        return None
+
+    def _render_pcm(self, text):
+        """Sintetiza un texto a memoria sin tocar la caché (valores variables). Retorna (np.int16, rate)."""
+        if self.engine == 'piper':
+            rate, pcm = self._render_piper(text)
+            if not pcm:
+                raise RuntimeError(f"Piper no generó audio para '{text}'")
+            return np.frombuffer(pcm, dtype=np.int16), rate
+        if self.engine.startswith('espeak'):
+            fd, path = tempfile.mkstemp(suffix='.wav')
+            os.close(fd)
+            try:
+                bin_name = 'espeak-ng' if self.engine == 'espeak-ng' else 'espeak'
+                subprocess.run(f'{bin_name} {self.espeak_args} -w "{path}" {shlex.quote(text)}',
+                               shell=True, check=True, timeout=10)
+                return read_wav(path)
+            finally:
+                os.remove(path)
+        raise RuntimeError(f"Motor '{self.engine}' sin síntesis a memoria")
+
+    def _render_piper(self, text):
+        """(rate, pcm) completos; si la síntesis falla a medias se cierra el binario igualmente."""
+        rate = None
+        parts = []
+        chunks = self._piper_chunks(text)
+        try:
+            for rate, pcm in chunks:
+                parts.append(pcm)
+        finally:
+            chunks.close()
+        return rate, b"".join(parts)
+
+    def _piper_chunks(self, text):
+        """Genera (sample_rate, pcm) con Piper: módulo Python o binario (PCM crudo 16-bit mono)."""
+        if self.voice:
+            for chunk in self.voice.synthesize(text):
+                yield chunk.sample_rate, chunk.audio_int16_bytes
+            return
+
+        piper_bin = "piper_bin/piper/piper"
+        if not os.path.exists(piper_bin):
+            tts_logger.error("No se encontró ni módulo Python ni binario de Piper.")
+            return
+        if not os.path.exists(self.piper_model):
+            tts_logger.error(f"Modelo no encontrado: {self.piper_model}")
+            return
+
+        cmd = [piper_bin, '--model', self.piper_model, '--output_raw']
+        tts_logger.info(f"Ejecutando Piper Binary: {' '.join(cmd)}")
+        with subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                              stderr=subprocess.DEVNULL) as proc:
+            try:
+                proc.stdin.write(text.encode('utf-8'))
+                proc.stdin.close()
+                while True:
+                    pcm = proc.stdout.read(PCM_READ_SIZE)
+                    if not pcm:
+                        break
+                    yield 22050, pcm # 22050 Hz en modelos medium
+            except GeneratorExit:
+                proc.kill() # El consumidor abandonó la síntesis (Speaker.stop())
+                raise
+            if proc.wait(timeout=15) != 0:
+                raise RuntimeError(f"Piper Binary terminó con código {proc.returncode}")
+
+    def _render_espeak(self, text):
+        """Genera el WAV con espeak directamente en la caché y lo indexa."""
+        cache_file = self.cache.path_for(text, self.engine)
+        safe_text = shlex.quote(text)
+        bin_name = 'espeak-ng' if self.engine == 'espeak-ng' else 'espeak'
+        gen_cmd = f'{bin_name} {self.espeak_args} -w "{cache_file}" {safe_text}'
+        subprocess.run(gen_cmd, shell=True, check=True, timeout=10)
+        self.cache.register(text, self.engine, cache_file)
+        return cache_file
+
+    # --- Pre-renderizado en reposo (warm-up) ---
+
+    def schedule_warmup(self, phrases):
+        """
+        Encola frases frecuentes (p.ej. del historial de interacciones) para sintetizarlas
+        en la caché cuando el Speaker lleve un rato sin actividad.
+        Se añaden también sus frases sueltas, que es como llegan las respuestas en streaming.
+        """
+        seen = set(self._warmup_phrases)
+        for phrase in phrases:
+            if not phrase:
+                continue
+            segmenter = SentenceSegmenter()
+            sentences = segmenter.feed(phrase)
+            tail = segmenter.flush()
+            if tail:
+                sentences.append(tail)
+            candidates = [phrase.strip()] + (sentences if len(sentences) > 1 else [])
+            for candidate in candidates:
+                if candidate and candidate not in seen:
+                    seen.add(candidate)
+                    self._warmup_phrases.append(candidate)
+        if self._warmup_phrases:
+            tts_logger.info(f"Warm-up TTS programado: {len(self._warmup_phrases)} frases.")
+
+    def _warm_up_step(self):
+        """Sintetiza (sin reproducir) una frase pendiente de warm-up si el Speaker está ocioso."""
+        if not self._warmup_phrases or self.engine == 'dummy':
+            return
+        if self._pending > 0 or time.time() - self._last_activity < self.warmup_idle_seconds:
+            return
+
+        text = self._warmup_phrases.popleft()
+        if self.cache.contains(text, self.engine):
+            return
+        try:
+            self._render_to_cache(text)
+            tts_logger.debug(f"Warm-up TTS: '{text}'")
+        except Exception as e:
+            tts_logger.warning(f"Error en warm-up TTS: {e}")
+
+    def _playback_loop(self):
+        """Etapa 2 del pipeline: reproduce los AudioClip en orden."""
+        while True:
+            clip = self.play_queue.get()
+            with self._state_lock:
+                live = self._is_live(clip)
+                if live:
+                    self._playing = clip
+                    self._current_priority = clip.priority
+            if not live:
+                # Interrumpido con Speaker.stop()/interrupt() mientras esperaba
+                self._item_done()
                 continue
 
-            # Handle Text
-            text = item
-            tts_logger.info(f"Speaker Queue recibió: '{text}'")
             self._is_busy = True
+            playback_wall = time.time()
+            playback_start = time.perf_counter()
             try:
-                tts_logger.info(f"Intentando decir ({self.engine}): '{text}'")
-                
-                # --- DUMMY MODE ---
-                if self.engine == 'dummy':
-                    # print(f"\n[T.I.O. DICE]: {text}\n") # Reduced verbosity
-                    time.sleep(1) 
+                self._on_playback_start(clip)
+                self.event_queue.put({'type': 'speaker_status', 'status': 'speaking'})
 
-                    # Logic continues to finally block
-                
-                else:
-                    # --- TTS CACHE ---
-                    text_hash = hashlib.md5(text.encode('utf-8')).hexdigest()
-                    cache_file = os.path.join(CACHE_DIR, f"{text_hash}_{self.engine}.wav")
-                    
-                    command = None
-                    
-                    if os.path.exists(cache_file):
-                        tts_logger.info(f"Usando audio en caché: {cache_file}")
-                        command = f'aplay -q "{cache_file}"'
-                        if command:
-                            self.event_queue.put({'type': 'speaker_status', 'status': 'speaking'})
-                            subprocess.run(command, shell=True, capture_output=True, text=True, timeout=15)
-                    else:
-                        # Generate Audio
-
-                        if self.engine == 'piper':
-                            self.event_queue.put({'type': 'speaker_status', 'status': 'speaking'})
-                            
-                            if self.voice:
-                                # Python API Mode
-                                try:
-                                    stream = self.voice.synthesize(text)
-                                    first_chunk = next(stream)
-                                    rate = str(first_chunk.sample_rate)
-                                    aplay_cmd = ['aplay', '-r', rate, '-f', 'S16_LE', '-t', 'raw', '-q']
-                                    with subprocess.Popen(aplay_cmd, stdin=subprocess.PIPE) as proc:
-                                        proc.stdin.write(first_chunk.audio_int16_bytes)
-                                        for chunk in stream:
-                                            proc.stdin.write(chunk.audio_int16_bytes)
-                                        proc.stdin.close()
-                                        proc.wait(timeout=15)
-                                except StopIteration:
-                                    pass
-                                except Exception as e:
-                                    tts_logger.error(f"Error crítico en Piper (Python): {e}")
-                            
-                            else:
-                                # Binary Mode
-                                piper_bin = "piper_bin/piper/piper"
-                                if os.path.exists(piper_bin):
-                                    try:
-                                        # echo 'text' | ./piper --model model.onnx --output_raw | aplay ...
-                                        # Piper binary outputs raw 16-bit mono signed PCM
-                                        # We need to know the sample rate. Usually 22050 for medium models.
-                                        # We can parse it from json config but let's assume 22050 for now or read from config.
-                                        
-                                        # Construct command pipeline
-                                        # echo text | piper ... | aplay ...
-                                        
-                                        safe_text = shlex.quote(text)
-                                        model_path = self.piper_model
-                                        
-                                        # Check if model exists
-                                        if not os.path.exists(model_path):
-                                            tts_logger.error(f"Modelo no encontrado: {model_path}")
-                                            return
-
-                                        cmd = f'echo {safe_text} | "{piper_bin}" --model "{model_path}" --output_raw | aplay -r 22050 -f S16_LE -t raw -q'
-                                        
-                                        tts_logger.info(f"Ejecutando Piper Binary: {cmd}")
-                                        subprocess.run(cmd, shell=True, check=True, timeout=15)
-                                        
-                                    except subprocess.CalledProcessError as e:
-                                        tts_logger.error(f"Error ejecutando Piper Binary: {e}")
-                                    except Exception as e:
-                                        tts_logger.error(f"Error general en Piper Binary: {e}")
-                                else:
-                                    tts_logger.error("No se encontró ni módulo Python ni binario de Piper.")
-
-                        elif self.engine.startswith('espeak'):
-                            safe_text = shlex.quote(text)
-                            bin_name = 'espeak-ng' if self.engine == 'espeak-ng' else 'espeak'
-                            gen_cmd = f'{bin_name} {self.espeak_args} -w "{cache_file}" {safe_text}'
-                            subprocess.run(gen_cmd, shell=True, check=True, timeout=10)
-                            command = f'aplay -q "{cache_file}"'
-                            
-                            if command:
-                                self.event_queue.put({'type': 'speaker_status', 'status': 'speaking'})
-                                subprocess.run(command, shell=True, capture_output=True, text=True, timeout=15)
-                                
+                if clip.kind == 'dummy':
+                    time.sleep(1)
+                elif clip.path:
+                    if clip.kind == 'wav':
+                        tts_logger.info(f"Reproduciendo WAV: {clip.path}")
+                    clip.wait_finished()
+                    self._play_file(clip.path)
+                elif clip.rate:
+                    self._play_stream(clip)
             except subprocess.TimeoutExpired:
-                tts_logger.error(f"Timeout en Speaker ({self.engine}) procesando: '{text}'")
+                tts_logger.error(f"Timeout en Speaker ({self.engine}) reproduciendo: '{clip.text}'")
             except Exception as e:
                 tts_logger.error(f"Error en Speaker ({self.engine}): {e}")
             finally:
-                self._is_busy = False
-                self.event_queue.put({'type': 'speaker_status', 'status': 'idle'})
-                self.speak_queue.task_done()
+                TTS_PLAYBACK.observe(time.perf_counter() - playback_start, kind=clip.kind)
+                if clip.trace_id:
+                    tracing.record_span('tts.playback', playback_wall, time.time(), trace_id=clip.trace_id, kind=clip.kind)
+                self._current_proc = None
+                with self._state_lock:
+                    self._playing = None
+                    self._current_priority = None
+                self._on_playback_end()
+                self._item_done()
+
+    def _play_file(self, path):
+        """Reproduce un WAV por la salida persistente (o aplay como fallback)."""
+        start = time.time()
+        if self.output:
+            pcm, rate = read_wav(path)
+            self.output.play(pcm, rate, channel='tts').wait(timeout=30)
+            duration = len(pcm) / rate
+        else:
+            with wave.open(path, 'rb') as wf:
+                duration = wf.getnframes() / wf.getframerate()
+            self._current_proc = subprocess.Popen(['aplay', '-q', path], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            self._current_proc.wait(timeout=15)
+        self._record_output_overhead(time.time() - start, duration)
+
+    def _play_stream(self, clip):
+        """Reproduce PCM crudo a medida que llega de la etapa de síntesis."""
+        start = time.time()
+        total_bytes = 0
+        if self.output:
+            handle = self.output.open_stream('tts', clip.rate)
+            for pcm in clip.iter_pcm():
+                if not self._is_live(clip):
+                    break
+                handle.write(pcm)
+                total_bytes += len(pcm)
+            handle.close()
+            handle.wait(timeout=30)
+        else:
+            aplay_cmd = ['aplay', '-r', str(clip.rate), '-f', 'S16_LE', '-t', 'raw', '-q']
+            with subprocess.Popen(aplay_cmd, stdin=subprocess.PIPE) as proc:
+                self._current_proc = proc
+                for pcm in clip.iter_pcm():
+                    proc.stdin.write(pcm)
+                    total_bytes += len(pcm)
+                proc.stdin.close()
+                proc.wait(timeout=15)
+        if self._is_live(clip):
+            self._record_output_overhead(time.time() - start, total_bytes / 2 / clip.rate)
+
+    def _record_output_overhead(self, elapsed, duration):
+        # Lo que tarda en sonar de más respecto a la duración real del audio
+        # (arranque de proceso + apertura del dispositivo en modo aplay).
+        with self._state_lock:
+            self.latency_stats['output_overhead'].append(max(0.0, elapsed - duration))
+
+    def stop(self):
+        """
+        Interrumpe la locución en curso y vacía las colas.
+        Con la salida persistente solo se vacían buffers (no se reabre el dispositivo).
+        """
+        with self._state_lock:
+            self._epoch += 1
+        flushed = 0
+        for q in (self.speak_queue, self.play_queue):
+            while True:
+                try:
+                    q.get_nowait()
+                except queue.Empty:
+                    break
+                flushed += 1
+                if q is self.speak_queue:
+                    q.task_done()
+        for _ in range(flushed):
+            self._item_done()
+
+        if self.output:
+            self.output.stop('tts')
+        elif self._current_proc:
+            try:
+                self._current_proc.kill()
+            except Exception:
+                pass
+        tts_logger.info(f"Speaker interrumpido ({flushed} items descartados).")
+
+    def interrupt(self, priority):
+        """
+        Deja paso a una locución de prioridad `priority`: corta el clip que suena y descarta
+        lo encolado solo si es menos urgente. Las alertas ya encoladas se conservan.
+        """
+        level = PRIORITIES[priority]
+        lower = lambda name: PRIORITIES.get(name, PRIORITIES['normal']) > level
+        with self._state_lock:
+            if self._synth_priority is not None and lower(self._synth_priority):
+                self._synth_cancelled = True
+                if self._synth_clip:
+                    self._synth_clip.cancelled = True
+            playing = self._playing if self._playing and lower(self._playing.priority) else None
+            if playing:
+                playing.cancelled = True
+        # Clips ya sintetizados: se marcan y la reproducción los salta (y los da por terminados)
+        with self.play_queue.mutex:
+            for clip in self.play_queue.queue:
+                if lower(clip.priority):
+                    clip.cancelled = True
+        dropped = self.speak_queue.discard_below(priority)
+        for _ in range(dropped):
+            self._item_done()
+
+        if playing and self._playing is playing:
+            if self.output:
+                self.output.stop('tts')
+            elif self._current_proc:
+                try:
+                    self._current_proc.kill()
+                except Exception:
+                    pass
+        tts_logger.info(f"Speaker: paso a '{priority}' ({dropped} items menos urgentes descartados).")
+
+    # --- Estado del pipeline y métricas de latencia ---
+
+    def _item_done(self):
+        """Marca un item como terminado. Emite 'idle' solo cuando no queda nada pendiente."""
+        with self._state_lock:
+            self._pending = max(0, self._pending - 1)
+            idle = self._pending == 0
+        if idle:
+            self._is_busy = False
+            self._last_activity = time.time()
+            self.event_queue.put({'type': 'speaker_status', 'status': 'idle'})
+            self._notify_state()
+
+    def add_state_listener(self, callback):
+        """callback(busy: bool) en cada transición ocupado <-> libre (TTS, WAV o filler)."""
+        self._state_listeners.append(callback)
 
-    def speak(self, text):
-        if self.is_available: self.speak_queue.put(text)
+    def wait_until_idle(self, timeout=None):
+        """Bloquea hasta que el Speaker queda libre. Retorna False si vence el timeout."""
+        return self._idle_event.wait(timeout)
+
+    def _notify_state(self):
+        with self._notify_lock:
+            busy = self.is_busy
+            if busy == self._last_busy:
+                return
+            self._last_busy = busy
+            if busy:
+                self._idle_event.clear()
+            else:
+                self._idle_event.set()
+            for callback in self._state_listeners:
+                try:
+                    callback(busy)
+                except Exception as e:
+                    tts_logger.error(f"Error en listener de estado del Speaker: {e}")
+
+    def _on_playback_start(self, clip):
+        now = time.time()
+        with self._state_lock:
+            # Time-to-first-audio: desde mark_response_start() hasta la primera frase audible
+            if self._response_start and clip.kind != 'wav':
+                ttfa = now - self._response_start
+                self.latency_stats['ttfa'].append(ttfa)
+                TTS_TTFA.observe(ttfa)
+                self._response_start = None
+                tts_logger.info(f"Time-to-first-audio: {ttfa * 1000:.0f} ms")
+            # Hueco entre frases consecutivas del mismo pipeline
+            if self._last_playback_end is not None:
+                self.latency_stats['gaps'].append(now - self._last_playback_end)
+            self._last_playback_end = None
+
+    def _on_playback_end(self):
+        with self._state_lock:
+            # Solo cuenta como hueco si ya había otra frase esperando
+            self._last_playback_end = time.time() if self._pending > 1 else None
+
+    def mark_response_start(self):
+        """Marca el inicio de una respuesta (p.ej. petición al LLM) para medir el time-to-first-audio."""
+        with self._state_lock:
+            self._response_start = time.time()
+
+    def get_latency_stats(self):
+        """Resumen de latencias del pipeline TTS (segundos)."""
+        def summary(values):
+            if not values:
+                return {'count': 0, 'avg': None, 'p95': None, 'last': None}
+            ordered = sorted(values)
+            return {
+                'count': len(ordered),
+                'avg': round(sum(ordered) / len(ordered), 3),
+                'p95': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+                'last': round(values[-1], 3)
+            }
+        with self._state_lock:
+            return {key: summary(values) for key, values in self.latency_stats.items()}
+
+    def speak(self, text, priority='normal', trace_id=None):
+        """
+        Encola una locución en el carril de su prioridad (las más urgentes se sintetizan antes).
+        Una alerta 'critical' corta la locución en curso y lo encolado de menor prioridad (no otras alertas).
+        `trace_id` continúa la traza de la frase del usuario (spans de síntesis y reproducción).
+        """
+        if self.is_available:
+            if priority == 'critical' and self.is_speaking:
+                current = self._current_priority
+                if current is not None and PRIORITIES[current] > PRIORITIES['critical']:
+                    tts_logger.warning(f"Alerta crítica: interrumpiendo locución '{current}'.")
+                self.interrupt('critical')
+            with self._state_lock:
+                self._pending += 1
+            self._last_activity = time.time()
+            self._notify_state()
+            self.speak_queue.put((text, trace_id), priority=priority if priority in PRIORITIES else 'normal')
     
     def play_wav(self, file_path):
         """Reproduce un archivo WAV directamente."""
         if self.is_available and os.path.exists(file_path):
-            self.speak_queue.put({'type': 'wav', 'path': file_path})
+            with self._state_lock:
+                self._pending += 1
+            self._last_activity = time.time()
+            self._notify_state()
+            self.speak_queue.put(({'type': 'wav', 'path': file_path}, None))
 
     def play_random_filler(self):
-        """Reproduce una palabra de relleno aleatoria."""
-        filler_dir = "resources/sounds/fillers"
-        if not os.path.exists(filler_dir):
-            return
-        
+        """
+        Reproduce una palabra de relleno aleatoria.
+        Con la salida persistente suena al instante por el canal 'filler' (sin pasar por
+        la cola de síntesis ni tocar disco); si no, se encola como WAV.
+        """
         try:
-            files = [f for f in os.listdir(filler_dir) if f.endswith('.wav')]
-            if files:
-                import random
-                selected = random.choice(files)
-                self.play_wav(os.path.join(filler_dir, selected))
+            clip = self.fillers.choice()
+            if not clip:
+                return
+            path, pcm, rate = clip
+            if self.output:
+                self.output.play(pcm, rate, channel='filler')
+            else:
+                self.play_wav(path)
         except Exception as e:
             tts_logger.error(f"Error seleccionando filler: {e}")
 
     @property
-    def is_busy(self): return self._is_busy or not self.speak_queue.empty()
+    def is_speaking(self):
+        """Hay locución TTS/WAV en cola o sonando (sin contar fillers)."""
+        return self._pending > 0
+
+    @property
+    def is_busy(self):
+        return self._is_busy or self._pending > 0 or bool(self.output and self.output.is_active('filler'))
 
+def _segment_pause(punctuation):
+    """Silencio (s) que corresponde a la puntuación en el límite de un segmento."""
+    for marks, pause in SEGMENT_PAUSES:
+        if any(c in marks for c in punctuation):
+            return pause
+    return 0
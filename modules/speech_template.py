@@ -0,0 +1,39 @@
+import string
+
+class SpeechTemplate(str):
+    """
+    Respuesta hablada con partes fijas y huecos variables.
+    Se comporta como el texto ya renderizado (logs, UI, historial), pero conserva la
+    plantilla para que el Speaker cachee el audio de las partes fijas y solo sintetice
+    los huecos (hora, temperatura, % de CPU, etiqueta de alarma...).
+
+        SpeechTemplate.render("Hola {name}, ¿en qué puedo ayudarte?", name="Ana")
+    """
+
+    def __new__(cls, text, template=None, slots=None):
+        obj = super().__new__(cls, text)
+        obj.template = template
+        obj.slots = slots or {}
+        return obj
+
+    @classmethod
+    def render(cls, template, **slots):
+        slots = {key: str(value) for key, value in slots.items()}
+        return cls(template.format(**slots), template=template, slots=slots)
+
+    def segments(self):
+        """
+        Lista de (kind, text) en orden: kind es 'static' (texto fijo de la plantilla)
+        o 'slot' (valor variable ya sustituido). Omite los fragmentos vacíos.
+        """
+        if not self.template:
+            return [('slot', str(self))]
+        parts = []
+        for literal, field, _, _ in string.Formatter().parse(self.template):
+            if literal:
+                parts.append(('static', literal))
+            if field is not None:
+                value = self.slots.get(field, '')
+                if value:
+                    parts.append(('slot', value))
+        return parts
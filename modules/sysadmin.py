@@ -5,6 +5,10 @@ import socket
 import platform
 import time
 
+from modules.metrics_sampler import MetricsSampler
+from modules.process_sampler import ProcessSampler
+from modules.systemd_units import SystemctlBackend, is_installed
+
 class SysAdminManager:
     """
     Gestor de administración del sistema.
@@ -12,67 +16,40 @@ class SysAdminManager:
     gestionar servicios systemd y ejecutar comandos de shell.
     """
     def __init__(self):
-        pass
+        # Métricas del host: un único muestreador compartido (CPU, RAM, disco, temperatura)
+        self.metrics = MetricsSampler.instance()
+        self.processes = ProcessSampler.instance().start() # Bases cebadas antes de la primera consulta
+        # Estado de servicios: una sola llamada `systemctl show` por consulta
+        self.systemd = SystemctlBackend()
 
     def get_cpu_temp(self):
         """
-        Obtiene la temperatura de la CPU de forma compatible con múltiples sistemas.
-        Intenta usar psutil primero, luego fallback a ficheros de sistema (Raspberry Pi).
+        Temperatura de la CPU (última muestra del MetricsSampler, compatible con múltiples sistemas).
         """
-        try:
-            # Método 1: psutil.sensors_temperatures() (Linux estándar)
-            temps = psutil.sensors_temperatures()
-            if temps:
-                # Busca sensores comunes
-                for name in ['cpu_thermal', 'coretemp', 'k10temp', 'acpitz']:
-                    if name in temps:
-                        # Devuelve la temperatura del primer núcleo/sensor encontrado
-                        return f"{temps[name][0].current:.1f}°C"
-                
-                # Si no coincide con nombres conocidos, devuelve el primero que encuentre
-                first_key = list(temps.keys())[0]
-                return f"{temps[first_key][0].current:.1f}°C"
-        except Exception as e:
-            logging.error(f"Error leyendo temperatura con psutil: {e}")
-
-        # Método 2: Fallback específico para Raspberry Pi
-        try:
-            with open("/sys/class/thermal/thermal_zone0/temp", "r") as f:
-                temp = int(f.read()) / 1000.0
-            return f"{temp:.1f}°C"
-        except FileNotFoundError:
-            pass
-
-        return "N/A"
+        temp = self.metrics.snapshot().temp_c
+        return f"{temp:.1f}°C" if temp is not None else "N/A"
 
     def get_cpu_usage(self):
-        """Obtiene el porcentaje de uso de la CPU."""
+        """Obtiene el porcentaje de uso de la CPU (sin bloquear: última muestra)."""
         try:
-            return f"{psutil.cpu_percent(interval=0.1)}%"
+            return f"{self.metrics.snapshot().cpu_percent}%"
         except Exception:
             return "N/A"
 
     def get_disk_usage(self):
         """Devuelve el uso de disco en porcentaje."""
         try:
-            return psutil.disk_usage('/').percent
+            return self.metrics.snapshot().disk_percent
         except:
             return 0
 
-    def get_top_processes(self, limit=10):
-        """Devuelve los procesos que más recursos consumen."""
-        processes = []
+    def get_top_processes(self, limit=10, sort='cpu'):
+        """
+        Devuelve los procesos que más recursos consumen ('cpu' o 'memory').
+        Lectura instantánea del ProcessSampler (deltas de CPU entre ticks en segundo plano).
+        """
         try:
-            for proc in psutil.process_iter(['pid', 'name', 'username', 'cpu_percent', 'memory_percent']):
-                try:
-                    pinfo = proc.info
-                    processes.append(pinfo)
-                except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-                    pass
-            
-            # Ordenar por CPU y luego Memoria
-            processes.sort(key=lambda p: p['cpu_percent'], reverse=True)
-            return processes[:limit]
+            return self.processes.top(limit, sort)
         except Exception as e:
             print(f"Error getting processes: {e}")
             return []
@@ -80,8 +57,7 @@ class SysAdminManager:
     def get_ram_usage(self):
         """Obtiene el porcentaje de uso de la memoria RAM."""
         try:
-            ram = psutil.virtual_memory()
-            return f"{ram.percent}%"
+            return f"{self.metrics.snapshot().ram_percent}%"
         except Exception:
             return "N/A"
 
@@ -96,18 +72,15 @@ class SysAdminManager:
 
     def is_service_installed(self, service_name):
         """Comprueba si un servicio existe en el sistema (instalado/loaded)."""
+        return service_name in self.get_installed_services([service_name])
+
+    def get_installed_services(self, services):
+        """Filtra los servicios instalados con una única consulta (LoadState distinto de 'not-found')."""
         try:
-            # Opción 1: Check unit file presence
-            # systemctl list-unit-files <name>*
-            cmd = subprocess.run(
-                ['systemctl', 'list-unit-files', f'{service_name}*', '--no-pager'], 
-                capture_output=True, text=True
-            )
-            # Si el servicio aparece en la salida, existe.
-            # Ojo: '0 unit files listed' indica que no existe.
-            return service_name in cmd.stdout
+            states = self.systemd.query(services)
         except Exception:
-            return False
+            return []
+        return [srv for srv in services if is_installed(states.get(srv))]
 
     def get_services(self, services=None):
         """
@@ -122,18 +95,12 @@ class SysAdminManager:
                 'mysql', 'mariadb', 'fail2ban', 'bluetooth'
             ]
             
-        status_list = []
-        
-        for srv in services:
-            try:
-                # systemctl is-active devuelve 0 si activo, otro si no
-                cmd = subprocess.run(['systemctl', 'is-active', srv], capture_output=True, text=True)
-                state = cmd.stdout.strip()
-                status_list.append({'name': srv, 'status': state})
-            except Exception:
-                status_list.append({'name': srv, 'status': 'unknown'})
-        
-        return status_list
+        try:
+            states = self.systemd.query(services)
+        except Exception:
+            states = {}
+        # 'status' mantiene el valor de `systemctl is-active` (ActiveState)
+        return [{'name': srv, 'status': states[srv].active_state if srv in states else 'unknown'} for srv in services]
 
     def control_service(self, service_name, action):
         """
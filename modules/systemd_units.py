@@ -0,0 +1,134 @@
+import time
+import logging
+import threading
+import subprocess
+from collections import namedtuple
+
+logger = logging.getLogger("SystemdUnits")
+
+UnitState = namedtuple('UnitState', ['name', 'load_state', 'active_state', 'sub_state'])
+
+# Estados que no cuentan como caída ('activating' puede ser un arranque en curso)
+UP_STATES = ('active', 'activating', 'reloading')
+
+def is_installed(state):
+    # 'unknown': systemctl no respondió (no se sabe; no se trata como instalado)
+    return state is not None and state.load_state not in ('not-found', 'unknown')
+
+def is_down(state):
+    # Solo unidades cargadas: una enmascarada o sin respuesta no se intenta reiniciar
+    return state is not None and state.load_state == 'loaded' and state.active_state not in UP_STATES
+
+class SystemctlBackend:
+    """Estado de todas las unidades con una sola llamada `systemctl show` (un proceso por consulta)."""
+    PROPERTIES = ('Id', 'LoadState', 'ActiveState', 'SubState')
+
+    def __init__(self, timeout=10):
+        self.timeout = timeout
+
+    def query(self, units):
+        """{unidad: UnitState} en el orden pedido (las que no existen llegan con load_state 'not-found')."""
+        units = list(units)
+        if not units:
+            return {}
+        cmd = ['systemctl', 'show', '--no-pager'] + [f'--property={p}' for p in self.PROPERTIES] + units
+        try:
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=self.timeout)
+        except (FileNotFoundError, subprocess.TimeoutExpired) as e:
+            logger.warning(f"systemctl show falló: {e}")
+            return {unit: UnitState(unit, 'unknown', 'unknown', 'unknown') for unit in units}
+        return self.parse(result.stdout, units)
+
+    @staticmethod
+    def parse(output, units):
+        """Un bloque 'Clave=Valor' por unidad, separados por líneas en blanco y en el orden pedido."""
+        blocks = []
+        for chunk in output.strip().split('\n\n'):
+            props = dict(line.split('=', 1) for line in chunk.splitlines() if '=' in line)
+            if props:
+                blocks.append(props)
+
+        def to_state(unit, props):
+            return UnitState(unit, props.get('LoadState', 'unknown'), props.get('ActiveState', 'unknown'),
+                             props.get('SubState', 'unknown'))
+
+        if len(blocks) == len(units):
+            return {unit: to_state(unit, props) for unit, props in zip(units, blocks)}
+        # Alguna unidad no devolvió bloque (nombre inválido): se empareja por Id
+        by_id = {props.get('Id'): props for props in blocks}
+        return {unit: to_state(unit, by_id.get(unit) or by_id.get(f'{unit}.service') or {}) for unit in units}
+
+class FakeSystemdBackend:
+    """Backend en memoria para pruebas: las unidades no definidas aparecen como 'not-found'."""
+
+    def __init__(self, states=None):
+        self.units = {}
+        self.queries = 0
+        for name, active_state in (states or {}).items():
+            self.set_state(name, active_state)
+
+    def set_state(self, name, active_state, load_state='loaded', sub_state=None):
+        self.units[name] = UnitState(name, load_state, active_state,
+                                     sub_state or ('running' if active_state == 'active' else 'dead'))
+
+    def remove(self, name):
+        self.units.pop(name, None)
+
+    def query(self, units):
+        self.queries += 1
+        return {unit: self.units.get(unit, UnitState(unit, 'not-found', 'inactive', 'dead')) for unit in units}
+
+class UnitMonitor:
+    """
+    Vigila un conjunto de unidades con una consulta por ciclo (`systemctl show` en lote)
+    y avisa a los listeners solo cuando una unidad cambia de estado.
+    El último estado queda en memoria: states() no lanza procesos.
+    """
+
+    def __init__(self, units, backend=None, interval=5.0):
+        self.units = list(units)
+        self.backend = backend or SystemctlBackend()
+        self.interval = interval
+        self._states = {}
+        self._listeners = []
+        self._running = False
+        self._thread = None
+
+    def add_listener(self, callback):
+        """callback(nombre, estado_anterior, estado_nuevo); el anterior es None en la primera lectura."""
+        self._listeners.append(callback)
+
+    def states(self):
+        return dict(self._states)
+
+    def refresh(self):
+        """Consulta todas las unidades de una vez y notifica las transiciones."""
+        states = self.backend.query(self.units)
+        previous, self._states = self._states, states
+        for name, state in states.items():
+            old = previous.get(name)
+            if old is None or old.active_state != state.active_state or old.load_state != state.load_state:
+                for callback in self._listeners:
+                    try:
+                        callback(name, old, state)
+                    except Exception as e:
+                        logger.error(f"Error en listener de unidades ({name}): {e}")
+        return states
+
+    def start(self):
+        if self._thread is None:
+            self._running = True
+            self._thread = threading.Thread(target=self._run, daemon=True, name="Unit_Monitor")
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._running = False
+
+    def _run(self):
+        while self._running:
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Error consultando unidades systemd: {e}")
+            time.sleep(self.interval)
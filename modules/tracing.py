@@ -0,0 +1,271 @@
+import os
+import json
+import time
+import uuid
+import queue
+import sqlite3
+import logging
+import threading
+import contextvars
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from modules.config_manager import ConfigManager
+
+logger = logging.getLogger("Tracing")
+
+# Traza y span actuales del hilo/contexto (los hilos nuevos empiezan sin traza: se propaga con use_trace)
+_current_trace = contextvars.ContextVar('neo_trace_id', default=None)
+_current_span = contextvars.ContextVar('neo_span_id', default=None)
+
+def _new_id():
+    return uuid.uuid4().hex[:16]
+
+class Tracer:
+    """
+    Trazas extremo a extremo por frase (captura -> STT -> router -> acción -> TTS).
+    - Cada traza agrupa spans (nombre, inicio, fin, atributos) con marcas de tiempo de pared.
+    - Las últimas `ring_size` trazas viven en memoria (OrderedDict acotado) para la vista web.
+    - Un hilo escritor las vuelca por lotes a SQLite (WAL) y aplica la retención; el camino
+      caliente solo añade a una lista y a una cola, sin I/O.
+    """
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    @classmethod
+    def instance(cls):
+        with cls._instance_lock:
+            if cls._instance is None:
+                config = ConfigManager().get('tracing', {})
+                cls._instance = cls(db_path=config.get('db_path', 'data/traces.db'),
+                                    ring_size=config.get('ring_size', 200),
+                                    retention_days=config.get('retention_days', 7),
+                                    enabled=config.get('enabled', True))
+            return cls._instance
+
+    def __init__(self, db_path='data/traces.db', ring_size=200, retention_days=7, enabled=True, flush_interval=1.0):
+        self.db_path = db_path
+        self.ring_size = ring_size
+        self.retention_days = retention_days
+        self.enabled = enabled
+        self.flush_interval = flush_interval
+        self._traces = OrderedDict() # trace_id -> {'trace_id', 'name', 'start', 'attrs', 'spans'}
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock() # La conexión SQLite (el camino caliente solo toma _lock)
+        self._writes = queue.Queue()
+        self._conn = None
+        if enabled and db_path:
+            threading.Thread(target=self._writer_loop, daemon=True, name="Trace_Writer").start()
+
+    # --- Escritura ---
+
+    def start_trace(self, name, start=None, **attrs):
+        trace_id = _new_id()
+        if not self.enabled:
+            return trace_id
+        trace = {'trace_id': trace_id, 'name': name, 'start': start or time.time(), 'attrs': attrs, 'spans': []}
+        with self._lock:
+            self._traces[trace_id] = trace
+            while len(self._traces) > self.ring_size:
+                self._traces.popitem(last=False)
+        self._writes.put(('trace', trace))
+        return trace_id
+
+    def add_span(self, trace_id, name, start, end, parent_id=None, span_id=None, **attrs):
+        """Registra un span ya medido (p.ej. VAD/STT medidos antes de existir la traza)."""
+        if not self.enabled or not trace_id:
+            return
+        span = {'span_id': span_id or _new_id(), 'trace_id': trace_id, 'parent_id': parent_id, 'name': name,
+                'start': start, 'end': end, 'thread': threading.current_thread().name, 'attrs': attrs}
+        with self._lock:
+            trace = self._traces.get(trace_id)
+            if trace is not None:
+                trace['spans'].append(span)
+        self._writes.put(('span', span))
+
+    # --- Consulta ---
+
+    @staticmethod
+    def _summary(trace):
+        spans = trace['spans']
+        end = max((s['end'] for s in spans), default=trace['start'])
+        return {'trace_id': trace['trace_id'], 'name': trace['name'], 'start': trace['start'],
+                'duration': round(end - trace['start'], 4), 'spans': len(spans), 'attrs': trace['attrs']}
+
+    def recent(self, limit=50):
+        """Resumen de las últimas trazas (memoria y, si no bastan, SQLite)."""
+        with self._lock:
+            traces = [self._summary(t) for t in reversed(self._traces.values())][:limit]
+        if len(traces) < limit:
+            seen = {t['trace_id'] for t in traces}
+            older = self._query_db_summaries(limit, before=traces[-1]['start'] if traces else None)
+            traces.extend(t for t in older if t['trace_id'] not in seen)
+        return traces[:limit]
+
+    def get(self, trace_id):
+        """Traza completa con sus spans ordenados por inicio (None si no existe)."""
+        with self._lock:
+            trace = self._traces.get(trace_id)
+            if trace is not None:
+                trace = dict(trace, spans=list(trace['spans']))
+        if trace is None:
+            trace = self._query_db_trace(trace_id)
+            if trace is None:
+                return None
+        trace['spans'].sort(key=lambda s: s['start'])
+        trace.update(self._summary(trace), spans=trace['spans'])
+        return trace
+
+    # --- SQLite ---
+
+    def _connect(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+            self._conn.execute("PRAGMA journal_mode=WAL;")
+            self._conn.execute("PRAGMA synchronous=NORMAL;")
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS traces (
+                    trace_id TEXT PRIMARY KEY,
+                    name TEXT,
+                    start REAL,
+                    attrs TEXT
+                )
+            ''')
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS spans (
+                    span_id TEXT PRIMARY KEY,
+                    trace_id TEXT,
+                    parent_id TEXT,
+                    name TEXT,
+                    start REAL,
+                    end REAL,
+                    thread TEXT,
+                    attrs TEXT
+                )
+            ''')
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_traces_start ON traces(start)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_spans_trace ON spans(trace_id)")
+            self._conn.commit()
+        return self._conn
+
+    def _writer_loop(self):
+        last_cleanup = 0
+        while True:
+            batch = [self._writes.get()]
+            time.sleep(self.flush_interval) # Agrupa la ráfaga de spans de una frase en una transacción
+            while True:
+                try:
+                    batch.append(self._writes.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                with self._db_lock:
+                    conn = self._connect()
+                    conn.executemany("INSERT OR REPLACE INTO traces VALUES (?, ?, ?, ?)",
+                                     [(t['trace_id'], t['name'], t['start'], json.dumps(t['attrs'], default=str))
+                                      for kind, t in batch if kind == 'trace'])
+                    conn.executemany("INSERT OR REPLACE INTO spans VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                     [(s['span_id'], s['trace_id'], s['parent_id'], s['name'], s['start'], s['end'],
+                                       s['thread'], json.dumps(s['attrs'], default=str))
+                                      for kind, s in batch if kind == 'span'])
+                    if self.retention_days and time.time() - last_cleanup > 3600:
+                        cutoff = time.time() - self.retention_days * 86400
+                        conn.execute("DELETE FROM spans WHERE trace_id IN (SELECT trace_id FROM traces WHERE start < ?)", (cutoff,))
+                        conn.execute("DELETE FROM traces WHERE start < ?", (cutoff,))
+                        last_cleanup = time.time()
+                    conn.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Error guardando trazas: {e}")
+
+    def _query_db_summaries(self, limit, before=None):
+        if not self.enabled or not self.db_path or not os.path.exists(self.db_path):
+            return []
+        try:
+            with self._db_lock:
+                rows = self._connect().execute('''
+                    SELECT t.trace_id, t.name, t.start, t.attrs, COUNT(s.span_id) AS spans, MAX(s.end) AS last_end
+                    FROM traces t LEFT JOIN spans s ON s.trace_id = t.trace_id
+                    WHERE t.start < ? GROUP BY t.trace_id ORDER BY t.start DESC LIMIT ?
+                ''', (before or time.time() + 1, limit)).fetchall()
+        except sqlite3.Error as e:
+            logger.error(f"Error leyendo trazas: {e}")
+            return []
+        return [{'trace_id': r['trace_id'], 'name': r['name'], 'start': r['start'],
+                 'duration': round((r['last_end'] or r['start']) - r['start'], 4),
+                 'spans': r['spans'], 'attrs': json.loads(r['attrs'] or '{}')} for r in rows]
+
+    def _query_db_trace(self, trace_id):
+        if not self.enabled or not self.db_path or not os.path.exists(self.db_path):
+            return None
+        try:
+            with self._db_lock:
+                conn = self._connect()
+                row = conn.execute("SELECT * FROM traces WHERE trace_id = ?", (trace_id,)).fetchone()
+                spans = conn.execute("SELECT * FROM spans WHERE trace_id = ?", (trace_id,)).fetchall() if row else []
+        except sqlite3.Error as e:
+            logger.error(f"Error leyendo traza {trace_id}: {e}")
+            return None
+        if row is None:
+            return None
+        return {'trace_id': row['trace_id'], 'name': row['name'], 'start': row['start'],
+                'attrs': json.loads(row['attrs'] or '{}'),
+                'spans': [dict(s, attrs=json.loads(s['attrs'] or '{}')) for s in spans]}
+
+# --- API de conveniencia (traza actual en un contextvar) ---
+
+def current_trace_id():
+    return _current_trace.get()
+
+@contextmanager
+def trace(name, start=None, **attrs):
+    """Abre una traza nueva y la deja como actual dentro del bloque: with trace('voz') as trace_id: ..."""
+    trace_id = Tracer.instance().start_trace(name, start=start, **attrs)
+    token = _current_trace.set(trace_id)
+    span_token = _current_span.set(None)
+    try:
+        yield trace_id
+    finally:
+        _current_span.reset(span_token)
+        _current_trace.reset(token)
+
+@contextmanager
+def use_trace(trace_id):
+    """Continúa en este hilo una traza creada en otro (p.ej. el Speaker o la cola de eventos)."""
+    token = _current_trace.set(trace_id)
+    span_token = _current_span.set(None)
+    try:
+        yield trace_id
+    finally:
+        _current_span.reset(span_token)
+        _current_trace.reset(token)
+
+@contextmanager
+def span(name, **attrs):
+    """
+    Mide el bloque como span de la traza actual (hijo del span abierto). Sin traza no hace nada.
+    Produce el dict de atributos para añadir resultados: with span('router') as attrs: attrs['label'] = ...
+    """
+    trace_id = _current_trace.get()
+    if trace_id is None:
+        yield attrs
+        return
+    span_id = _new_id()
+    parent_id = _current_span.get()
+    token = _current_span.set(span_id)
+    start = time.time()
+    try:
+        yield attrs
+    except Exception as e:
+        attrs['error'] = str(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        Tracer.instance().add_span(trace_id, name, start, time.time(), parent_id=parent_id, span_id=span_id, **attrs)
+
+def record_span(name, start, end, trace_id=None, **attrs):
+    """Span ya medido en la traza indicada (o la actual)."""
+    trace_id = trace_id or _current_trace.get()
+    if trace_id:
+        Tracer.instance().add_span(trace_id, name, start, end, parent_id=_current_span.get(), **attrs)
@@ -0,0 +1,169 @@
+import os
+import time
+import wave
+import sqlite3
+import hashlib
+import logging
+import threading
+
+logger = logging.getLogger("TTSCache")
+
+class TTSCache:
+    """
+    Caché de audio TTS con índice (tamaño, último uso, nº de aciertos) en SQLite.
+    - Ficheros WAV `md5(texto)_{engine}.wav` (mismo esquema que la caché anterior).
+    - Escritura para todos los motores (Piper Python/binario, espeak).
+    - Expulsión LRU hasta un presupuesto de bytes configurable.
+    """
+
+    def __init__(self, cache_dir="tts_cache", max_bytes=200 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        self.conn = sqlite3.connect(os.path.join(self.cache_dir, "index.db"), check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL;")
+        self.conn.execute("PRAGMA synchronous=NORMAL;")
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS entries (
+                filename TEXT PRIMARY KEY,
+                text TEXT,
+                engine TEXT,
+                size INTEGER,
+                created REAL,
+                last_used REAL,
+                hits INTEGER DEFAULT 0
+            )
+        ''')
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_last_used ON entries(last_used)")
+        self.conn.commit()
+
+        self._adopt_orphans()
+        self.evict()
+
+    @staticmethod
+    def filename_for(text, engine):
+        text_hash = hashlib.md5(text.encode('utf-8')).hexdigest()
+        return f"{text_hash}_{engine}.wav"
+
+    def path_for(self, text, engine):
+        """Ruta donde se guarda (o guardaría) el audio de un texto."""
+        return os.path.join(self.cache_dir, self.filename_for(text, engine))
+
+    def get(self, text, engine):
+        """Retorna la ruta del WAV cacheado (actualizando último uso y aciertos) o None."""
+        filename = self.filename_for(text, engine)
+        path = os.path.join(self.cache_dir, filename)
+        with self._lock:
+            if not os.path.exists(path):
+                self.conn.execute("DELETE FROM entries WHERE filename = ?", (filename,))
+                self.conn.commit()
+                return None
+            cursor = self.conn.execute(
+                "UPDATE entries SET last_used = ?, hits = hits + 1 WHERE filename = ?",
+                (time.time(), filename)
+            )
+            if cursor.rowcount == 0:
+                self._insert(filename, text, engine, os.path.getsize(path))
+            self.conn.commit()
+        return path
+
+    def contains(self, text, engine):
+        return os.path.exists(self.path_for(text, engine))
+
+    def put_pcm(self, text, engine, pcm, rate):
+        """Guarda PCM 16-bit mono como WAV (write-through tras sintetizar)."""
+        if not pcm:
+            return None
+        path = self.path_for(text, engine)
+        tmp_path = path + ".tmp"
+        try:
+            with wave.open(tmp_path, 'wb') as wf:
+                wf.setnchannels(1)
+                wf.setsampwidth(2)
+                wf.setframerate(rate)
+                wf.writeframes(pcm)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.error(f"Error escribiendo caché TTS {path}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return None
+        self.register(text, engine, path)
+        return path
+
+    def register(self, text, engine, path):
+        """Indexa un WAV ya escrito en la caché (p.ej. espeak -w)."""
+        if not os.path.exists(path):
+            return
+        with self._lock:
+            self._insert(os.path.basename(path), text, engine, os.path.getsize(path))
+            self.conn.commit()
+        self.evict()
+
+    def evict(self):
+        """Expulsa las entradas menos usadas recientemente hasta caber en max_bytes."""
+        with self._lock:
+            total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total <= self.max_bytes:
+                return 0
+            removed = 0
+            rows = self.conn.execute("SELECT filename, size FROM entries ORDER BY last_used ASC").fetchall()
+            for row in rows:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(os.path.join(self.cache_dir, row['filename']))
+                except FileNotFoundError:
+                    pass
+                except Exception as e:
+                    logger.warning(f"No se pudo borrar {row['filename']}: {e}")
+                    continue
+                self.conn.execute("DELETE FROM entries WHERE filename = ?", (row['filename'],))
+                total -= row['size']
+                removed += 1
+            self.conn.commit()
+        if removed:
+            logger.info(f"Caché TTS: {removed} ficheros expulsados (LRU).")
+        return removed
+
+    def get_stats(self):
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT COUNT(*) AS entries, COALESCE(SUM(size), 0) AS bytes, COALESCE(SUM(hits), 0) AS hits FROM entries"
+            ).fetchone()
+        return {
+            'entries': row['entries'],
+            'bytes': row['bytes'],
+            'max_bytes': self.max_bytes,
+            'hits': row['hits']
+        }
+
+    def _insert(self, filename, text, engine, size):
+        now = time.time()
+        self.conn.execute('''
+            INSERT INTO entries (filename, text, engine, size, created, last_used, hits)
+            VALUES (?, ?, ?, ?, ?, ?, 0)
+            ON CONFLICT(filename) DO UPDATE SET size = excluded.size, last_used = excluded.last_used
+        ''', (filename, text, engine, size, now, now))
+
+    def _adopt_orphans(self):
+        """Indexa WAVs de la caché antigua (sin índice) usando su mtime como último uso."""
+        with self._lock:
+            known = {row[0] for row in self.conn.execute("SELECT filename FROM entries")}
+            adopted = 0
+            for entry in os.scandir(self.cache_dir):
+                if not entry.name.endswith('.wav') or entry.name in known:
+                    continue
+                stat = entry.stat()
+                engine = entry.name[:-4].split('_', 1)[1] if '_' in entry.name else None
+                self.conn.execute(
+                    "INSERT OR IGNORE INTO entries (filename, text, engine, size, created, last_used, hits) VALUES (?, NULL, ?, ?, ?, ?, 0)",
+                    (entry.name, engine, stat.st_size, stat.st_mtime, stat.st_mtime)
+                )
+                adopted += 1
+            self.conn.commit()
+        if adopted:
+            logger.info(f"Caché TTS: {adopted} ficheros existentes indexados.")
@@ -0,0 +1,140 @@
+import time
+import logging
+import threading
+
+logger = logging.getLogger("UIState")
+
+STATUS_STATE = 'status_update'              # Campos sueltos (mic_muted...): se fusionan y se envían solo los cambiados
+OVERLAY_STATES = ('alert', 'notification')  # Avisos puntuales: el último de cada tipo por frame
+
+class UIStateBroadcaster:
+    """
+    Difusión única del estado de la cara/UI ('face_update').
+    - update() solo guarda el último estado; un hilo emite como mucho `fps` frames por segundo.
+    - Solo se emiten diferencias: un estado idéntico al último enviado se omite
+      (salvo que hayan pasado `refresh_after` segundos) y de 'status_update' solo van los campos cambiados.
+    - schedule_reset() programa la vuelta a un estado en el mismo hilo (sin un Timer por locución).
+    """
+
+    def __init__(self, socketio, fps=10, refresh_after=5.0, event='face_update'):
+        self.socketio = socketio
+        self.interval = 1.0 / max(1, fps)
+        self.refresh_after = refresh_after
+        self.event = event
+
+        self._cond = threading.Condition()
+        self._pending_face = None     # (state, data)
+        self._pending_overlays = {}   # state -> data
+        self._pending_status = {}
+        self._reset = None            # (monotonic, state, data)
+        self._dirty = False
+        self._next_frame = 0.0
+
+        self._last = {}               # state|'face' -> (payload, monotonic) del último envío
+        self._status = {}
+        self._thread = None
+        self.stats = {'requested': 0, 'coalesced': 0, 'skipped': 0, 'emitted': 0, 'frames': 0}
+
+    def update(self, state, data=None):
+        with self._cond:
+            self.stats['requested'] += 1
+            data = data or {}
+            if state == STATUS_STATE:
+                if self._pending_status:
+                    self.stats['coalesced'] += 1
+                self._pending_status.update(data)
+            elif state in OVERLAY_STATES:
+                if state in self._pending_overlays:
+                    self.stats['coalesced'] += 1
+                self._pending_overlays[state] = data
+            else:
+                if self._pending_face is not None:
+                    self.stats['coalesced'] += 1
+                self._pending_face = (state, data)
+            self._dirty = True
+            self._ensure_thread()
+            self._cond.notify()
+
+    def schedule_reset(self, state, delay, data=None):
+        """Vuelve a `state` dentro de `delay` segundos (sustituye al reset pendiente)."""
+        with self._cond:
+            self._reset = (time.monotonic() + delay, state, data or {})
+            self._ensure_thread()
+            self._cond.notify()
+
+    def get_snapshot(self):
+        """Estado completo (para clientes que se conectan tarde, ya que el stream solo lleva diferencias)."""
+        with self._cond:
+            face = self._last.get('face')
+            return {
+                'state': face[0]['state'] if face else 'idle',
+                'data': face[0]['data'] if face else {},
+                'status': dict(self._status)
+            }
+
+    def get_stats(self):
+        with self._cond:
+            return dict(self.stats, fps=round(1.0 / self.interval, 1))
+
+    # --- Hilo de emisión ---
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True, name="UI_State")
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                payloads = None
+                while payloads is None:
+                    now = time.monotonic()
+                    if self._reset and now >= self._reset[0]:
+                        _, state, data = self._reset
+                        self._reset = None
+                        self._pending_face = (state, data)
+                        self._dirty = True
+                    if self._dirty and now >= self._next_frame:
+                        payloads = self._collect(now)
+                        self._dirty = False
+                        self._next_frame = now + self.interval
+                        continue
+                    deadlines = [t for t in (self._next_frame if self._dirty else None,
+                                             self._reset[0] if self._reset else None) if t is not None]
+                    self._cond.wait(max(0.0, min(deadlines) - now) if deadlines else None)
+                self.stats['frames'] += 1
+                self.stats['emitted'] += len(payloads)
+
+            for payload in payloads:
+                try:
+                    self.socketio.emit(self.event, payload)
+                except Exception as e:
+                    logger.warning(f"Error emitiendo {self.event}: {e}")
+
+    def _collect(self, now):
+        """Convierte lo pendiente en los payloads de este frame (llamar con el lock)."""
+        payloads = []
+        if self._pending_face is not None:
+            state, data = self._pending_face
+            self._pending_face = None
+            self._add_if_changed(payloads, 'face', {'state': state, 'data': data}, now)
+        for state, data in self._pending_overlays.items():
+            self._add_if_changed(payloads, state, {'state': state, 'data': data}, now)
+        self._pending_overlays = {}
+        if self._pending_status:
+            changed = {k: v for k, v in self._pending_status.items() if k not in self._status or self._status[k] != v}
+            self._pending_status = {}
+            if changed:
+                self._status.update(changed)
+                payloads.append({'state': STATUS_STATE, 'data': changed})
+            else:
+                self.stats['skipped'] += 1
+        return payloads
+
+    def _add_if_changed(self, payloads, slot, payload, now):
+        last = self._last.get(slot)
+        if last and last[0] == payload and now - last[1] < self.refresh_after:
+            self.stats['skipped'] += 1
+            return
+        self._last[slot] = (payload, now)
+        payloads.append(payload)
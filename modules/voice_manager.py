@@ -3,9 +3,13 @@ import json
 import time
 import threading
 import logging
+from collections import deque
 import pyaudio
 from modules.utils import no_alsa_error, normalize_text
 from modules.logger import vosk_logger, app_logger
+from modules.barge_in import BargeInDetector
+from modules.metrics_registry import VAD_FRAME, STT_DECODE
+from modules import tracing
 
 try:
     import vosk
@@ -38,6 +42,23 @@ class VoiceManager:
         self.is_listening = False
         self.is_processing = False # Flag to pause listening during processing
         self.is_muted = False # Mute flag
+
+        # --- Coordinación por eventos con el Speaker (sin sondeo cada 100 ms) ---
+        self._state_cond = threading.Condition()
+        self._state_changed_at = time.time()
+        self.resume_gaps = deque(maxlen=200) # Cambio de estado -> escucha reanudada (s)
+        if hasattr(self.speaker, 'add_state_listener'):
+            self.speaker.add_state_listener(self._on_state_change)
+
+        # --- Barge-in: el micro sigue escuchando (solo VAD) mientras habla el Speaker ---
+        self.on_barge_in = None # Callback opcional (NeoCore corta la respuesta en curso)
+        self.barge_in = None
+        self._last_barge_in = 0
+        self._barge_in_triggered = False # Tras un barge-in el audio va al reconocedor hasta que el Speaker quede libre
+        barge_config = self.config_manager.get('barge_in', {})
+        if barge_config.get('enabled', False) and hasattr(self.speaker, 'stop'):
+            self.barge_in = BargeInDetector.from_config(self.speaker, barge_config, on_barge_in=self._on_barge_in)
+            app_logger.info("Barge-in activado (VAD durante la locución).")
         
         self.setup_vosk()
         self.setup_whisper()
@@ -136,10 +157,89 @@ class VoiceManager:
 
     def stop_listening(self):
         self.is_listening = False
+        self._on_state_change()
 
     def set_processing(self, processing):
         """Pausa o reanuda la escucha activa."""
         self.is_processing = processing
+        self._on_state_change()
+
+    def _on_state_change(self, *args):
+        """Despierta a los bucles de escucha (Speaker libre, fin de procesado, mute)."""
+        with self._state_cond:
+            self._state_changed_at = time.time()
+            self._state_cond.notify_all()
+
+    def _is_paused(self, include_mute=True):
+        # Tras un barge-in no se pausa mientras el Speaker termina de vaciarse: el usuario está hablando
+        speaker_busy = self.speaker.is_busy and not self._barge_in_triggered
+        return speaker_busy or self.is_processing or (include_mute and self.is_muted)
+
+    def _wait_until_active(self, stream, include_mute=True):
+        """
+        Bloquea mientras la escucha deba estar en pausa y reanuda en cuanto llega el aviso.
+        El timeout es solo una red de seguridad (Speakers sin add_state_listener).
+        Al reanudar se descarta el audio acumulado en el buffer de entrada (eco del TTS),
+        salvo tras un barge-in: ahí el buffer contiene la frase del usuario.
+        """
+        if not self._is_paused(include_mute):
+            return
+        with self._state_cond:
+            while self.is_listening and self._is_paused(include_mute):
+                self._state_cond.wait(timeout=1.0)
+            gap = time.time() - self._state_changed_at
+        self.resume_gaps.append(gap)
+        vosk_logger.debug(f"Escucha reanudada {gap * 1000:.1f} ms tras el cambio de estado.")
+        if time.time() - self._last_barge_in < 5:
+            return
+        try:
+            available = stream.get_read_available()
+            if available:
+                stream.read(available, exception_on_overflow=False)
+        except Exception:
+            pass
+
+    def _in_barge_in_window(self):
+        """True si el Speaker está hablando y el micro debe vigilar interrupciones del usuario."""
+        if not self.barge_in:
+            return False
+        if not self.is_muted and getattr(self.speaker, 'is_speaking', False):
+            # Ya hubo barge-in: la frase del usuario sigue y debe llegar entera al reconocedor
+            return not self._barge_in_triggered
+        self._barge_in_triggered = False
+        self.barge_in.reset() # Fin de la locución: restaurar volumen si quedó atenuado
+        return False
+
+    def _barge_in_step(self, stream, chunk):
+        """
+        Lee un bloque corto del micro durante la locución y lo pasa al detector.
+        Retorna el audio reciente (pre-roll) si hubo barge-in, para no perder el inicio de la frase.
+        """
+        data = stream.read(chunk, exception_on_overflow=False)
+        if self.barge_in.process(data):
+            return self.barge_in.take_preroll()
+        return None
+
+    def _on_barge_in(self):
+        self._last_barge_in = time.time()
+        self._barge_in_triggered = True
+        if self.update_face:
+            self.update_face('listening')
+        if self.on_barge_in:
+            self.on_barge_in()
+
+    def get_transition_stats(self):
+        """Hueco entre el fin de la locución/procesado y la reanudación de la escucha (s)."""
+        values = list(self.resume_gaps)
+        if not values:
+            return {'count': 0, 'avg': None, 'p95': None, 'last': None}
+        ordered = sorted(values)
+        return {
+            'count': len(ordered),
+            'avg': round(sum(ordered) / len(ordered), 4),
+            'p95': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 4),
+            'last': round(values[-1], 4)
+        }
 
     # Mapa de alias fonéticos: wake_word → [variantes que el STT puede transcribir]
     # "wamd" se pronuncia "guamde", y el STT puede transcribir diversas variantes.
@@ -202,6 +302,7 @@ class VoiceManager:
     def on_mic_toggle(self, message):
         """Toggle mute state."""
         self.is_muted = not self.is_muted
+        self._on_state_change()
         app_logger.info(f"Microphone Muted: {self.is_muted}")
         self.bus.emit('mic:status', {'muted': self.is_muted})
 
@@ -238,24 +339,47 @@ class VoiceManager:
                 stream.start_stream()
                 
             last_face_update = 0
+            capture_start = None # Primer parcial no vacío de la frase (inicio de la traza)
             
             while self.is_listening:
-                 # Pause logic
-                 if self.speaker.is_busy or self.is_processing or self.is_muted:
-                     time.sleep(0.1)
+                 # Barge-in: VAD ligero con bloques cortos (64 ms) mientras suena el TTS
+                 if self._in_barge_in_window():
+                     try:
+                         preroll = self._barge_in_step(stream, 1024)
+                         if preroll:
+                             self.recognizer.AcceptWaveform(preroll)
+                     except Exception as e:
+                         vosk_logger.error(f"Error en barge-in: {e}")
+                         time.sleep(0.1)
                      continue
+
+                 # Pause logic (bloquea hasta que el Speaker/procesado avisan)
+                 self._wait_until_active(stream)
+                 if not self.is_listening:
+                     break
                      
                  try:
                      data = stream.read(4096, exception_on_overflow=False)
-                     if self.recognizer.AcceptWaveform(data):
+                     decode_wall = time.time()
+                     decode_start = time.perf_counter()
+                     accepted = self.recognizer.AcceptWaveform(data)
+                     STT_DECODE.observe(time.perf_counter() - decode_start, engine='vosk', stage='chunk')
+                     if accepted:
                          result = json.loads(self.recognizer.Result())
                          command = result.get('text', '')
                          if command:
                              ww = self._check_wake_word(command)
-                             self.on_command_detected(command, ww if ww else 'neo')
+                             # Traza de la frase: desde el primer parcial hasta que termine el comando
+                             with tracing.trace('voz', start=capture_start or decode_wall, engine='vosk', text=command):
+                                 tracing.record_span('capture', capture_start or decode_wall, decode_wall)
+                                 tracing.record_span('stt', decode_wall, time.time(), engine='vosk')
+                                 self.on_command_detected(command, ww if ww else 'neo')
+                         capture_start = None
                      else:
                          # Partial
                          partial = json.loads(self.recognizer.PartialResult())
+                         if partial.get('partial') and capture_start is None:
+                             capture_start = decode_wall
                          if partial.get('partial') and self.update_face:
                              current_time = time.time()
                              if current_time - last_face_update > 1.5:
@@ -354,6 +478,7 @@ class VoiceManager:
         audio_buffer = []
         silence_frames = 0
         is_recording = False
+        capture_start = None # Inicio de la frase según el VAD (inicio de la traza)
         last_face_update = 0
         
         # --- Voice Auth Buffer (Rolling 5s) ---
@@ -362,18 +487,32 @@ class VoiceManager:
         
         while self.is_listening:
             try:
-                if self.speaker.is_busy or self.is_processing:
-                    time.sleep(0.1)
+                if self._in_barge_in_window():
+                    preroll = self._barge_in_step(stream, CHUNK)
+                    if preroll:
+                        # La frase del usuario ya ha empezado: arrancamos la grabación con el pre-roll
+                        audio_buffer = [preroll]
+                        is_recording = True
+                        capture_start = time.time()
+                        silence_frames = 0
                     continue
+
+                self._wait_until_active(stream, include_mute=False)
+                if not self.is_listening:
+                    break
                 
                 data = stream.read(CHUNK, exception_on_overflow=False)
+                vad_start = time.perf_counter()
                 shorts = struct.unpack("%dh" % (len(data) / 2), data)
                 rms = np.sqrt(np.mean(np.square(shorts)))
+                VAD_FRAME.observe(time.perf_counter() - vad_start, engine='energy')
                 
                 # Update Rolling Buffer (for biometrics)
                 rolling_buffer.append(data)
                 
                 if rms > THRESHOLD:
+                    if not is_recording:
+                        capture_start = time.time()
                     is_recording = True
                     silence_frames = 0
                     
@@ -395,10 +534,12 @@ class VoiceManager:
                         raw_data = b''.join(audio_buffer)
                         samples = np.frombuffer(raw_data, dtype=np.int16).astype(np.float32) / 32768.0
                         
-                        s = self.sherpa_recognizer.create_stream()
-                        s.accept_waveform(RATE, samples)
-                        self.sherpa_recognizer.decode_stream(s)
-                        text = s.result.text.strip()
+                        vad_end = time.time()
+                        with STT_DECODE.time(engine='sherpa', stage='final'):
+                            s = self.sherpa_recognizer.create_stream()
+                            s.accept_waveform(RATE, samples)
+                            self.sherpa_recognizer.decode_stream(s)
+                            text = s.result.text.strip()
                         
                         if text:
                             vosk_logger.info(f"Sherpa escuchó: '{text}'")
@@ -408,7 +549,10 @@ class VoiceManager:
                             # Actually, audio_buffer contains the phrase. 
                             # Ideally we pass audio_buffer for biometrics.
                             
-                            self.on_command_detected(text, ww if ww else 'neo', audio_buffer)
+                            with tracing.trace('voz', start=capture_start or vad_end, engine='sherpa', text=text):
+                                tracing.record_span('vad', capture_start or vad_end, vad_end)
+                                tracing.record_span('stt', vad_end, time.time(), engine='sherpa')
+                                self.on_command_detected(text, ww if ww else 'neo', audio_buffer)
                         
                         audio_buffer = []
                         is_recording = False
@@ -1,7 +1,7 @@
-from flask import Flask, render_template, request, redirect, url_for, session, jsonify, flash, send_file, send_from_directory, abort
+from flask import Flask, render_template, render_template_string, request, redirect, url_for, session, jsonify, flash, send_file, send_from_directory, abort
 import base64
 import platform
-from flask_socketio import SocketIO, emit
+from flask_socketio import SocketIO, emit, join_room, leave_room
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 import functools
@@ -62,6 +62,10 @@ limiter = Limiter(
     storage_uri="memory://"  # Use Redis in production: "redis://localhost:6379"
 )
 
+# Estado de la cara/UI: un único emisor con límite de frames y solo diferencias
+from modules.ui_state import UIStateBroadcaster
+ui_state = UIStateBroadcaster(socketio, fps=config_manager.get('web_admin', {}).get('ui_fps', 10))
+
 # Global System Status
 AUDIO_STATUS = {'output': False, 'input': False}
 
@@ -74,13 +78,23 @@ def set_audio_status(output_enabled, input_enabled):
 def inject_status():
     return dict(audio_status=AUDIO_STATUS, socket_url="")
 
-@socketio.on('message')
-def handle_message(data):
-    """Relay broadcast messages to all connected clients (Bus)."""
-    # print(f"DEBUG: Broadcasting message: {data}")
-    emit('message', data, broadcast=True)
+# --- Bus relay: mismo enrutado que MessageBus (codec negociado por conexión) ---
+from modules.bus_router import BusRouter
+# Los navegadores no declaran topics: reciben todo salvo el audio crudo del micro
+bus_router = BusRouter(socketio, include_self=True, default_topics=['*', '!recognizer_loop:audio']).register()
+
+# BusClients de este mismo proceso (NeoCore, VoiceManager, WebAdmin) usan el bus en memoria
+from modules.local_bus import LocalBus
+LocalBus.instance().attach_server(config_manager.get('web_admin', {}).get('port', 5000), bus_router)
 
 from modules.bus_client import BusClient
+from modules.event_queue import get_queue_stats
+from modules.logger import get_recent_logs
+from modules.metrics_store import MetricsStore
+from modules.metrics_registry import REGISTRY as METRICS_REGISTRY
+from modules.tracing import Tracer
+from modules.deadline import get_deadline_misses, DEFAULT_BUDGET
+from modules.incident_store import IncidentStore
 
 sys_admin = SysAdminManager()
 db = DatabaseManager()
@@ -92,6 +106,9 @@ dashboard_manager = DashboardDataManager(config_manager)
 knowledge_base = KnowledgeBase() # RAG System
 scheduler_manager = SchedulerManager(app) # Task Scheduler
 brain = Brain() # Initialize independent Brain instance for Web Admin operations
+response_cache = None # Injected by NeoCore (ChatManager semantic cache)
+speaker = None # Injected by NeoCore (TTS pipeline latency stats)
+voice_manager = None # Injected by NeoCore (speak -> listen transition gaps)
 
 # --- Bus Client Integration ---
 bus = BusClient(name="WebAdmin")
@@ -443,15 +460,21 @@ def face():
     return render_template('face.html')
 
 def update_face(state, data=None):
-    """Envía una actualización de estado a la interfaz facial."""
+    """Envía una actualización de estado a la interfaz facial (agrupada por UIStateBroadcaster)."""
     try:
-        if data is None:
-            data = {}
-        print(f"DEBUG: Emitting face_update: {state}")
-        socketio.emit('face_update', {'state': state, 'data': data})
+        ui_state.update(state, data)
     except Exception as e:
         print(f"Error updating face: {e}")
 
+def schedule_face_reset(state, delay):
+    """Devuelve la cara a `state` tras `delay` segundos (un solo temporizador compartido)."""
+    ui_state.schedule_reset(state, delay)
+
+@app.route('/api/ui/state', methods=['GET'])
+def api_ui_state():
+    """Estado completo de la cara (el stream 'face_update' solo envía cambios)."""
+    return jsonify(dict(ui_state.get_snapshot(), stats=ui_state.get_stats()))
+
 # --- API ---
 
 @app.route('/api/restart', methods=['POST'])
@@ -540,27 +563,196 @@ def api_audio_status():
 @app.route('/api/stats')
 @login_required
 def api_stats():
-    """API que devuelve estadísticas del sistema en JSON."""
+    """API que devuelve estadísticas del sistema en JSON (última muestra del MetricsSampler, sin bloquear)."""
     return jsonify({
         'cpu_temp': sys_admin.get_cpu_temp(),
         'cpu_usage': sys_admin.get_cpu_usage(),
         'ram_usage': sys_admin.get_ram_usage(),
-        'disk_usage': sys_admin.get_disk_usage()
+        'disk_usage': sys_admin.get_disk_usage(),
+        'top_processes': sys_admin.get_top_processes(5),
+        'top_processes_stale': sys_admin.processes.stale,
+        'sampled_at': sys_admin.metrics.snapshot().timestamp
     })
 
+metrics_store = MetricsStore.instance()
+
+@app.route('/metrics')
+@limiter.exempt
+def prometheus_metrics():
+    """
+    Métricas en formato de texto de Prometheus (contadores e histogramas de los caminos calientes
+    y profundidad de colas). Sin login para el scraper; solo desde localhost salvo `metrics.public`.
+    """
+    if not config_manager.get('metrics', {}).get('public', False) and \
+            request.remote_addr not in ('127.0.0.1', '::1', 'localhost'):
+        abort(403)
+    return app.response_class(METRICS_REGISTRY.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+@app.route('/api/metrics/series')
+@login_required
+def api_metrics_series():
+    """Series disponibles en el historial (host.* y agent.<nombre>.*) y sus resoluciones."""
+    return jsonify({'series': metrics_store.names(),
+                    'resolutions': [{'step': step, 'size': size} for step, size in metrics_store.resolutions]})
+
+@app.route('/api/metrics/history')
+@login_required
+def api_metrics_history():
+    """
+    Historial de una o varias series (?name=host.cpu&name=host.ram&start=<ts>&end=<ts>).
+    'resolution' fuerza el paso (1, 60, 3600); 'points' limita los puntos devueltos.
+    """
+    args = request.args
+    start = args.get('start', type=float)
+    if start is None and args.get('seconds'):
+        start = time.time() - args.get('seconds', type=float)
+    return jsonify({'series': [
+        metrics_store.query(name, start=start, end=args.get('end', type=float),
+                            resolution=args.get('resolution', type=int),
+                            max_points=args.get('points', 500, type=int))
+        for name in args.getlist('name')
+    ]})
+
+# --- Trazas por frase (captura -> STT -> router -> acción -> TTS) ---
+tracer = Tracer.instance()
+
+# Vista autocontenida (el submódulo de plantillas no la incluye): lista y cascada de spans
+TRACES_HTML = """<!doctype html>
+<html><head><meta charset="utf-8"><title>Trazas</title>
+<style>
+body { font-family: monospace; background: #111; color: #ddd; margin: 20px; }
+a { color: #8cf; } table { border-collapse: collapse; width: 100%; }
+td, th { padding: 3px 8px; border-bottom: 1px solid #333; text-align: left; }
+.bar-cell { width: 60%; } .track { position: relative; height: 14px; background: #1c1c1c; }
+.bar { position: absolute; height: 14px; background: #4a9; min-width: 2px; }
+.bar.tts { background: #c84; } .bar.error { background: #d44; }
+</style></head><body>
+{% if trace %}
+<p><a href="{{ url_for('traces_page') }}">&larr; Trazas</a></p>
+<h3>{{ trace.name }} · {{ trace.attrs.get('text', '') }} · {{ '%.0f' % (trace.duration * 1000) }} ms</h3>
+<table>
+<tr><th>Span</th><th>Inicio (ms)</th><th>Duración (ms)</th><th class="bar-cell"></th></tr>
+{% for row in rows %}
+<tr title="{{ row.span.attrs }}">
+<td style="padding-left: {{ 8 + row.depth * 16 }}px">{{ row.span.name }}</td>
+<td>{{ '%.1f' % row.offset_ms }}</td><td>{{ '%.1f' % row.duration_ms }}</td>
+<td class="bar-cell"><div class="track"><div class="bar {{ 'tts' if row.span.name.startswith('tts') else '' }} {{ 'error' if row.span.attrs.get('error') else '' }}"
+ style="left: {{ row.left }}%; width: {{ row.width }}%"></div></div></td>
+</tr>
+{% endfor %}
+</table>
+{% else %}
+<h3>Últimas trazas</h3>
+<table>
+<tr><th>Hora</th><th>Origen</th><th>Texto</th><th>Duración (ms)</th><th>Spans</th></tr>
+{% for t in traces %}
+<tr><td><a href="{{ url_for('traces_page', trace_id=t.trace_id) }}">{{ t.when }}</a></td>
+<td>{{ t.name }}</td><td>{{ t.attrs.get('text', '') }}</td><td>{{ '%.0f' % (t.duration * 1000) }}</td><td>{{ t.spans }}</td></tr>
+{% else %}
+<tr><td colspan="5">Sin trazas todavía.</td></tr>
+{% endfor %}
+</table>
+{% endif %}
+</body></html>"""
+
+def _waterfall_rows(trace):
+    """Filas de la cascada: desplazamiento y ancho relativos a la duración total, profundidad por span padre."""
+    total = max(trace['duration'], 1e-6)
+    depth = {}
+    rows = []
+    for span in trace['spans']:
+        depth[span['span_id']] = depth.get(span.get('parent_id'), -1) + 1
+        offset = span['start'] - trace['start']
+        duration = span['end'] - span['start']
+        rows.append({'span': span, 'depth': depth[span['span_id']],
+                     'offset_ms': offset * 1000, 'duration_ms': duration * 1000,
+                     'left': round(max(0.0, offset) / total * 100, 2),
+                     'width': round(duration / total * 100, 2)})
+    return rows
+
+@app.route('/traces')
+@app.route('/traces/<trace_id>')
+@login_required
+def traces_page(trace_id=None):
+    """Lista de trazas recientes y cascada de spans de una frase."""
+    if trace_id:
+        trace = tracer.get(trace_id)
+        if trace is None:
+            abort(404)
+        return render_template_string(TRACES_HTML, trace=trace, rows=_waterfall_rows(trace))
+    traces = [dict(t, when=time.strftime('%d/%m %H:%M:%S', time.localtime(t['start']))) for t in tracer.recent(100)]
+    return render_template_string(TRACES_HTML, trace=None, traces=traces)
+
+@app.route('/api/traces')
+@login_required
+def api_traces():
+    """Resumen de las últimas trazas (?limit=50)."""
+    return jsonify({'traces': tracer.recent(request.args.get('limit', 50, type=int))})
+
+@app.route('/api/traces/<trace_id>')
+@login_required
+def api_trace(trace_id):
+    """Traza completa con sus spans ordenados por inicio."""
+    trace = tracer.get(trace_id)
+    if trace is None:
+        return jsonify({'error': 'Traza no encontrada'}), 404
+    return jsonify(trace)
+
+@app.route('/api/pipeline/deadlines')
+@login_required
+def api_pipeline_deadlines():
+    """Plazos por etapa de handle_command y cuántas veces se agotaron (respuesta de fallback)."""
+    return jsonify({'budget': dict(DEFAULT_BUDGET, **(config_manager.get('latency_budget') or {})),
+                    'misses': get_deadline_misses()})
+
+# --- Logs: lectura por el final, paginación indexada y seguimiento en vivo (sala 'logs:<fuente>') ---
+from modules.log_reader import tail_lines, LogIndex, LogStreamer, read_journal
+LOG_FILES = {'app.log': 'logs/app.log'}
+LOG_UNITS = {'neo.service': 'neo.service'}
+log_indexes = {source: LogIndex(path) for source, path in LOG_FILES.items()}
+log_streamer = LogStreamer(socketio, files=LOG_FILES, units=LOG_UNITS)
+
+def handle_logs_follow(data):
+    """{'source': 'app.log'|'neo.service'}: el cliente recibe 'log_lines' con las líneas nuevas."""
+    source = (data or {}).get('source')
+    if session.get('logged_in') is None or not log_streamer.follow(source, request.sid):
+        return {'ok': False}
+    join_room(f"logs:{source}")
+    return {'ok': True, 'cursor': log_streamer.cursors.get(source)}
+
+def handle_logs_unfollow(data):
+    source = (data or {}).get('source')
+    leave_room(f"logs:{source}")
+    log_streamer.unfollow(source, request.sid) # Sala vacía: se para el hilo de la fuente
+
+socketio.on_event('logs:follow', handle_logs_follow)
+socketio.on_event('logs:unfollow', handle_logs_unfollow)
+bus_router.add_disconnect_listener(log_streamer.unfollow_all) # 'disconnect' ya lo registra BusRouter
+
 @app.route('/api/logs')
 @login_required
 def api_logs():
     """API que devuelve las últimas 100 líneas del log."""
-    log_content = ""
     try:
-        with open('logs/app.log', 'r') as f:
-            lines = f.readlines()[-100:]
-            log_content = "".join(lines)
+        log_content = "\n".join(tail_lines(LOG_FILES['app.log'], 100))
     except FileNotFoundError:
         log_content = "Log file not found."
     return jsonify({'logs': log_content})
 
+@app.route('/api/logs/recent')
+@login_required
+def api_logs_recent():
+    """Records recientes desde el anillo en memoria (filtros: level, logger, since, contains, limit)."""
+    args = request.args
+    since = args.get('since', type=float)
+    return jsonify({'records': get_recent_logs(
+        limit=min(args.get('limit', 100, type=int), 1000),
+        level=args.get('level'),
+        logger=args.get('logger'),
+        since=since,
+        contains=args.get('contains')
+    )})
+
 @app.route('/api/ollama/status')
 @login_required
 def api_ollama_status():
@@ -585,27 +777,40 @@ def api_ollama_status():
 @app.route('/api/logs/read', methods=['POST'])
 @login_required
 def api_logs_read():
-    """Lee un fichero de log específico."""
-    filename = request.json.get('file')
+    """
+    Lee un fichero de log específico. Página 0 = lo más reciente; 'page' > 0 recorre rangos antiguos (solo ficheros).
+    Para seguir en vivo: evento socketio 'logs:follow' con la misma fuente (sin polling).
+    """
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return jsonify({'error': 'JSON inválido'}), 400
+    filename = data.get('file')
+    try:
+        page = max(0, int(data.get('page', 0)))
+        page_size = min(max(1, int(data.get('page_size', 200))), 2000)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'page y page_size deben ser enteros'}), 400
     content = ""
+    result = {}
     
-    if filename == 'neo.service':
+    if filename in LOG_UNITS:
         try:
-            result = subprocess.run(['journalctl', '-u', 'neo.service', '-n', '200', '--no-pager'], capture_output=True, text=True)
-            content = result.stdout
+            lines, cursor = read_journal(LOG_UNITS[filename], page_size)
+            content = "\n".join(lines)
+            result['cursor'] = cursor
         except Exception as e:
             content = str(e)
-    elif filename == 'app.log':
+    elif filename in LOG_FILES:
         try:
-            if os.path.exists('logs/app.log'):
-                with open('logs/app.log', 'r') as f:
-                    content = f.read()[-10000:] # Last 10k chars
+            if os.path.exists(LOG_FILES[filename]):
+                result = log_indexes[filename].page(page, page_size)
+                content = "\n".join(result.pop('lines'))
             else:
                 content = "Log file not found."
         except Exception as e:
             content = str(e)
             
-    return jsonify({'content': content})
+    return jsonify(dict(result, content=content))
 
 @app.route('/api/speech_history')
 @login_required
@@ -675,8 +880,10 @@ def api_dashboard_data():
 @app.route('/api/monitor/processes', methods=['GET'])
 @login_required
 def api_monitor_processes():
-    """API que devuelve los procesos top."""
-    return jsonify(sys_admin.get_top_processes())
+    """API que devuelve los procesos top (?sort=cpu|memory&limit=N)."""
+    sort = request.args.get('sort', 'cpu')
+    limit = min(request.args.get('limit', 10, type=int), 50)
+    return jsonify(sys_admin.get_top_processes(limit, sort))
 
 @app.route('/api/config/experimental', methods=['POST'])
 @login_required
@@ -1247,33 +1454,63 @@ def api_nlu_train_alias():
 @app.route('/api/health/status', methods=['GET'])
 @login_required
 def api_health_status():
-    """Devuelve el estado del sistema de autocuración y últimos incidentes."""
-    history_path = 'data/health_history.json'
-    recent_incidents = 0
-    last_event = "System Normal"
-    status = "Active"
-    
-    if os.path.exists(history_path):
-        try:
-            with open(history_path, 'r') as f:
-                data = json.load(f)
-                # Filter last 24h
-                now = time.time()
-                recent = [i for i in data if now - i['timestamp'] < 86400]
-                recent_incidents = len(recent)
-                
-                if data:
-                    last = data[-1]
-                    last_event = f"{last['event']} on {last['target']}"
-        except:
-             pass
-             
+    """Devuelve el estado del sistema de autocuración y últimos incidentes (contadores en memoria)."""
+    summary = IncidentStore.instance().summary()
+    last = summary['last']
     return jsonify({
-        'status': status,
-        'recent_incidents': recent_incidents,
-        'last_message': last_event
+        'status': "Active",
+        'recent_incidents': summary['recent_incidents'],
+        'last_message': f"{last['event']} on {last['target']}" if last else "System Normal",
+        'crashes_by_service': summary['crashes_by_service']
     })
 
+@app.route('/api/health/incidents', methods=['GET'])
+@login_required
+def api_health_incidents():
+    """Últimos incidentes (?limit=50&target=nginx)."""
+    return jsonify({'incidents': IncidentStore.instance().recent(request.args.get('limit', 50, type=int),
+                                                                 target=request.args.get('target'))})
+
+@app.route('/api/ai/cache/stats', methods=['GET'])
+@login_required
+def api_ai_cache_stats():
+    """Devuelve las estadísticas de la caché semántica de respuestas del LLM."""
+    if not response_cache:
+        return jsonify({'enabled': False})
+    stats = response_cache.get_stats()
+    stats['enabled'] = True
+    return jsonify(stats)
+
+@app.route('/api/tts/latency', methods=['GET'])
+@login_required
+def api_tts_latency():
+    """Devuelve time-to-first-audio y huecos entre frases del pipeline TTS."""
+    if not speaker or not hasattr(speaker, 'get_latency_stats'):
+        return jsonify({'enabled': False})
+    stats = speaker.get_latency_stats()
+    stats['enabled'] = True
+    if getattr(speaker, 'cache', None):
+        stats['cache'] = speaker.cache.get_stats()
+    if getattr(speaker, 'output', None):
+        stats['output_start'] = {ch: speaker.output.get_stats(ch) for ch in ('tts', 'filler')}
+    if voice_manager and hasattr(voice_manager, 'get_transition_stats'):
+        stats['listen_resume'] = voice_manager.get_transition_stats()
+        if getattr(voice_manager, 'barge_in', None):
+            stats['barge_in'] = voice_manager.barge_in.get_stats()
+    return jsonify(stats)
+
+@app.route('/api/bus/stats', methods=['GET'])
+@login_required
+def api_bus_stats():
+    """Clientes del bus, sus suscripciones y contadores de mensajes por topic."""
+    return jsonify(bus_router.get_stats())
+
+@app.route('/api/queues/stats', methods=['GET'])
+@login_required
+def api_queues_stats():
+    """Profundidad, descartes y fusiones por clase de las colas acotadas (eventos, voz, bus)."""
+    return jsonify(get_queue_stats())
+
 # --- DASHBOARD API ---
 
 @app.route('/api/dashboard/layout', methods=['GET', 'POST'])
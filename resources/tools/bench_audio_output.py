@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Benchmark: aplay por locución vs. salida PyAudio persistente (AudioOutput).
+Mide el sobrecoste de cada reproducción (tiempo total - duración del audio),
+que en modo aplay incluye el arranque del proceso y la apertura del dispositivo ALSA.
+"""
+import sys
+import os
+import time
+import wave
+import tempfile
+import subprocess
+
+import numpy as np
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+from modules.audio_output import AudioOutput
+
+RATE = 22050
+DURATION = 0.3 # Segundos por "locución"
+RUNS = 10
+
+def make_tone(path):
+    t = np.arange(int(RATE * DURATION)) / RATE
+    tone = (np.sin(2 * np.pi * 440 * t) * 3000).astype(np.int16)
+    with wave.open(path, 'wb') as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(RATE)
+        wf.writeframes(tone.tobytes())
+    return tone
+
+def bench_aplay(path):
+    overheads = []
+    for _ in range(RUNS):
+        start = time.time()
+        subprocess.run(['aplay', '-q', path], check=True)
+        overheads.append(time.time() - start - DURATION)
+    return overheads
+
+def bench_persistent(tone):
+    output = AudioOutput(rate=RATE)
+    overheads = []
+    try:
+        for _ in range(RUNS):
+            start = time.time()
+            output.play(tone, RATE).wait(timeout=10)
+            overheads.append(time.time() - start - DURATION)
+        print(f"Start latency (play -> primer frame): {output.get_stats()}")
+    finally:
+        output.close()
+    return overheads
+
+def report(name, values):
+    values = sorted(values)
+    avg = sum(values) / len(values)
+    print(f"{name:<12} avg={avg * 1000:7.1f} ms  min={values[0] * 1000:7.1f} ms  max={values[-1] * 1000:7.1f} ms")
+    return avg
+
+def main():
+    print("==========================================")
+    print("   NEO AUDIO OUTPUT BENCHMARK")
+    print("==========================================")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "tone.wav")
+        tone = make_tone(path)
+
+        aplay_avg = report("aplay", bench_aplay(path))
+        pyaudio_avg = report("persistent", bench_persistent(tone))
+
+    print(f"\nLatencia ahorrada por locución: {(aplay_avg - pyaudio_avg) * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    main()
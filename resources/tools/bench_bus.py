@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark del bus de mensajes: latencia ida y vuelta (RTT) y mensajes/segundo
+para cada combinación de transporte (websocket / polling) y codec (json / msgpack).
+
+Requiere el servidor en marcha (web_admin en :5000 o MessageBus en :8181).
+Uso: python3 resources/tools/bench_bus.py [--port 5000] [--pings 200] [--burst 2000]
+"""
+import sys
+import os
+import time
+import argparse
+import threading
+
+# Add root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+from modules.bus_client import BusClient, MSGPACK_AVAILABLE
+
+def wait_ready(client, codec, timeout=5):
+    start = time.time()
+    while time.time() - start < timeout:
+        if client.connected and client.codec == codec:
+            return True
+        time.sleep(0.05)
+    return False
+
+def run_case(host, port, transport, codec, pings, burst):
+    sender = BusClient(host=host, port=port, name="BenchSender", transports=[transport], codec=codec)
+    echo = BusClient(host=host, port=port, name="BenchEcho", transports=[transport], codec=codec)
+
+    pong = threading.Event()
+    received = {'count': 0}
+    burst_done = threading.Event()
+
+    echo.on('bench:ping', lambda msg: echo.emit('bench:pong', msg.get('data', {})))
+    sender.on('bench:pong', lambda msg: pong.set())
+
+    def on_burst(msg):
+        received['count'] += 1
+        if received['count'] >= burst:
+            burst_done.set()
+    echo.on('bench:burst', on_burst)
+
+    for client in (sender, echo):
+        threading.Thread(target=client.run_forever, daemon=True).start()
+    if not (wait_ready(sender, codec) and wait_ready(echo, codec)):
+        print(f"  {transport:9} {codec:7} -> no se pudo conectar/negociar (codec actual: {sender.codec})")
+        return
+
+    # 1. RTT: ping -> pong secuencial
+    rtts = []
+    payload = {'text': 'hola', 'values': list(range(16))}
+    for i in range(pings):
+        pong.clear()
+        start = time.perf_counter()
+        sender.emit('bench:ping', dict(payload, seq=i))
+        if pong.wait(2):
+            rtts.append(time.perf_counter() - start)
+    rtts.sort()
+
+    # 2. Throughput: ráfaga unidireccional
+    start = time.perf_counter()
+    for i in range(burst):
+        sender.emit('bench:burst', dict(payload, seq=i))
+    burst_done.wait(30)
+    elapsed = time.perf_counter() - start
+
+    if rtts:
+        p50 = rtts[len(rtts) // 2] * 1000
+        p95 = rtts[min(len(rtts) - 1, int(len(rtts) * 0.95))] * 1000
+        print(f"  {sender.transport or transport:9} {codec:7} RTT p50 {p50:7.2f} ms  p95 {p95:7.2f} ms  "
+              f"| {received['count'] / elapsed:8.0f} msg/s ({received['count']}/{burst})")
+    else:
+        print(f"  {transport:9} {codec:7} sin respuesta (¿servidor con bus_router?)")
+
+    sender.close()
+    echo.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del bus (RTT y msg/s)")
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--pings', type=int, default=200)
+    parser.add_argument('--burst', type=int, default=2000)
+    args = parser.parse_args()
+
+    codecs = ['json'] + (['msgpack'] if MSGPACK_AVAILABLE else [])
+    if not MSGPACK_AVAILABLE:
+        print("msgpack no instalado: solo se mide JSON.")
+
+    print(f"Bus en {args.host}:{args.port}")
+    for transport in ('polling', 'websocket'):
+        for codec in codecs:
+            run_case(args.host, args.port, transport, codec, args.pings, args.burst)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark de latencia extremo a extremo de un comando inyectado por el bus,
+con transporte en memoria (LocalBus) frente a transporte de red (Socket.IO).
+
+Levanta en este proceso un servidor Flask-SocketIO con el mismo BusRouter que web_admin.
+Un cliente "core" responde a 'command:inject' como NeoCore.handle_injected_command
+y un "injector" mide el tiempo hasta recibir la respuesta.
+
+Uso: python3 resources/tools/bench_bus_transport.py [--port 5099] [--count 300]
+"""
+import sys
+import os
+import time
+import argparse
+import threading
+
+# Add root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+from flask import Flask
+from flask_socketio import SocketIO
+
+from modules.bus_router import BusRouter
+from modules.bus_client import BusClient
+from modules.local_bus import LocalBus
+
+def start_server(port):
+    app = Flask(__name__)
+    socketio = SocketIO(app, async_mode='threading', cors_allowed_origins="*")
+    router = BusRouter(socketio, include_self=True).register()
+    LocalBus.instance().attach_server(port, router)
+    threading.Thread(target=lambda: socketio.run(app, host='127.0.0.1', port=port, allow_unsafe_werkzeug=True,
+                                                 log_output=False), daemon=True).start()
+    time.sleep(1.0)
+
+def run_case(port, local, count):
+    label = "en memoria" if local else "red"
+    core = BusClient(host='127.0.0.1', port=port, name="BenchCore", local=local)
+    injector = BusClient(host='127.0.0.1', port=port, name="BenchInjector", local=local)
+
+    done = threading.Event()
+    core.on('command:inject', lambda msg: core.emit('command:done', {'text': msg['data'].get('text')}))
+    injector.on('command:done', lambda msg: done.set())
+
+    for client in (core, injector):
+        threading.Thread(target=client.run_forever, daemon=True).start()
+    start = time.time()
+    while not (core.connected and injector.connected) and time.time() - start < 10:
+        time.sleep(0.05)
+    time.sleep(0.5) # bus:hello / suscripciones
+
+    latencies = []
+    for i in range(count):
+        done.clear()
+        t0 = time.perf_counter()
+        injector.emit('command:inject', {'text': f"qué hora es {i}"})
+        if done.wait(2):
+            latencies.append(time.perf_counter() - t0)
+
+    core.close()
+    injector.close()
+
+    if not latencies:
+        print(f"  {label:10} sin respuesta")
+        return
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000
+    print(f"  {label:10} ({injector.transport}) p50 {p50:8.3f} ms  p95 {p95:8.3f} ms  ({len(latencies)}/{count})")
+
+def main():
+    parser = argparse.ArgumentParser(description="Latencia de comando inyectado: LocalBus vs red")
+    parser.add_argument('--port', type=int, default=5099)
+    parser.add_argument('--count', type=int, default=300)
+    args = parser.parse_args()
+
+    start_server(args.port)
+    print(f"Comando inyectado -> respuesta ({args.count} muestras)")
+    run_case(args.port, False, args.count)
+    run_case(args.port, True, args.count)
+
+if __name__ == "__main__":
+    main()
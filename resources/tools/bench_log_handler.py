@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Benchmark del coste de loguear en el hilo que llama, con el streaming de logs a la web activo.
+Compara el handler anterior (socketio.emit síncrono por record) con SocketLogHandler
+(cola + lotes + límite de líneas) usando un socketio simulado con latencia de envío.
+
+Uso: python3 resources/tools/bench_log_handler.py [--records 5000] [--emit-ms 0.5]
+"""
+import sys
+import os
+import time
+import logging
+import argparse
+
+# Add root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+from modules.logger import SocketLogHandler
+
+class FakeSocketIO:
+    """Simula el coste de socketio.emit (serialización + envío a cada pestaña)."""
+    def __init__(self, emit_ms):
+        self.emit_s = emit_ms / 1000.0
+        self.emits = 0
+        self.lines = 0
+
+    def emit(self, event, data, namespace=None):
+        time.sleep(self.emit_s)
+        self.emits += 1
+        self.lines += len(data.get('lines', [data.get('msg')]))
+
+class SyncSocketLogHandler(logging.Handler):
+    """Handler anterior: un emit síncrono por record."""
+    def __init__(self, socketio):
+        super().__init__()
+        self.socketio = socketio
+        self.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+
+    def emit(self, record):
+        try:
+            self.socketio.emit('log_message', {'msg': self.format(record)}, namespace='/')
+        except Exception:
+            self.handleError(record)
+
+def run_case(label, handler, socketio, records):
+    logger = logging.getLogger(f"bench.{label}")
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    logger.addHandler(handler)
+
+    per_call = []
+    start = time.perf_counter()
+    for i in range(records):
+        t0 = time.perf_counter()
+        logger.debug("Ráfaga de depuración %d: %s", i, {'agent': 'bench', 'value': i})
+        per_call.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - start
+    time.sleep(0.6) # Deja terminar el último lote
+    logger.removeHandler(handler)
+    handler.close()
+
+    per_call.sort()
+    p50 = per_call[len(per_call) // 2] * 1e6
+    p99 = per_call[min(len(per_call) - 1, int(len(per_call) * 0.99))] * 1e6
+    print(f"  {label:10} total {elapsed * 1000:8.1f} ms | por llamada p50 {p50:7.1f} us  p99 {p99:7.1f} us "
+          f"| emits {socketio.emits:5} líneas {socketio.lines}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Coste de logging con streaming a la web")
+    parser.add_argument('--records', type=int, default=5000)
+    parser.add_argument('--emit-ms', type=float, default=0.5, help="Latencia simulada de socketio.emit")
+    args = parser.parse_args()
+
+    print(f"{args.records} records DEBUG, emit simulado de {args.emit_ms} ms")
+    sync_io = FakeSocketIO(args.emit_ms)
+    run_case("síncrono", SyncSocketLogHandler(sync_io), sync_io, args.records)
+    batched_io = FakeSocketIO(args.emit_ms)
+    run_case("en lotes", SocketLogHandler(batched_io), batched_io, args.records)
+
+if __name__ == "__main__":
+    main()
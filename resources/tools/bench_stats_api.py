@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Benchmark de /api/stats con varios clientes de dashboard concurrentes.
+
+- Modo HTTP (por defecto): inicia sesión en web_admin y lanza N hilos pidiendo /api/stats.
+- Modo --inprocess: compara el cuerpo del endpoint antiguo (psutil por petición,
+  cpu_percent(interval=0.1)) con la lectura de la instantánea del MetricsSampler.
+
+Uso:
+  python3 resources/tools/bench_stats_api.py --url http://localhost:5000 --user admin --password admin
+  python3 resources/tools/bench_stats_api.py --inprocess [--clients 8] [--seconds 5]
+"""
+import sys
+import os
+import time
+import argparse
+import itertools
+import threading
+
+# Add root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+def old_stats():
+    """Cuerpo anterior de /api/stats: psutil en cada petición."""
+    import psutil
+    from modules.metrics_sampler import read_cpu_temp
+    temp = read_cpu_temp()
+    return {
+        'cpu_temp': f"{temp:.1f}°C" if temp is not None else "N/A",
+        'cpu_usage': f"{psutil.cpu_percent(interval=0.1)}%",
+        'ram_usage': f"{psutil.virtual_memory().percent}%",
+        'disk_usage': psutil.disk_usage('/').percent
+    }
+
+def new_stats():
+    from modules.sysadmin import SysAdminManager
+    sys_admin = SysAdminManager()
+    def call():
+        return {
+            'cpu_temp': sys_admin.get_cpu_temp(),
+            'cpu_usage': sys_admin.get_cpu_usage(),
+            'ram_usage': sys_admin.get_ram_usage(),
+            'disk_usage': sys_admin.get_disk_usage()
+        }
+    return call
+
+def run_clients(label, request_fn, clients, seconds):
+    latencies = []
+    lock = threading.Lock()
+    deadline = time.time() + seconds
+
+    def worker():
+        local = []
+        while time.time() < deadline:
+            t0 = time.perf_counter()
+            try:
+                request_fn()
+            except Exception as e:
+                print(f"  error: {e}")
+                return
+            local.append(time.perf_counter() - t0)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=worker) for _ in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    if not latencies:
+        print(f"  {label:22} sin resultados")
+        return
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000
+    print(f"  {label:22} {clients:3} clientes | p50 {p50:8.2f} ms  p95 {p95:8.2f} ms | {len(latencies) / seconds:8.1f} req/s")
+
+def http_session(url, user, password):
+    import requests
+    session = requests.Session()
+    session.post(f"{url}/login", data={'username': user, 'password': password}, allow_redirects=False)
+    def call():
+        response = session.get(f"{url}/api/stats", allow_redirects=False)
+        if response.status_code != 200:
+            raise RuntimeError(f"HTTP {response.status_code} (¿credenciales?)")
+        return response.json()
+    return call
+
+def main():
+    parser = argparse.ArgumentParser(description="Latencia de /api/stats con clientes concurrentes")
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--user', default='admin')
+    parser.add_argument('--password', default='admin')
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--inprocess', action='store_true', help="Comparar antiguo vs instantánea sin servidor")
+    args = parser.parse_args()
+
+    if args.inprocess:
+        print("Cuerpo de /api/stats en proceso:")
+        new_call = new_stats()
+        for clients in (1, args.clients):
+            run_clients("psutil por petición", old_stats, clients, args.seconds)
+            run_clients("instantánea", new_call, clients, args.seconds)
+    else:
+        print(f"/api/stats en {args.url}:")
+        for clients in (1, args.clients):
+            # Una sesión por cliente, como pestañas de dashboard distintas
+            sessions = [http_session(args.url, args.user, args.password) for _ in range(clients)]
+            counter = itertools.count()
+            local = threading.local()
+            def call():
+                if not hasattr(local, 'fn'):
+                    local.fn = sessions[next(counter) % clients]
+                return local.fn()
+            run_clients("HTTP", call, clients, args.seconds)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import sys
+import os
+import queue
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+from modules.event_queue import (PolicyQueue, MessageClass, NEVER_DROP, DROP_OLDEST, COALESCE,
+                                 classify_event, event_priority, EVENT_CLASSES, classify_bus_message, BUS_CLASSES)
+
+def make_queue(name, *classes):
+    return PolicyQueue(name, lambda item: (item['cls'], item.get('key')), list(classes))
+
+def drain(q):
+    items = []
+    while True:
+        try:
+            items.append(q.get_nowait())
+        except queue.Empty:
+            return items
+
+def test_drop_oldest_keeps_newest_and_bounds_memory():
+    print("--- Testing DROP_OLDEST ---")
+    q = make_queue('test.drop', MessageClass('telemetry', DROP_OLDEST, 3))
+    for i in range(1000):
+        q.put({'cls': 'telemetry', 'n': i})
+    assert q.qsize() == 3
+    assert q.get_stats()['classes']['telemetry']['dropped'] == 997
+    assert sum(len(lane) for lane in q._lanes.values()) < 200 # Los slots descartados se compactan
+    assert [item['n'] for item in drain(q)] == [997, 998, 999]
+    print("PASS: Oldest items dropped, lanes compacted.")
+
+def test_never_drop_keeps_everything():
+    print("--- Testing NEVER_DROP ---")
+    q = make_queue('test.never', MessageClass('speech', NEVER_DROP))
+    for i in range(500):
+        q.put({'cls': 'speech', 'n': i})
+    assert [item['n'] for item in drain(q)] == list(range(500))
+    print("PASS: Nothing dropped, FIFO order kept.")
+
+def test_coalesce_replaces_pending_value_in_place():
+    print("--- Testing COALESCE ---")
+    q = make_queue('test.coalesce', MessageClass('status', COALESCE), MessageClass('speech', NEVER_DROP))
+    q.put({'cls': 'status', 'key': 'mic', 'v': 1})
+    q.put({'cls': 'speech', 'v': 'hola'})
+    q.put({'cls': 'status', 'key': 'mic', 'v': 2})
+    q.put({'cls': 'status', 'key': 'cam', 'v': 3})
+    assert [item['v'] for item in drain(q)] == [2, 'hola', 3] # El último valor conserva el turno del primero
+    assert q.get_stats()['classes']['status']['coalesced'] == 1
+
+    q.put({'cls': 'status', 'key': 'mic', 'v': 4}) # Ya consumido: vuelve a encolarse
+    assert drain(q)[0]['v'] == 4
+    print("PASS: Pending status coalesced, consumed status re-queued.")
+
+def test_priority_lanes_and_discard_below():
+    print("--- Testing priority lanes ---")
+    q = make_queue('test.lanes', MessageClass('speech', NEVER_DROP))
+    for priority in ('low', 'normal', 'critical', 'high', 'critical'):
+        q.put({'cls': 'speech', 'p': priority}, priority=priority)
+    assert q.get_with_priority()[1] == 'critical'
+
+    assert q.discard_below('high') == 2 # normal y low
+    assert [item['p'] for item in drain(q)] == ['critical', 'high']
+    for _ in range(3):
+        q.task_done() # Los tres atendidos; los descartados ya cuentan como terminados
+    q.join()
+    print("PASS: Most urgent lane first; discard_below keeps urgent items.")
+
+def test_shutdown_sentinel_is_never_dropped():
+    print("--- Testing shutdown sentinel ---")
+    for classify, classes, flood in ((classify_event, EVENT_CLASSES, {'type': 'otro'}),
+                                     (classify_bus_message, BUS_CLASSES, {'type': 'otro'})):
+        q = PolicyQueue('test.sentinel', classify, classes, priority_of=event_priority)
+        for _ in range(5000):
+            q.put(dict(flood))
+        q.put(None)
+        assert q.get() is None # Carril crítico: sale antes que el resto
+    print("PASS: None survives backpressure and is served first.")
+
+def test_event_classification():
+    print("--- Testing event classification ---")
+    assert classify_event({'type': 'speak'}) == ('speech', None)
+    assert classify_event({'type': 'mqtt_telemetry', 'agent': 'pi'}) == ('telemetry', 'pi')
+    assert classify_bus_message({'type': 'system.alert'}) == ('alert', None)
+    assert classify_bus_message({'type': 'mic:status'}) == ('status', 'mic:status')
+    print("PASS: Messages land in the expected classes.")
+
+if __name__ == "__main__":
+    test_drop_oldest_keeps_newest_and_bounds_memory()
+    test_never_drop_keeps_everything()
+    test_coalesce_replaces_pending_value_in_place()
+    test_priority_lanes_and_discard_below()
+    test_shutdown_sentinel_is_never_dropped()
+    test_event_classification()
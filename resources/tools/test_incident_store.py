@@ -0,0 +1,77 @@
+import sys
+import os
+import json
+import time
+import tempfile
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+from modules.incident_store import IncidentStore
+
+def make_store(tmp, legacy=None, **kwargs):
+    legacy_path = os.path.join(tmp, 'health_history.json')
+    if legacy is not None:
+        with open(legacy_path, 'w') as f:
+            json.dump(legacy, f)
+    return IncidentStore(db_path=os.path.join(tmp, 'health.db'), legacy_path=legacy_path, **kwargs)
+
+def test_legacy_import_runs_once():
+    print("--- Testing legacy JSON import ---")
+    now = time.time()
+    legacy = [
+        {'timestamp': now - 3600, 'target': 'nginx', 'event': 'CRASH_DETECTED', 'context': {'code': 1}},
+        {'timestamp': now - 2 * 86400, 'target': 'nginx', 'event': 'RESTARTED'}, # Fuera de la ventana
+        {'target': 'roto', 'event': 'SIN_FECHA'}, # Sin timestamp: se ignora
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        store = make_store(tmp, legacy)
+        recent = store.recent(10)
+        assert [i['event'] for i in recent] == ['CRASH_DETECTED', 'RESTARTED']
+        assert recent[0]['context'] == {'code': 1}
+        assert store.count() == 1 # Solo el de la última hora cuenta en la ventana de 24 h
+        assert store.summary()['crashes_by_service'] == {'nginx': 1}
+        store.conn.close()
+
+        # Segundo arranque: la tabla ya tiene datos, no se duplica
+        store = make_store(tmp, legacy)
+        assert len(store.recent(10)) == 2
+        store.conn.close()
+    print("PASS: Legacy history imported once, window rebuilt.")
+
+def test_broken_legacy_file_is_ignored():
+    print("--- Testing broken legacy file ---")
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(os.path.join(tmp, 'health_history.json'), 'w') as f:
+            f.write('{no es json')
+        store = make_store(tmp)
+        assert store.recent(10) == [] and store.count() == 0
+        store.conn.close()
+    print("PASS: A corrupt legacy file does not block startup.")
+
+def test_rolling_counters():
+    print("--- Testing rolling counters ---")
+    with tempfile.TemporaryDirectory() as tmp:
+        store = make_store(tmp, window=60)
+        now = time.time()
+        store.add('nginx', 'CRASH_DETECTED', timestamp=now - 120) # Ya fuera de la ventana
+        store.add('nginx', 'CRASH_DETECTED', timestamp=now - 10)
+        store.add('nginx', 'RESTARTED', timestamp=now - 5)
+        last = store.add('mosquitto', 'CRASH_DETECTED', {'code': 137})
+
+        assert store.count() == 3
+        assert store.count(event='CRASH_DETECTED') == 2
+        assert store.count(target='nginx') == 2
+        assert store.count(event='RESTARTED', target='nginx') == 1
+        summary = store.summary()
+        assert summary['last']['id'] == last['id']
+        assert summary['crashes_by_service'] == {'nginx': 1, 'mosquitto': 1}
+        assert [i['target'] for i in store.recent(10, target='mosquitto')] == ['mosquitto']
+        assert len(store.recent(10)) == 4 # El historial conserva lo que salió de la ventana
+        store.conn.close()
+    print("PASS: Counters follow the window; history keeps everything.")
+
+if __name__ == "__main__":
+    test_legacy_import_runs_once()
+    test_broken_legacy_file_is_ignored()
+    test_rolling_counters()
@@ -0,0 +1,87 @@
+import sys
+import os
+import tempfile
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+from modules.log_reader import tail_lines, LogIndex
+
+def write_lines(path, start, count, mode='a'):
+    with open(path, mode) as f:
+        for i in range(start, start + count):
+            f.write(f"linea {i}\n")
+
+def test_tail_lines_across_blocks():
+    print("--- Testing tail_lines ---")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'app.log')
+        write_lines(path, 0, 1000, mode='w')
+        assert tail_lines(path, 3, block_size=16) == ['linea 997', 'linea 998', 'linea 999']
+        assert tail_lines(path, 5000) == [f"linea {i}" for i in range(1000)] # Más de las que hay
+        assert tail_lines(path, 0) == []
+        open(path, 'w').close()
+        assert tail_lines(path, 10) == []
+    print("PASS: Tail reads backwards in blocks.")
+
+def test_page_from_the_end():
+    print("--- Testing LogIndex.page ---")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'app.log')
+        write_lines(path, 0, 1050, mode='w')
+        index = LogIndex(path, stride=100)
+
+        newest = index.page(0, 200)
+        assert newest['total_lines'] == 1050 and newest['has_more']
+        assert newest['lines'][0] == 'linea 850' and newest['lines'][-1] == 'linea 1049'
+
+        oldest = index.page(5, 200) # Solo quedan 50 líneas
+        assert oldest['lines'] == [f"linea {i}" for i in range(50)] and not oldest['has_more']
+        assert index.page(6, 200)['lines'] == []
+    print("PASS: Pages counted from the end, last page partial.")
+
+def test_partial_last_line_is_not_indexed():
+    print("--- Testing partial last line ---")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'app.log')
+        write_lines(path, 0, 10, mode='w')
+        with open(path, 'a') as f:
+            f.write("linea a medio")
+        index = LogIndex(path, stride=4)
+        page = index.page(0, 3)
+        assert page['total_lines'] == 10
+        assert page['lines'] == ['linea 7', 'linea 8', 'linea 9']
+
+        with open(path, 'a') as f:
+            f.write(" escribir\nlinea 11\n")
+        page = index.page(0, 2)
+        assert page['total_lines'] == 12 # Indexado incremental desde la línea incompleta
+        assert page['lines'] == ['linea a medio escribir', 'linea 11']
+    print("PASS: A half-written line waits for its newline.")
+
+def test_rotation_resets_index():
+    print("--- Testing rotation ---")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'app.log')
+        write_lines(path, 0, 500, mode='w')
+        index = LogIndex(path, stride=50)
+        assert index.page(0, 10)['total_lines'] == 500
+
+        # Rotación por renombrado (inodo nuevo) con un fichero más pequeño
+        os.rename(path, path + '.1')
+        write_lines(path, 1000, 5, mode='w')
+        page = index.page(0, 10)
+        assert page['total_lines'] == 5
+        assert page['lines'] == [f"linea {i}" for i in range(1000, 1005)]
+
+        # Truncado en sitio (mismo inodo, tamaño menor)
+        write_lines(path, 2000, 2, mode='w')
+        page = index.page(0, 10)
+        assert page['total_lines'] == 2 and page['lines'] == ['linea 2000', 'linea 2001']
+    print("PASS: Rotation and truncation rebuild the index.")
+
+if __name__ == "__main__":
+    test_tail_lines_across_blocks()
+    test_page_from_the_end()
+    test_partial_last_line_is_not_indexed()
+    test_rotation_resets_index()
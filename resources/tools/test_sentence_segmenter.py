@@ -0,0 +1,45 @@
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+from modules.sentence_segmenter import SentenceSegmenter
+
+def segment(chunks):
+    segmenter = SentenceSegmenter()
+    sentences = []
+    for chunk in chunks:
+        sentences.extend(segmenter.feed(chunk))
+    return sentences, segmenter.flush()
+
+def test_sentences_split_across_tokens():
+    print("--- Testing token-by-token segmentation ---")
+    sentences, rest = segment(["Ho", "la", ". ¿Qué", " tal", "?", " Bien", "!\nSigo", " aquí"])
+    assert sentences == ["Hola.", "¿Qué tal?", "Bien!"]
+    assert rest == "Sigo aquí"
+    print("PASS: Sentences closed as soon as the delimiter arrives.")
+
+def test_same_result_for_any_chunking():
+    print("--- Testing chunking independence ---")
+    text = "Primera frase. Segunda! Tercera?\n\nCuarta sin punto"
+    whole, whole_rest = segment([text])
+    by_char, by_char_rest = segment(list(text))
+    assert whole == by_char and whole_rest == by_char_rest
+    assert whole == ["Primera frase.", "Segunda!", "Tercera?"]
+    print("PASS: Same sentences whatever the token boundaries.")
+
+def test_empty_input_and_flush_resets():
+    print("--- Testing empty input ---")
+    segmenter = SentenceSegmenter()
+    assert segmenter.feed("") == [] and segmenter.feed(None) == []
+    assert segmenter.feed("  \n\n") == [] # Solo blancos: ninguna frase vacía
+    segmenter.feed("resto")
+    assert segmenter.flush() == "resto"
+    assert segmenter.flush() is None
+    print("PASS: No empty sentences; flush empties the buffer.")
+
+if __name__ == "__main__":
+    test_sentences_split_across_tokens()
+    test_same_result_for_any_chunking()
+    test_empty_input_and_flush_resets()
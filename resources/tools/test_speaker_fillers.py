@@ -1,6 +1,7 @@
 import sys
 import os
 import queue
+import time
 import logging
 
 # Add project root to path
@@ -20,11 +21,20 @@ def test_speaker_fillers():
     speaker.engine = 'dummy' 
     speaker.is_available = True
 
+    print(f"Fillers in memory: {len(speaker.fillers.clips)}")
     print("Calling play_random_filler()...")
     speaker.play_random_filler()
-    
-    if not speaker.speak_queue.empty():
-        item = speaker.speak_queue.get()
+
+    if speaker.output:
+        # Persistent output: the filler goes straight to the 'filler' channel (no queue)
+        if speaker.output.is_active('filler'):
+            time.sleep(0.1)
+            speaker.output.stop('filler')
+            print(f"PASS: Filler played from memory. Start latency: {speaker.output.get_stats('filler')}")
+        else:
+            print("FAIL: No filler playing on the 'filler' channel.")
+    elif not speaker.speak_queue.empty():
+        item, _trace_id = speaker.speak_queue.get()
         print(f"Queue Item: {item}")
         
         if isinstance(item, dict) and item.get('type') == 'wav':
@@ -0,0 +1,78 @@
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+from modules.systemd_units import SystemctlBackend, FakeSystemdBackend, UnitMonitor, UnitState, is_down, is_installed
+
+SHOW_OUTPUT = """Id=nginx.service
+LoadState=loaded
+ActiveState=active
+SubState=running
+
+Id=mosquitto.service
+LoadState=loaded
+ActiveState=failed
+SubState=failed
+
+Id=ghost.service
+LoadState=not-found
+ActiveState=inactive
+SubState=dead
+"""
+
+def test_parse_batched_show():
+    print("--- Testing systemctl show parsing ---")
+    states = SystemctlBackend.parse(SHOW_OUTPUT, ['nginx', 'mosquitto', 'ghost'])
+    assert list(states) == ['nginx', 'mosquitto', 'ghost']
+    assert states['nginx'] == UnitState('nginx', 'loaded', 'active', 'running')
+    assert is_down(states['mosquitto'])
+    assert not is_installed(states['ghost']) and not is_down(states['ghost'])
+    print("PASS: One block per unit, in request order.")
+
+def test_parse_matches_by_id_when_blocks_missing():
+    print("--- Testing parsing with a missing block ---")
+    output = SHOW_OUTPUT.split('\n\n', 1)[1] # Sin el bloque de nginx
+    states = SystemctlBackend.parse(output, ['nginx', 'mosquitto', 'ghost'])
+    assert states['nginx'].load_state == 'unknown'
+    assert states['mosquitto'].active_state == 'failed'
+    print("PASS: Units matched by Id; missing unit is 'unknown'.")
+
+def test_monitor_notifies_only_transitions():
+    print("--- Testing UnitMonitor transitions ---")
+    backend = FakeSystemdBackend({'nginx': 'active', 'mosquitto': 'active'})
+    monitor = UnitMonitor(['nginx', 'mosquitto'], backend=backend)
+    events = []
+    monitor.add_listener(lambda name, old, new: events.append((name, old and old.active_state, new.active_state)))
+
+    monitor.refresh()
+    assert events == [('nginx', None, 'active'), ('mosquitto', None, 'active')]
+
+    events.clear()
+    monitor.refresh()
+    assert events == [] # Sin cambios: sin avisos
+
+    backend.set_state('mosquitto', 'failed')
+    monitor.refresh()
+    assert events == [('mosquitto', 'active', 'failed')]
+    assert is_down(monitor.states()['mosquitto'])
+    assert backend.queries == 3 # Una consulta en lote por ciclo
+    print("PASS: Listeners only see state changes.")
+
+def test_monitor_survives_listener_errors():
+    print("--- Testing UnitMonitor listener isolation ---")
+    backend = FakeSystemdBackend({'nginx': 'active'})
+    monitor = UnitMonitor(['nginx'], backend=backend)
+    seen = []
+    monitor.add_listener(lambda *args: 1 / 0)
+    monitor.add_listener(lambda name, old, new: seen.append(name))
+    monitor.refresh()
+    assert seen == ['nginx']
+    print("PASS: A failing listener does not block the others.")
+
+if __name__ == "__main__":
+    test_parse_batched_show()
+    test_parse_matches_by_id_when_blocks_missing()
+    test_monitor_notifies_only_transitions()
+    test_monitor_survives_listener_errors()